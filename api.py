@@ -0,0 +1,244 @@
+"""
+API JSON (/api/v1) para os clientes móveis.
+
+Autenticação pela mesma sessão do site (POST /login). As respostas de
+leitura levam um ETag derivado de usuario.versao_dados, incrementada no
+banco a cada gravação em Transacao (ver cache.py): com If-None-Match
+igual, a resposta é 304 com uma só consulta, pela chave primária.
+Respostas acima de GZIP_MINIMO bytes são comprimidas se o cliente
+aceitar gzip.
+
+Criar ou alterar uma transação que faz uma meta passar de um alerta
+(ver metas.py) devolve os alertas em "alertas", junto da transação.
+
+O CSRFProtect não vale para a API; em troca, escritas só aceitam corpo
+application/json, que um formulário de outro site não consegue enviar
+sem passar pelo CORS.
+"""
+import gzip
+import hashlib
+from datetime import date, datetime
+
+from flask import Blueprint, Response, abort, g, jsonify, request
+from flask_login import current_user
+
+import categorias
+import saldos
+from cache import cache_usuario, versao_dados
+from dinheiro import para_decimal
+from estatisticas import calcular_painel
+from extensions import csrf, db
+from filtros import TransacaoFilter
+from models import Transacao
+from paginacao import paginar, tamanho_pagina
+from validacao import validar_transacao
+
+GZIP_MINIMO = 1024
+GZIP_NIVEL = 5
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+csrf.exempt(bp)
+
+
+def _erro(mensagem, status):
+    resposta = jsonify({'erro': mensagem})
+    resposta.status_code = status
+    return resposta
+
+
+@bp.before_request
+def _exigir_login():
+    if not current_user.is_authenticated:
+        return _erro('Autenticação necessária.', 401)
+    if request.method in ('POST', 'PUT') and not request.is_json:
+        return _erro('Envie o corpo como application/json.', 415)
+
+
+@bp.after_request
+def _comprimir(resposta):
+    resposta.vary.add('Accept-Encoding')
+    if (
+        resposta.direct_passthrough
+        or resposta.status_code != 200
+        or 'Content-Encoding' in resposta.headers
+        or 'gzip' not in request.accept_encodings
+    ):
+        return resposta
+    dados = resposta.get_data()
+    if len(dados) < GZIP_MINIMO:
+        return resposta
+    resposta.set_data(gzip.compress(dados, GZIP_NIVEL))
+    resposta.headers['Content-Encoding'] = 'gzip'
+    return resposta
+
+
+def _etag(versao):
+    """ETag da resposta: usuário, versão dos dados, dia (o painel depende de hoje) e URL."""
+    chave = f'{current_user.id}:{versao}:{date.today()}:{request.full_path}'
+    return hashlib.sha256(chave.encode()).hexdigest()[:32]
+
+
+def _condicional(gerar):
+    """
+    Responde 304 se o ETag do cliente ainda vale; senão, jsonify(gerar(versao))
+    com o ETag. gerar recebe a versão dos dados usada no ETag.
+    """
+    versao = versao_dados(db.session, current_user.id)
+    etag = _etag(versao)
+    if request.if_none_match.contains_weak(etag):
+        resposta = Response(status=304)
+    else:
+        resposta = jsonify(gerar(versao))
+    # Fraco: a mesma representação pode ir comprimida ou não
+    resposta.set_etag(etag, weak=True)
+    resposta.headers['Cache-Control'] = 'private, no-cache'
+    return resposta
+
+
+def _serializar(transacao):
+    return {
+        'id': transacao.id,
+        'data': transacao.data.isoformat(),
+        'descricao': transacao.descricao,
+        'tipo': transacao.tipo,
+        'categoria': transacao.categoria.nome if transacao.categoria else None,
+        'categoria_id': transacao.categoria_id,
+        'valor_centavos': transacao.valor_centavos
+    }
+
+
+def _com_alertas(dados):
+    """Acrescenta os alertas de meta disparados pelo commit desta requisição."""
+    alertas = g.get('alertas_metas')
+    if alertas:
+        dados['alertas'] = [
+            {chave: alerta[chave] for chave in ('mes', 'categoria', 'percentual', 'gasto_centavos', 'limite_centavos')}
+            for alerta in alertas
+        ]
+    return dados
+
+
+def _dados_transacao(corpo):
+    """Valida o JSON de uma transação; valor_centavos deve ser inteiro."""
+    valor = corpo.get('valor_centavos')
+    if not isinstance(valor, int) or isinstance(valor, bool):
+        return None, 'valor_centavos deve ser um número inteiro.'
+    return validar_transacao(
+        corpo.get('descricao'),
+        str(para_decimal(valor)),
+        corpo.get('tipo') or '',
+        corpo.get('categoria'),
+        corpo.get('data') or ''
+    )
+
+
+def _transacao_do_usuario(id):
+    transacao = db.session.get(Transacao, id)
+    if transacao is None or transacao.usuario_id != current_user.id:
+        abort(_erro('Transação não encontrada.', 404))
+    return transacao
+
+
+@bp.get('/transacoes')
+def listar_transacoes():
+    filtro = TransacaoFilter.from_args(current_user.id, request.args)
+    if filtro.erros:
+        return _erro(' '.join(filtro.erros), 400)
+
+    def gerar(versao):
+        pagina = paginar(
+            filtro.select(),
+            depois=request.args.get('depois'),
+            antes=request.args.get('antes'),
+            por_pagina=tamanho_pagina(request.args.get('por_pagina'))
+        )
+        return {
+            'transacoes': [_serializar(t) for t in pagina['transacoes']],
+            'anterior': pagina['anterior'],
+            'proximo': pagina['proximo'],
+            'por_pagina': pagina['por_pagina']
+        }
+
+    return _condicional(gerar)
+
+
+@bp.post('/transacoes')
+def criar_transacao():
+    dados, erro = _dados_transacao(request.get_json(silent=True) or {})
+    if erro:
+        return _erro(erro, 400)
+    transacao = Transacao(usuario_id=current_user.id, **categorias.com_categoria_id(current_user.id, dados))
+    db.session.add(transacao)
+    db.session.commit()
+    resposta = jsonify(_com_alertas(_serializar(transacao)))
+    resposta.status_code = 201
+    resposta.headers['Location'] = f'{bp.url_prefix}/transacoes/{transacao.id}'
+    return resposta
+
+
+@bp.get('/transacoes/<int:id>')
+def obter_transacao(id):
+    return _condicional(lambda versao: _serializar(_transacao_do_usuario(id)))
+
+
+@bp.put('/transacoes/<int:id>')
+def atualizar_transacao(id):
+    transacao = _transacao_do_usuario(id)
+    dados, erro = _dados_transacao(request.get_json(silent=True) or {})
+    if erro:
+        return _erro(erro, 400)
+    for campo, valor in categorias.com_categoria_id(current_user.id, dados).items():
+        setattr(transacao, campo, valor)
+    db.session.commit()
+    return jsonify(_com_alertas(_serializar(transacao)))
+
+
+@bp.delete('/transacoes/<int:id>')
+def excluir_transacao(id):
+    db.session.delete(_transacao_do_usuario(id))
+    db.session.commit()
+    return Response(status=204)
+
+
+@bp.get('/estatisticas')
+def estatisticas():
+    def gerar(versao):
+        # Em cache pela mesma versão do ETag, e não pela do backend do cache
+        painel = cache_usuario.obter(
+            'painel', current_user.id, lambda: calcular_painel(current_user.id, versao_dados=versao), versao
+        )
+        return {
+            'estatisticas': painel['estatisticas'],
+            'relatorio_mensal': painel['relatorio_mensal'],
+            'categorias': painel['categorias'],
+            'metas': painel['metas'],
+            'total_receitas': painel['total_receitas'],
+            'total_despesas': painel['total_despesas'],
+            'saldo': painel['total_receitas'] - painel['total_despesas']
+        }
+
+    return _condicional(gerar)
+
+
+@bp.get('/saldos')
+def serie_saldos():
+    """Saldo acumulado para gráficos: ?data_inicial=&data_final= (AAAA-MM-DD) e ?agrupamento=dia|semana|mes."""
+    agrupamento = request.args.get('agrupamento') or 'dia'
+    if agrupamento not in saldos.AGRUPAMENTOS:
+        return _erro(f"agrupamento deve ser um de: {', '.join(saldos.AGRUPAMENTOS)}.", 400)
+    datas = {}
+    for campo in ('data_inicial', 'data_final'):
+        texto = request.args.get(campo)
+        try:
+            datas[campo] = datetime.strptime(texto, '%Y-%m-%d').date() if texto else None
+        except ValueError:
+            return _erro(f'{campo} deve estar no formato AAAA-MM-DD.', 400)
+
+    def gerar(versao):
+        return saldos.serie(db.session, current_user.id, agrupamento=agrupamento, **datas)
+
+    return _condicional(gerar)
+
+
+def init_app(app):
+    app.register_blueprint(bp)
@@ -0,0 +1,291 @@
+"""
+Busca textual nas descrições das transações.
+
+- SQLite: tabela FTS5 sem conteúdo (transacao_busca). Cada palavra é
+  indexada sem acentos e prefixada pelo usuário (u42_alimentacao), então
+  uma busca por prefixo só percorre os termos daquele usuário. A tabela é
+  mantida no mesmo flush que grava a Transacao.
+- PostgreSQL: índice GIN sobre (usuario_id, to_tsvector(unaccent(descricao))).
+- MySQL: índice FULLTEXT; a collation *_ai_ci já ignora acentos.
+- Outros bancos: LIKE com os curingas do usuário escapados.
+"""
+import re
+import unicodedata
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import Column, Float, Integer, MetaData, Table, Text, bindparam, event, inspect, select, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import FunctionElement
+
+from extensions import db
+from models import Transacao
+from resumo import valores_antigos, valores_atuais
+
+PALAVRA = re.compile(r'\w+', re.UNICODE)
+
+# Fora do db.metadata: create_all não deve tentar criar a tabela virtual
+tabela_busca = Table(
+    'transacao_busca', MetaData(),
+    Column('rowid', Integer),
+    Column('termos', Text),
+    Column('rank', Float)
+)
+
+DDL_SQLITE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS transacao_busca USING fts5("
+    "termos, content='', tokenize=\"unicode61 tokenchars '_'\")",
+)
+
+DDL_POSTGRESQL = (
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE EXTENSION IF NOT EXISTS btree_gin",
+    # unaccent() não é IMMUTABLE; o wrapper permite usá-la em um índice
+    "CREATE OR REPLACE FUNCTION transacao_unaccent(text) RETURNS text "
+    "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT "
+    "AS $$ SELECT public.unaccent('public.unaccent', $1) $$",
+    "CREATE INDEX IF NOT EXISTS ix_transacao_busca ON transacao "
+    "USING gin (usuario_id, to_tsvector('simple', transacao_unaccent(descricao)))",
+)
+
+DDL_MYSQL = (
+    "CREATE FULLTEXT INDEX ix_transacao_busca ON transacao (descricao)",
+)
+
+
+def palavras(termo):
+    """Palavras do termo, em minúsculas e sem acentos."""
+    termo = unicodedata.normalize('NFKD', (termo or '').lower())
+    termo = ''.join(c for c in termo if not unicodedata.combining(c))
+    return PALAVRA.findall(termo)
+
+
+def termos_indexados(usuario_id, descricao):
+    """Texto gravado na tabela FTS5 para uma transação."""
+    return ' '.join(f'u{usuario_id}_{palavra}' for palavra in palavras(descricao))
+
+
+def consulta_fts(usuario_id, termo):
+    """Expressão MATCH do FTS5: todas as palavras, como prefixo, do usuário."""
+    return ' '.join(f'"u{usuario_id}_{palavra}"*' for palavra in palavras(termo))
+
+
+def _escapar_like(termo):
+    return termo.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class _ExpressaoBusca(FunctionElement):
+    """
+    Base das expressões de busca. Os termos já vêm formatados para cada
+    banco como parâmetros; o compilador do dialeto usa só o que precisa.
+    """
+    inherit_cache = True
+
+    def __init__(self, usuario_id, termo):
+        termos = palavras(termo)
+        super().__init__(
+            Transacao.id,
+            Transacao.descricao,
+            bindparam('busca_fts', consulta_fts(usuario_id, termo), unique=True),
+            bindparam('busca_tsquery', ' & '.join(f'{t}:*' for t in termos), unique=True),
+            bindparam('busca_booleana', ' '.join(f'+{t}*' for t in termos), unique=True),
+            bindparam('busca_like', f'%{_escapar_like(termo.strip())}%', unique=True),
+        )
+
+    def _partes(self, compiler, **kw):
+        return [compiler.process(clausula, **kw) for clausula in self.clauses]
+
+
+class corresponde(_ExpressaoBusca):
+    """Condição WHERE: a descrição contém todas as palavras (como prefixo)."""
+    # Sem tipo Boolean: em bancos sem booleano nativo o SQLAlchemy acrescentaria "= 1"
+    name = 'corresponde'
+    inherit_cache = True
+
+
+class relevancia(_ExpressaoBusca):
+    """Pontuação da busca no PostgreSQL e no MySQL; quanto maior, mais relevante."""
+    type = Float()
+    name = 'relevancia'
+    inherit_cache = True
+
+
+@compiles(corresponde)
+def _corresponde_padrao(element, compiler, **kw):
+    _, descricao, _, _, _, like = element._partes(compiler, **kw)
+    return f"lower({descricao}) LIKE lower({like}) ESCAPE '\\'"
+
+
+@compiles(corresponde, 'sqlite')
+def _corresponde_sqlite(element, compiler, **kw):
+    id_, _, fts, _, _, _ = element._partes(compiler, **kw)
+    return f"{id_} IN (SELECT rowid FROM transacao_busca WHERE transacao_busca MATCH {fts})"
+
+
+@compiles(corresponde, 'postgresql')
+def _corresponde_postgresql(element, compiler, **kw):
+    _, descricao, _, tsquery, _, _ = element._partes(compiler, **kw)
+    return (f"to_tsvector('simple', transacao_unaccent({descricao})) "
+            f"@@ to_tsquery('simple', transacao_unaccent({tsquery}))")
+
+
+@compiles(corresponde, 'mysql')
+def _corresponde_mysql(element, compiler, **kw):
+    _, descricao, _, _, booleana, _ = element._partes(compiler, **kw)
+    return f"MATCH ({descricao}) AGAINST ({booleana} IN BOOLEAN MODE)"
+
+
+@compiles(relevancia)
+def _relevancia_padrao(element, compiler, **kw):
+    return '0'
+
+
+@compiles(relevancia, 'postgresql')
+def _relevancia_postgresql(element, compiler, **kw):
+    _, descricao, _, tsquery, _, _ = element._partes(compiler, **kw)
+    return (f"ts_rank(to_tsvector('simple', transacao_unaccent({descricao})), "
+            f"to_tsquery('simple', transacao_unaccent({tsquery})))")
+
+
+@compiles(relevancia, 'mysql')
+def _relevancia_mysql(element, compiler, **kw):
+    _, descricao, _, _, booleana, _ = element._partes(compiler, **kw)
+    return f"MATCH ({descricao}) AGAINST ({booleana} IN BOOLEAN MODE)"
+
+
+def buscar(usuario_id, termo, limite=50):
+    """Transações do usuário que contêm o termo, da mais para a menos relevante."""
+    if not palavras(termo):
+        return []
+
+    if db.session.get_bind().dialect.name == 'sqlite':
+        # rank do FTS5 (bm25) é negativo: quanto menor, mais relevante
+        encontrados = select(tabela_busca.c.rowid, tabela_busca.c.rank).where(
+            tabela_busca.c.termos.op('MATCH')(consulta_fts(usuario_id, termo))
+        ).subquery()
+        consulta = select(Transacao).join(
+            encontrados, encontrados.c.rowid == Transacao.id
+        ).where(Transacao.usuario_id == usuario_id).order_by(encontrados.c.rank, Transacao.data.desc())
+    else:
+        consulta = select(Transacao).where(
+            Transacao.usuario_id == usuario_id,
+            corresponde(usuario_id, termo)
+        ).order_by(relevancia(usuario_id, termo).desc(), Transacao.data.desc())
+
+    return db.session.scalars(consulta.limit(limite)).all()
+
+
+def indexar(conexao, incluir=(), remover=()):
+    """
+    Atualiza a tabela FTS5 (apenas SQLite). `incluir` e `remover` são
+    sequências de (id, usuario_id, descricao); a remoção precisa dos
+    mesmos valores que foram indexados.
+    """
+    if conexao.dialect.name != 'sqlite':
+        return
+    remover = [
+        {'comando': 'delete', 'rowid': id_, 'termos': termos_indexados(usuario_id, descricao)}
+        for id_, usuario_id, descricao in remover
+    ]
+    incluir = [
+        {'rowid': id_, 'termos': termos_indexados(usuario_id, descricao)}
+        for id_, usuario_id, descricao in incluir
+    ]
+    if remover:
+        conexao.execute(text(
+            "INSERT INTO transacao_busca(transacao_busca, rowid, termos) VALUES (:comando, :rowid, :termos)"
+        ), remover)
+    if incluir:
+        conexao.execute(text("INSERT INTO transacao_busca(rowid, termos) VALUES (:rowid, :termos)"), incluir)
+
+
+def _chave_busca(valores):
+    return valores['id'], valores['usuario_id'], valores['descricao']
+
+
+@event.listens_for(Session, 'after_flush')
+def _sincronizar_busca(session, flush_context):
+    incluir = []
+    remover = []
+    for obj in session.new:
+        if isinstance(obj, Transacao):
+            incluir.append(_chave_busca(valores_atuais(obj)))
+    for obj in session.dirty:
+        if isinstance(obj, Transacao):
+            antigo = _chave_busca(valores_antigos(obj))
+            atual = _chave_busca(valores_atuais(obj))
+            if antigo != atual:
+                remover.append(antigo)
+                incluir.append(atual)
+    for obj in session.deleted:
+        if isinstance(obj, Transacao):
+            remover.append(_chave_busca(valores_antigos(obj)))
+    if incluir or remover:
+        indexar(session.connection(), incluir, remover)
+
+
+def criar_indice(conexao):
+    """Cria a estrutura de busca do banco conectado, se ainda não existir."""
+    dialeto = conexao.dialect.name
+    if dialeto == 'sqlite':
+        comandos = DDL_SQLITE
+    elif dialeto == 'postgresql':
+        comandos = DDL_POSTGRESQL
+    elif dialeto == 'mysql':
+        indices = {indice['name'] for indice in inspect(conexao).get_indexes('transacao')}
+        comandos = () if 'ix_transacao_busca' in indices else DDL_MYSQL
+    else:
+        comandos = ()
+    for comando in comandos:
+        conexao.execute(text(comando))
+
+
+@event.listens_for(Transacao.__table__, 'after_create')
+def _criar_indice_busca(tabela, conexao, **kw):
+    criar_indice(conexao)
+
+
+busca_cli = AppGroup('busca', help='Manutenção do índice de busca textual.')
+
+
+def reconstruir():
+    """Cria o índice de busca, se preciso, e o reconstrói a partir das transações."""
+    with db.engine.begin() as conexao:
+        criar_indice(conexao)
+        if conexao.dialect.name == 'sqlite':
+            conexao.execute(text("INSERT INTO transacao_busca(transacao_busca) VALUES ('delete-all')"))
+            linhas = conexao.execute(
+                select(Transacao.id, Transacao.usuario_id, Transacao.descricao).execution_options(yield_per=1000)
+            )
+            for lote in linhas.partitions():
+                indexar(conexao, incluir=lote)
+
+
+@busca_cli.command('reconstruir')
+def reconstruir_comando():
+    """Cria o índice de busca, se preciso, e o reconstrói a partir das transações."""
+    reconstruir()
+    click.echo('Índice de busca reconstruído.')
+
+
+def verificar_indice(app):
+    """
+    No SQLite, a tabela FTS5 fica fora do db.metadata: num banco criado
+    antes dela, toda gravação de Transacao falharia no flush. Só avisa; a
+    tabela é criada por flask init-db e flask migracoes aplicar.
+    """
+    with app.app_context():
+        if db.engine.dialect.name != 'sqlite':
+            return
+        inspetor = inspect(db.engine)
+        if inspetor.has_table('transacao') and not inspetor.has_table('transacao_busca'):
+            app.logger.error(
+                'Tabela transacao_busca ausente: as gravações de transações vão falhar. '
+                'Rode flask migracoes aplicar (ou flask busca reconstruir).'
+            )
+
+
+def init_app(app):
+    app.cli.add_command(busca_cli)
+    verificar_indice(app)
@@ -0,0 +1,221 @@
+"""
+Cache por usuário dos dados do painel.
+
+Cada usuário tem uma versão de dados guardada no backend compartilhado;
+gravar uma Transacao ou Categoria incrementa a versão depois do commit, e as entradas
+antigas deixam de ser consultadas (expiram pelo TTL). Essa versão é só do
+cache e volta a zero com o backend em memória; o que precisa sobreviver a
+reinícios (ETags da API, ids de relatório) usa usuario.versao_dados,
+incrementada no banco na mesma transação da gravação. Os resultados ficam
+em duas camadas: um LRU limitado em cada processo e o backend
+compartilhado, que é o que faz todos os workers do gunicorn enxergarem a
+mesma invalidação.
+
+Sem CACHE_REDIS_URL o backend é um dicionário em memória do processo,
+suficiente para desenvolvimento e para um único worker.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+from sqlalchemy import bindparam, event, select, update
+from sqlalchemy.orm import Session
+
+import pendencias
+from models import Categoria, Meta, Transacao, Usuario
+
+AUSENTE = object()
+
+
+class LRU:
+    """Dicionário limitado a max_itens, com validade de ttl segundos por item."""
+
+    def __init__(self, max_itens=1024, ttl=300):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+
+    def obter(self, chave):
+        with self._trava:
+            item = self._itens.get(chave, AUSENTE)
+            if item is AUSENTE:
+                return AUSENTE
+            expira, valor = item
+            if expira < time.monotonic():
+                del self._itens[chave]
+                return AUSENTE
+            self._itens.move_to_end(chave)
+            return valor
+
+    def definir(self, chave, valor):
+        with self._trava:
+            self._itens[chave] = (time.monotonic() + self.ttl, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def remover(self, chave):
+        with self._trava:
+            self._itens.pop(chave, None)
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+
+
+class BackendMemoria:
+    """Backend compartilhado local: só é compartilhado dentro do próprio processo."""
+
+    def __init__(self):
+        self._valores = {}
+        self._trava = threading.Lock()
+
+    def obter(self, chave):
+        with self._trava:
+            item = self._valores.get(chave)
+            if item is None:
+                return None
+            expira, valor = item
+            if expira is not None and expira < time.monotonic():
+                del self._valores[chave]
+                return None
+            return valor
+
+    def definir(self, chave, valor, ttl):
+        with self._trava:
+            self._valores[chave] = (time.monotonic() + ttl, valor)
+
+    def incrementar(self, chave):
+        with self._trava:
+            _, valor = self._valores.get(chave, (None, 0))
+            self._valores[chave] = (None, valor + 1)
+            return valor + 1
+
+
+class BackendRedis:
+    """Backend compartilhado entre processos e máquinas (requer o pacote redis)."""
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('CACHE_REDIS_URL configurado, mas o pacote redis não está instalado.')
+        self._cliente = redis.Redis.from_url(url)
+
+    def obter(self, chave):
+        valor = self._cliente.get(chave)
+        return None if valor is None else pickle.loads(valor)
+
+    def definir(self, chave, valor, ttl):
+        self._cliente.set(chave, pickle.dumps(valor), ex=ttl)
+
+    def incrementar(self, chave):
+        return self._cliente.incr(chave)
+
+
+class CacheUsuario:
+    """Resultados por (nome, usuário, versão dos dados), com contadores de acertos e falhas."""
+
+    def __init__(self, backend=None, max_itens=1024, ttl=300):
+        self.backend = backend or BackendMemoria()
+        self.ttl = ttl
+        self.local = LRU(max_itens, ttl)
+        self._contadores = {'acertos_locais': 0, 'acertos_compartilhados': 0, 'falhas': 0}
+        self._trava = threading.Lock()
+
+    def _contar(self, contador):
+        with self._trava:
+            self._contadores[contador] += 1
+
+    def versao(self, usuario_id):
+        return int(self.backend.obter(f'versao:{usuario_id}') or 0)
+
+    def invalidar(self, usuario_id):
+        """Incrementa a versão dos dados do usuário; os resultados anteriores deixam de valer."""
+        return self.backend.incrementar(f'versao:{usuario_id}')
+
+    def obter(self, nome, usuario_id, calcular, versao_dados=None):
+        """
+        Retorna o resultado em cache ou chama calcular() e guarda o retorno.
+        Com versao_dados (usuario.versao_dados já lida do banco), a chave usa
+        essa versão em vez da do backend, que só muda depois do commit: quem
+        responde com um ETag dessa versão nunca recebe dados anteriores a ela.
+        """
+        versao = self.versao(usuario_id) if versao_dados is None else f'd{versao_dados}'
+        # A data entra na chave para que comparações com o mês atual virem o mês sozinhas
+        chave = f'{nome}:{usuario_id}:{versao}:{date.today().isoformat()}'
+
+        valor = self.local.obter(chave)
+        if valor is not AUSENTE:
+            self._contar('acertos_locais')
+            return valor
+
+        valor = self.backend.obter(chave)
+        if valor is not None:
+            self._contar('acertos_compartilhados')
+        else:
+            self._contar('falhas')
+            valor = calcular()
+            self.backend.definir(chave, valor, self.ttl)
+        self.local.definir(chave, valor)
+        return valor
+
+    def estatisticas(self):
+        with self._trava:
+            return dict(self._contadores)
+
+
+cache_usuario = CacheUsuario()
+
+_usuario = Usuario.__table__
+INCREMENTAR_VERSAO = update(_usuario).where(_usuario.c.id.in_(bindparam('ids', expanding=True))).values(
+    versao_dados=_usuario.c.versao_dados + 1
+)
+
+
+def incrementar_versao_dados(conexao, usuario_ids):
+    """Incrementa usuario.versao_dados dos usuários, na transação de `conexao`."""
+    if usuario_ids:
+        conexao.execute(INCREMENTAR_VERSAO, {'ids': sorted(usuario_ids)})
+
+
+def versao_dados(conexao, usuario_id):
+    """Versão persistente dos dados do usuário (0 se ele não existir)."""
+    return conexao.execute(select(_usuario.c.versao_dados).where(_usuario.c.id == usuario_id)).scalar() or 0
+
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_alteracoes(session, flush_context):
+    alterados = set()
+    for obj in session.new:
+        if isinstance(obj, (Transacao, Categoria, Meta)):
+            alterados.add(obj.usuario_id)
+    for obj in session.dirty:
+        if isinstance(obj, (Transacao, Categoria, Meta)) and session.is_modified(obj, include_collections=False):
+            alterados.add(obj.usuario_id)
+    for obj in session.deleted:
+        if isinstance(obj, (Transacao, Categoria, Meta)):
+            alterados.add(obj.usuario_id)
+    # Categorias padrão (usuario_id NULL) só mudam pelas migrações
+    alterados.discard(None)
+    incrementar_versao_dados(session.connection(), alterados)
+    pendencias.adicionar(session, 'usuarios_alterados', alterados)
+
+
+# A versão só muda depois do commit: antes disso, outra requisição poderia
+# calcular os dados antigos e guardá-los já com a versão nova
+@event.listens_for(Session, 'after_commit')
+def _invalidar_apos_commit(session):
+    for usuario_id in set(pendencias.retirar(session, 'usuarios_alterados')):
+        cache_usuario.invalidar(usuario_id)
+
+
+def init_app(app):
+    """Configura o cache a partir de CACHE_REDIS_URL, CACHE_MAX_ITENS e CACHE_TTL."""
+    url = app.config.get('CACHE_REDIS_URL')
+    cache_usuario.backend = BackendRedis(url) if url else BackendMemoria()
+    cache_usuario.ttl = app.config.get('CACHE_TTL', 300)
+    cache_usuario.local = LRU(app.config.get('CACHE_MAX_ITENS', 1024), cache_usuario.ttl)
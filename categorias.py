@@ -0,0 +1,130 @@
+"""
+Categorias de transação.
+
+Cada transação aponta (categoria_id) para uma Categoria. As padrão
+(usuario_id NULL, com ícone e cor) valem para todos; um nome que não
+corresponde a nenhuma vira uma categoria do próprio usuário na primeira
+transação. Os nomes são comparados pela chave normalizada (minúsculas,
+sem acentos nem pontuação), então "Saúde", "saude" e "SAÚDE " caem na
+mesma categoria.
+
+A lista de categorias de cada usuário fica no cache do painel
+(cache_usuario), invalidada junto com ele.
+"""
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import IntegrityError
+
+from busca import palavras
+from cache import cache_usuario
+from extensions import db
+from models import Categoria
+
+# nome, ícone (Font Awesome), cor (Bootstrap)
+PADRAO = (
+    ('Alimentação', 'fa-utensils', 'text-primary'),
+    ('Transporte', 'fa-car', 'text-info'),
+    ('Moradia', 'fa-home', 'text-success'),
+    ('Saúde', 'fa-heartbeat', 'text-danger'),
+    ('Educação', 'fa-graduation-cap', 'text-warning'),
+    ('Lazer', 'fa-gamepad', 'text-purple'),
+    ('Vestuário', 'fa-tshirt', 'text-secondary'),
+    ('Contas', 'fa-file-invoice', 'text-secondary'),
+    ('Salário', 'fa-money-bill-wave', 'text-success'),
+    ('Freelance', 'fa-briefcase', 'text-info'),
+    ('Investimentos', 'fa-chart-line', 'text-info'),
+    ('Vendas', 'fa-shopping-cart', 'text-success'),
+    ('Bônus', 'fa-gift', 'text-success'),
+)
+SEM_CATEGORIA = {'id': 0, 'nome': 'Sem categoria', 'chave': '', 'icone': 'fa-tag', 'cor': 'text-secondary', 'padrao': True}
+NOME_MAX = 50
+
+
+def chave(nome):
+    """Nome normalizado usado para comparar categorias."""
+    texto = ' '.join(palavras(nome))
+    return (texto or ' '.join((nome or '').lower().split()))[:NOME_MAX]
+
+
+def criar_padroes(conexao):
+    """Insere as categorias padrão que ainda não existem. Retorna quantas foram criadas."""
+    existentes = set(conexao.execute(select(Categoria.chave).where(Categoria.usuario_id.is_(None))).scalars())
+    novas = [
+        {'usuario_id': None, 'nome': nome, 'chave': chave(nome), 'icone': icone, 'cor': cor}
+        for nome, icone, cor in PADRAO
+        if chave(nome) not in existentes
+    ]
+    if novas:
+        conexao.execute(insert(Categoria), novas)
+    return len(novas)
+
+
+def _carregar(usuario_id):
+    consulta = select(
+        Categoria.id, Categoria.nome, Categoria.chave, Categoria.icone, Categoria.cor, Categoria.usuario_id
+    ).where(or_(Categoria.usuario_id.is_(None), Categoria.usuario_id == usuario_id)).order_by(Categoria.nome)
+    return [
+        {'id': id_, 'nome': nome, 'chave': chave_, 'icone': icone, 'cor': cor, 'padrao': dono is None}
+        for id_, nome, chave_, icone, cor, dono in db.session.execute(consulta)
+    ]
+
+
+def listar(usuario_id, versao_dados=None):
+    """Categorias padrão e do usuário, como dicionários, em ordem de nome (versao_dados: ver cache.py)."""
+    return cache_usuario.obter('categorias', usuario_id, lambda: _carregar(usuario_id), versao_dados)
+
+
+def por_id(usuario_id, versao_dados=None):
+    """{id: categoria} das categorias do usuário, com 0 para sem categoria."""
+    categorias = {categoria['id']: categoria for categoria in listar(usuario_id, versao_dados)}
+    categorias[0] = SEM_CATEGORIA
+    return categorias
+
+
+def resolver(usuario_id, nome):
+    """
+    Id da categoria com o nome informado (None se vazio). Sem
+    correspondência, cria uma categoria do usuário na sessão atual.
+    """
+    nome = (nome or '').strip()[:NOME_MAX]
+    if not nome:
+        return None
+    procurada = chave(nome)
+    # Padrão antes das do usuário, que só existem para nomes que não são padrão
+    for categoria in sorted(listar(usuario_id), key=lambda c: not c['padrao']):
+        if categoria['chave'] == procurada:
+            return categoria['id']
+
+    try:
+        with db.session.begin_nested():
+            categoria = Categoria(usuario_id=usuario_id, nome=nome, chave=procurada)
+            db.session.add(categoria)
+        return categoria.id
+    except IntegrityError:
+        # Criada por outra requisição ao mesmo tempo
+        return db.session.scalar(
+            select(Categoria.id).where(Categoria.usuario_id == usuario_id, Categoria.chave == procurada)
+        )
+
+
+def com_categoria_id(usuario_id, dados, resolvidas=None):
+    """
+    Cópia de `dados` (de validar_transacao) com categoria_id no lugar do
+    nome da categoria. `resolvidas` guarda nome -> id entre chamadas (importação).
+    """
+    dados = dict(dados)
+    nome = dados.pop('categoria', None)
+    if resolvidas is None:
+        dados['categoria_id'] = resolver(usuario_id, nome)
+    else:
+        if nome not in resolvidas:
+            resolvidas[nome] = resolver(usuario_id, nome)
+        dados['categoria_id'] = resolvidas[nome]
+    return dados
+
+
+def ids_com_nome(usuario_id, nome):
+    """select() dos ids das categorias do usuário com o nome informado (para filtros)."""
+    return select(Categoria.id).where(
+        or_(Categoria.usuario_id.is_(None), Categoria.usuario_id == usuario_id),
+        Categoria.chave == chave(nome)
+    )
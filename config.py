@@ -0,0 +1,158 @@
+"""
+Configuração da aplicação, lida do ambiente.
+
+Pool de conexões (MySQL/PostgreSQL):
+- DB_POOL_SIZE / DB_MAX_OVERFLOW: por processo. Sem valor, seguem o
+  modelo de worker: cada thread do gunicorn (GUNICORN_THREADS, 1 nos
+  workers sync) usa no máximo uma conexão por vez, então o pool tem uma
+  conexão por thread e a mesma quantidade de folga para picos.
+- DB_MAX_CONEXOES: limite de conexões do servidor reservado para a
+  aplicação; dividido entre os WEB_CONCURRENCY workers.
+- DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING e
+  DB_STATEMENT_TIMEOUT_MS (0 = sem limite).
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+
+def _env_int(nome, padrao=None):
+    valor = os.getenv(nome)
+    return int(valor) if valor not in (None, '') else padrao
+
+
+def _env_bool(nome, padrao):
+    valor = os.getenv(nome)
+    if valor in (None, ''):
+        return padrao
+    return valor.strip().lower() in ('1', 'true', 'sim', 'yes', 'on')
+
+
+class PoolMedido(QueuePool):
+    """QueuePool que conta checkouts, esgotamentos e o tempo de espera por uma conexão."""
+
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self._trava_metricas = threading.Lock()
+        self._metricas = {'checkouts': 0, 'esgotamentos': 0, 'espera_total': 0.0, 'espera_maxima': 0.0}
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        esgotado = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            esgotado = True
+            raise
+        finally:
+            espera = time.perf_counter() - inicio
+            with self._trava_metricas:
+                self._metricas['checkouts'] += 1
+                self._metricas['esgotamentos'] += esgotado
+                self._metricas['espera_total'] += espera
+                self._metricas['espera_maxima'] = max(self._metricas['espera_maxima'], espera)
+
+    def metricas(self):
+        with self._trava_metricas:
+            metricas = dict(self._metricas)
+        metricas.update(
+            tamanho=self.size(),
+            em_uso=self.checkedout(),
+            overflow=max(self.overflow(), 0),
+            ociosas=self.checkedin()
+        )
+        return metricas
+
+
+def metricas_pool(engine):
+    """Métricas do pool do engine, ou None se ele não usar PoolMedido (SQLite em memória)."""
+    pool = engine.pool
+    return pool.metricas() if isinstance(pool, PoolMedido) else None
+
+
+def opcoes_engine(url, threads=None, workers=None):
+    """SQLALCHEMY_ENGINE_OPTIONS para a URL do banco, conforme as variáveis de ambiente."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+
+    if backend == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            return {}
+        # Arquivo SQLite: QueuePool (padrão do SQLAlchemy 2.0) com métricas
+        return {'poolclass': PoolMedido}
+
+    threads = threads or _env_int('GUNICORN_THREADS', 1)
+    workers = workers or _env_int('WEB_CONCURRENCY', 1)
+    tamanho = _env_int('DB_POOL_SIZE', threads)
+    folga = _env_int('DB_MAX_OVERFLOW', threads)
+
+    limite = _env_int('DB_MAX_CONEXOES')
+    if limite:
+        por_worker = max(limite // workers, 1)
+        tamanho = min(tamanho, por_worker)
+        folga = min(folga, por_worker - tamanho)
+
+    opcoes = {
+        'poolclass': PoolMedido,
+        'pool_size': tamanho,
+        'max_overflow': folga,
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 10),
+        # Abaixo do wait_timeout do MySQL e dos timeouts de proxies/balanceadores
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', 280),
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True),
+    }
+
+    timeout = _env_int('DB_STATEMENT_TIMEOUT_MS', 0)
+    if timeout:
+        if backend == 'postgresql':
+            opcoes['connect_args'] = {'options': f'-c statement_timeout={timeout}'}
+        elif backend in ('mysql', 'mariadb'):
+            # max_execution_time vale para SELECT, em milissegundos
+            opcoes['connect_args'] = {'init_command': f'SET SESSION max_execution_time={timeout}'}
+    return opcoes
+
+
+class Config:
+    SECRET_KEY = os.getenv('SECRET_KEY', 'dev-key')
+    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///finance.db')
+    SQLALCHEMY_ENGINE_OPTIONS = opcoes_engine(SQLALCHEMY_DATABASE_URI)
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    WTF_CSRF_ENABLED = True
+    WTF_CSRF_TIME_LIMIT = None
+    RELATORIOS_DIR = os.getenv('RELATORIOS_DIR')  # vazio: instance/relatorios
+    RELATORIOS_PROCESSOS = _env_int('RELATORIOS_PROCESSOS', 2)
+    RELATORIOS_VALIDADE = 300  # segundos em que um PDF pronto é reaproveitado
+    RELATORIOS_TIMEOUT = 600  # segundos até um trabalho parado ser refeito
+    RELATORIOS_RETENCAO = _env_int('RELATORIOS_RETENCAO', 3600)  # segundos até PDFs e erros saírem da pasta
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL')  # vazio: cache só no processo
+    CACHE_MAX_ITENS = _env_int('CACHE_MAX_ITENS', 1024)
+    CACHE_TTL = _env_int('CACHE_TTL', 300)
+    SESSAO_CACHE_TTL = _env_int('SESSAO_CACHE_TTL', 60)  # segundos; ver sessao_usuario.py
+    SESSAO_CACHE_MAX_ITENS = _env_int('SESSAO_CACHE_MAX_ITENS', 4096)
+    SENHA_METODO = os.getenv('SENHA_METODO', 'scrypt')  # método do Werkzeug; ver senhas.py
+    SENHA_THREADS = _env_int('SENHA_THREADS', 2)  # hashes simultâneos por processo
+    SENHA_FILA = _env_int('SENHA_FILA', 32)
+    SENHA_ESPERA = _env_int('SENHA_ESPERA', 5)  # segundos esperando vaga na fila
+    # Limites de requisições; ver limites.py
+    RATELIMIT_ENABLED = _env_bool('LIMITES_ATIVOS', True)  # 0 só para testes de carga (flask desempenho carga)
+    RATELIMIT_STORAGE_URI = os.getenv('RATELIMIT_STORAGE_URI', 'memory://')
+    RATELIMIT_IN_MEMORY_FALLBACK_ENABLED = True
+    RATELIMIT_HEADERS_ENABLED = True
+    RATELIMIT_DEFAULT = os.getenv('LIMITE_PADRAO', '300 per minute')
+    LIMITE_LOGIN_IP = os.getenv('LIMITE_LOGIN_IP', '20 per minute;100 per hour')
+    LIMITE_LOGIN_EMAIL = os.getenv('LIMITE_LOGIN_EMAIL', '5 per minute;30 per hour')
+    LIMITE_CADASTRO = os.getenv('LIMITE_CADASTRO', '5 per minute;20 per hour')
+    LIMITE_EXPORTACAO_CSV = os.getenv('LIMITE_EXPORTACAO_CSV', '10 per minute')
+    LIMITE_EXPORTACAO_PDF = os.getenv('LIMITE_EXPORTACAO_PDF', '5 per minute;30 per hour')
+    INSTRUMENTACAO = _env_bool('INSTRUMENTACAO', False)  # Server-Timing, log de lentas e /metrics
+    INSTRUMENTACAO_LENTA_MS = _env_int('INSTRUMENTACAO_LENTA_MS', 500)  # 0 = não registra lentas
+    # Se definido, /metrics exige "Authorization: Bearer"; senão, só o loopback o acessa
+    # (atrás de um proxy local, configure PROXIES_CONFIAVEIS ou o token)
+    METRICAS_TOKEN = os.getenv('METRICAS_TOKEN')
+    METAS_ALERTAS = [int(p) for p in os.getenv('METAS_ALERTAS', '80,100').split(',') if p.strip()]  # % do limite que geram alerta
+    PROXIES_CONFIAVEIS = _env_int('PROXIES_CONFIAVEIS', 0)  # proxies à frente do app (X-Forwarded-For)
+    MAX_CONTENT_LENGTH = _env_int('IMPORTACAO_MAX_MB', 32) * 1024 * 1024  # limite de upload
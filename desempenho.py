@@ -0,0 +1,439 @@
+"""
+Dados sintéticos e medições de desempenho.
+
+- `flask desempenho gerar`: cria usuários com transações realistas
+  (salário e aluguel mensais, gastos variáveis por categoria com valores
+  log-normais, 13º em dezembro, inflação ao longo dos anos). A semente
+  fixa gera sempre os mesmos dados; as transações passam pelo mesmo
+  caminho da importação, então resumo, saldos e busca ficam coerentes.
+- `flask desempenho carga`: sobe o gunicorn com N workers (ou usa --url)
+  e dispara clientes simultâneos, cada um logado com um usuário gerado.
+- `flask desempenho comparar`: compara dois resultados da carga e aponta
+  regressões no p95 (os benchmarks usam o --benchmark-compare do pytest).
+
+Os resultados da carga são gravados em JSON com o commit, o banco e os
+parâmetros da rodada, para comparar antes e depois de uma mudança. Os
+micro-benchmarks de rotas e consultas ficam em tests/benchmarks
+(pytest-benchmark), sobre os mesmos dados de gerar().
+"""
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.cookies import SimpleCookie
+from time import perf_counter
+from urllib.parse import urlencode, urlsplit
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func, select
+
+import importacao
+from extensions import db
+from models import Transacao, Usuario
+from periodos import proximo_mes
+
+SENHA = 'Carga@2024'
+DOMINIO = 'exemplo.com'
+CSRF_TOKEN = re.compile(r'name="csrf_token" value="([^"]+)"')
+
+# categoria, peso, mediana (centavos), dispersão do log do valor, descrições
+PERFIL_DESPESAS = (
+    ('Alimentação', 40, 4500, 0.8, ('Supermercado', 'Padaria', 'Restaurante', 'Feira', 'Delivery')),
+    ('Transporte', 20, 2500, 0.7, ('Combustível', 'Aplicativo de transporte', 'Ônibus', 'Estacionamento')),
+    ('Lazer', 14, 6000, 0.9, ('Cinema', 'Bar', 'Streaming', 'Viagem', 'Show')),
+    ('Saúde', 8, 9000, 1.0, ('Farmácia', 'Consulta', 'Exame')),
+    ('Moradia', 8, 15000, 0.6, ('Energia', 'Água', 'Internet', 'Condomínio')),
+    ('Educação', 5, 12000, 0.8, ('Livros', 'Curso', 'Material escolar')),
+    ('', 5, 3000, 1.0, ('Diversos', 'Presente', 'Saque')),
+)
+INFLACAO_ANUAL = 0.05
+FIXAS_POR_MES = 2  # salário e aluguel
+
+# rota, peso no sorteio da carga, caminho
+MISTURA_CARGA = (
+    ('dashboard', 45, '/dashboard'),
+    ('dashboard_periodo', 15, '/dashboard?data_inicial={inicio_ano}&data_final={hoje}'),
+    ('dashboard_busca', 10, '/dashboard?categoria=Alimenta%C3%A7%C3%A3o&busca=super'),
+    ('api_estatisticas', 10, '/api/v1/estatisticas'),
+    ('api_saldos', 5, '/api/v1/saldos?agrupamento=mes'),
+    ('export_csv', 8, '/export/csv'),
+    ('export_pdf', 2, '/export/pdf?data_inicial={inicio_ano}&data_final={hoje}'),
+    ('login', 5, None),
+)
+
+
+def email_gerado(prefixo, indice):
+    return f'{prefixo}{indice}@{DOMINIO}'
+
+
+def _meses(inicio, hoje):
+    mes = inicio.replace(day=1)
+    while mes <= hoje:
+        yield mes
+        mes = proximo_mes(mes)
+
+
+def transacoes_sinteticas(rnd, hoje, anos, por_mes):
+    """Campos brutos (formato de validar_transacao) das transações de um usuário, em ordem de data."""
+    inicio = hoje.replace(year=hoje.year - anos) + timedelta(days=1)
+    salario = rnd.lognormvariate(math.log(450000), 0.5)
+    aluguel = salario * rnd.uniform(0.2, 0.35)
+    pesos = [perfil[1] for perfil in PERFIL_DESPESAS]
+    variaveis = max(por_mes - FIXAS_POR_MES, 0)
+
+    for mes in _meses(inicio, hoje):
+        correcao = (1 + INFLACAO_ANUAL) ** ((mes - inicio).days / 365)
+        ultimo_dia = (proximo_mes(mes) - timedelta(days=1)).day
+        transacoes = [
+            (mes.replace(day=5), 'Salário', salario * correcao, 'receita', 'Salário'),
+            (mes.replace(day=10), 'Aluguel', aluguel * correcao, 'despesa', 'Moradia'),
+        ]
+        if mes.month == 12:
+            transacoes.append((mes.replace(day=20), '13º salário', salario * correcao, 'receita', 'Salário'))
+        if rnd.random() < 0.2:
+            transacoes.append((mes.replace(day=ultimo_dia), 'Rendimento', salario * rnd.uniform(0.01, 0.05), 'receita', 'Investimentos'))
+
+        # Dezembro gasta mais; o resto do mês varia em torno da média
+        media = variaveis * (1.3 if mes.month == 12 else 1.0)
+        for _ in range(max(round(rnd.gauss(media, math.sqrt(media))), 0) if media else 0):
+            categoria, _, mediana, dispersao, descricoes = rnd.choices(PERFIL_DESPESAS, pesos)[0]
+            valor = rnd.lognormvariate(math.log(mediana), dispersao) * correcao
+            transacoes.append((mes.replace(day=rnd.randint(1, ultimo_dia)), rnd.choice(descricoes), valor, 'despesa', categoria))
+
+        for dia, descricao, valor, tipo, categoria in sorted(transacoes, key=lambda t: t[0]):
+            if inicio <= dia <= hoje:
+                yield {
+                    'data': dia.isoformat(),
+                    'descricao': descricao,
+                    'valor': f'{max(round(valor), 1) / 100:.2f}',
+                    'tipo': tipo,
+                    'categoria': categoria
+                }
+
+
+def gerar(usuarios, transacoes, anos, semente, prefixo='carga', hoje=None):
+    """
+    Cria os usuários {prefixo}{i}@exemplo.com (senha SENHA) que ainda não
+    existem, cada um com cerca de `transacoes` transações em `anos` anos.
+    """
+    hoje = hoje or date.today()
+    por_mes = transacoes / (anos * 12)
+    senha_hash = None
+    resultado = {'usuarios': 0, 'importadas': 0, 'duplicadas': 0}
+    for indice in range(usuarios):
+        email = email_gerado(prefixo, indice)
+        if db.session.scalar(select(Usuario.id).where(Usuario.email == email)):
+            continue
+        usuario = Usuario(nome=f'Usuário {prefixo} {indice}', email=email)
+        # Um hash só para todos: o custo do scrypt não interessa aqui
+        if senha_hash is None:
+            usuario.set_password(SENHA)
+            senha_hash = usuario.senha_hash
+        usuario.senha_hash = senha_hash
+        db.session.add(usuario)
+        db.session.commit()
+
+        # Semente por usuário: o mesmo índice gera os mesmos dados com qualquer N
+        rnd = random.Random(f'{semente}:{indice}')
+        registros = enumerate(transacoes_sinteticas(rnd, hoje, anos, por_mes), start=1)
+        importado = importacao.importar(usuario.id, registros)
+        resultado['usuarios'] += 1
+        resultado['importadas'] += importado['importadas']
+        resultado['duplicadas'] += importado['duplicadas']
+    return resultado
+
+
+def _percentil(ordenados, p):
+    """Percentil pelo posto mais próximo, sobre uma lista ordenada."""
+    return ordenados[max(math.ceil(p / 100 * len(ordenados)) - 1, 0)]
+
+
+def resumir(duracoes, segundos=None):
+    """Estatísticas de uma lista de durações (segundos), em milissegundos."""
+    if not duracoes:
+        return {'quantidade': 0}
+    ordenados = sorted(duracoes)
+    resumo = {
+        'quantidade': len(ordenados),
+        'media_ms': round(sum(ordenados) / len(ordenados) * 1000, 3),
+        'min_ms': round(ordenados[0] * 1000, 3),
+        'p50_ms': round(_percentil(ordenados, 50) * 1000, 3),
+        'p95_ms': round(_percentil(ordenados, 95) * 1000, 3),
+        'p99_ms': round(_percentil(ordenados, 99) * 1000, 3),
+        'max_ms': round(ordenados[-1] * 1000, 3),
+    }
+    if segundos:
+        resumo['por_segundo'] = round(len(ordenados) / segundos, 2)
+    return resumo
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _cabecalho(tipo, parametros):
+    return {
+        'tipo': tipo,
+        'quando': datetime.now().isoformat(timespec='seconds'),
+        'commit': _commit_atual(),
+        'python': platform.python_version(),
+        'banco': db.engine.dialect.name,
+        'transacoes_no_banco': db.session.scalar(select(func.count(Transacao.id))),
+        'parametros': parametros,
+    }
+
+
+def _gravar(resultado, saida):
+    with open(saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+    click.echo(f'Resultado gravado em {saida}.')
+
+
+def _tabela(medicoes):
+    click.echo(f"{'medição':<28} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8}")
+    for nome, resumo in medicoes.items():
+        if not resumo.get('quantidade'):
+            click.echo(f'{nome:<28} {0:>6}')
+            continue
+        click.echo(
+            f"{nome:<28} {resumo['quantidade']:>6} {resumo['p50_ms']:>9.2f} {resumo['p95_ms']:>9.2f} "
+            f"{resumo['p99_ms']:>9.2f} {resumo.get('por_segundo', ''):>8}"
+        )
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _iniciar_gunicorn(workers, threads):
+    """Sobe o gunicorn (wsgi:app) numa porta livre, com os limites desligados; retorna (processo, url)."""
+    porta = _porta_livre()
+    ambiente = dict(os.environ, LIMITES_ATIVOS='0')
+    processo = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--threads', str(threads),
+         '--bind', f'127.0.0.1:{porta}', '--log-level', 'warning', 'wsgi:app'],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=ambiente
+    )
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise click.ClickException('O gunicorn terminou ao iniciar (está instalado?). Use --url com um servidor já rodando.')
+        try:
+            with socket.create_connection(('127.0.0.1', porta), timeout=0.5):
+                return processo, f'http://127.0.0.1:{porta}'
+        except OSError:
+            time.sleep(0.2)
+    processo.terminate()
+    raise click.ClickException('O gunicorn não respondeu em 30 s.')
+
+
+class _ClienteHttp:
+    """Cliente HTTP mínimo (biblioteca padrão): conexão persistente, cookies e sem seguir redirecionamentos."""
+
+    def __init__(self, url):
+        partes = urlsplit(url)
+        self.prefixo = partes.path.rstrip('/')
+        self.conexao = http.client.HTTPConnection(partes.hostname, partes.port or 80, timeout=60)
+        self.cookies = {}
+
+    def pedir(self, metodo, caminho, dados=None):
+        """Retorna (status, corpo) depois de ler a resposta inteira."""
+        cabecalhos = {'Cookie': '; '.join(f'{nome}={valor}' for nome, valor in self.cookies.items())}
+        corpo = None
+        if dados is not None:
+            corpo = urlencode(dados)
+            cabecalhos['Content-Type'] = 'application/x-www-form-urlencoded'
+        try:
+            self.conexao.request(metodo, self.prefixo + caminho, corpo, cabecalhos)
+            resposta = self.conexao.getresponse()
+            conteudo = resposta.read()
+        except (OSError, http.client.HTTPException):
+            self.conexao.close()  # a próxima requisição abre outra conexão
+            raise
+        for cabecalho in resposta.headers.get_all('Set-Cookie') or ():
+            for nome, morsel in SimpleCookie(cabecalho).items():
+                self.cookies[nome] = morsel.value
+        return resposta.status, conteudo
+
+    def fechar(self):
+        self.conexao.close()
+
+
+def _entrar(cliente, email):
+    """Faz o login com o token CSRF do formulário; retorna a duração do POST."""
+    _, pagina = cliente.pedir('GET', '/login')
+    token = CSRF_TOKEN.search(pagina.decode('utf-8', 'replace'))
+    inicio = perf_counter()
+    status, _ = cliente.pedir('POST', '/login', {'email': email, 'senha': SENHA, 'csrf_token': token.group(1) if token else ''})
+    duracao = perf_counter() - inicio
+    if status != 302:
+        raise RuntimeError(f'login de {email} respondeu {status}')
+    return duracao
+
+
+def carga(url, emails, clientes, duracao, aquecimento, semente):
+    """
+    Dispara `clientes` threads, cada uma logada com um dos e-mails,
+    sorteando rotas de MISTURA_CARGA por `duracao` segundos depois do
+    aquecimento. Retorna as medições por rota e no total.
+    """
+    hoje = date.today()
+    caminhos = {
+        nome: caminho.format(hoje=hoje, inicio_ano=hoje.replace(month=1, day=1)) if caminho else None
+        for nome, _, caminho in MISTURA_CARGA
+    }
+    nomes = [nome for nome, _, _ in MISTURA_CARGA]
+    pesos = [peso for _, peso, _ in MISTURA_CARGA]
+    amostras = []  # (rota, segundos, erro); list.append é seguro entre threads
+    inicio_medicao = time.monotonic() + aquecimento
+    fim = inicio_medicao + duracao
+
+    def cliente(numero):
+        rnd = random.Random(f'{semente}:{numero}')
+        email = emails[numero % len(emails)]
+        http_cliente = _ClienteHttp(url)
+        try:
+            _entrar(http_cliente, email)
+        except (OSError, http.client.HTTPException, RuntimeError):
+            amostras.append(('login', 0.0, True))
+            http_cliente.fechar()
+            return
+        while (agora := time.monotonic()) < fim:
+            rota = rnd.choices(nomes, pesos)[0]
+            erro = False
+            try:
+                if rota == 'login':
+                    segundos = _entrar(http_cliente, email)
+                else:
+                    inicio = perf_counter()
+                    status, _ = http_cliente.pedir('GET', caminhos[rota])
+                    segundos = perf_counter() - inicio
+                    erro = status >= 400
+            except (OSError, http.client.HTTPException, RuntimeError):
+                segundos, erro = 0.0, True
+            if agora >= inicio_medicao:
+                amostras.append((rota, segundos, erro))
+        http_cliente.fechar()
+
+    threads = [threading.Thread(target=cliente, args=(numero,), daemon=True) for numero in range(clientes)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    medicoes = {}
+    for rota in nomes:
+        da_rota = [amostra for amostra in amostras if amostra[0] == rota]
+        medicoes[rota] = resumir([s for _, s, erro in da_rota if not erro], duracao)
+        medicoes[rota]['erros'] = sum(1 for _, _, erro in da_rota if erro)
+    total = resumir([s for _, s, erro in amostras if not erro], duracao)
+    total['erros'] = sum(1 for _, _, erro in amostras if erro)
+    return medicoes, total
+
+
+desempenho_cli = AppGroup('desempenho', help='Dados sintéticos e medições de desempenho.')
+
+
+@desempenho_cli.command('gerar')
+@click.option('--usuarios', default=10, show_default=True, help='Quantidade de usuários.')
+@click.option('--transacoes', default=2000, show_default=True, help='Transações por usuário (aproximado).')
+@click.option('--anos', default=3, show_default=True, help='Anos de histórico até hoje.')
+@click.option('--semente', default=42, show_default=True, help='Semente do gerador.')
+@click.option('--prefixo', default='carga', show_default=True, help='Prefixo dos e-mails gerados.')
+def gerar_comando(usuarios, transacoes, anos, semente, prefixo):
+    """Cria usuários sintéticos (senha Carga@2024); os que já existem são mantidos."""
+    inicio = perf_counter()
+    resultado = gerar(usuarios, transacoes, anos, semente, prefixo)
+    click.echo(
+        f"{resultado['usuarios']} usuário(s) criado(s), {resultado['importadas']} transação(ões) "
+        f"({resultado['duplicadas']} repetida(s) descartada(s)) em {perf_counter() - inicio:.1f} s."
+    )
+
+
+@desempenho_cli.command('carga')
+@click.option('--url', help='Servidor já rodando (com LIMITES_ATIVOS=0); sem ela, sobe o gunicorn.')
+@click.option('--workers', default=4, show_default=True, help='Workers do gunicorn.')
+@click.option('--threads', default=1, show_default=True, help='Threads por worker do gunicorn.')
+@click.option('--clientes', default=8, show_default=True, help='Clientes simultâneos.')
+@click.option('--duracao', default=30, show_default=True, help='Segundos de medição.')
+@click.option('--aquecimento', default=5, show_default=True, help='Segundos descartados no início.')
+@click.option('--semente', default=42, show_default=True, help='Semente do sorteio de rotas.')
+@click.option('--prefixo', default='carga', show_default=True, help='Prefixo dos usuários gerados.')
+@click.option('--saida', type=click.Path(dir_okay=False), help='Arquivo JSON do resultado.')
+def carga_comando(url, workers, threads, clientes, duracao, aquecimento, semente, prefixo, saida):
+    """Teste de carga com clientes simultâneos: p50/p95/p99 e requisições por segundo."""
+    emails = db.session.scalars(
+        select(Usuario.email).where(Usuario.email.like(f'{prefixo}%@{DOMINIO}')).order_by(Usuario.id).limit(clientes)
+    ).all()
+    if not emails:
+        raise click.ClickException(f'Nenhum usuário gerado com o prefixo "{prefixo}"; rode flask desempenho gerar.')
+    resultado = _cabecalho('carga', {
+        'url': url, 'workers': None if url else workers, 'threads': None if url else threads,
+        'clientes': clientes, 'usuarios': len(emails), 'duracao': duracao, 'aquecimento': aquecimento,
+        'semente': semente, 'mistura': {nome: peso for nome, peso, _ in MISTURA_CARGA},
+    })
+    db.session.remove()
+
+    processo = None
+    if not url:
+        processo, url = _iniciar_gunicorn(workers, threads)
+    try:
+        resultado['medicoes'], resultado['total'] = carga(url, emails, clientes, duracao, aquecimento, semente)
+    finally:
+        if processo:
+            processo.terminate()
+            processo.wait(timeout=30)
+
+    _tabela(dict(resultado['medicoes'], total=resultado['total']))
+    if resultado['total'].get('erros'):
+        click.echo(f"{resultado['total']['erros']} requisição(ões) com erro.")
+    if saida:
+        _gravar(resultado, saida)
+
+
+@desempenho_cli.command('comparar')
+@click.argument('antes', type=click.File(encoding='utf-8'))
+@click.argument('depois', type=click.File(encoding='utf-8'))
+@click.option('--tolerancia', default=10.0, show_default=True, help='Piora do p95 (%) considerada regressão.')
+def comparar_comando(antes, depois, tolerancia):
+    """Compara dois resultados da carga; termina com erro se algum p95 piorou além da tolerância."""
+    anterior, atual = json.load(antes), json.load(depois)
+    click.echo(f"antes: {anterior.get('commit')} ({anterior.get('quando')})  depois: {atual.get('commit')} ({atual.get('quando')})")
+    click.echo(f"{'medição':<28} {'p50 antes':>10} {'p50 depois':>11} {'p95 antes':>10} {'p95 depois':>11} {'Δ p95':>8}")
+    regressoes = []
+    for nome, medicao in atual.get('medicoes', {}).items():
+        base = anterior.get('medicoes', {}).get(nome)
+        if not base or not base.get('quantidade') or not medicao.get('quantidade'):
+            continue
+        variacao = (medicao['p95_ms'] / base['p95_ms'] - 1) * 100 if base['p95_ms'] else 0.0
+        marca = '  REGRESSÃO' if variacao > tolerancia else ''
+        if marca:
+            regressoes.append(nome)
+        click.echo(
+            f"{nome:<28} {base['p50_ms']:>10.2f} {medicao['p50_ms']:>11.2f} "
+            f"{base['p95_ms']:>10.2f} {medicao['p95_ms']:>11.2f} {variacao:>+7.1f}%{marca}"
+        )
+    if regressoes:
+        raise click.ClickException(f"p95 piorou mais de {tolerancia:g}% em: {', '.join(regressoes)}.")
+
+
+def init_app(app):
+    app.cli.add_command(desempenho_cli)
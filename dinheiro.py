@@ -0,0 +1,39 @@
+"""
+Conversões de dinheiro.
+
+Os valores são guardados e somados em centavos (inteiros) no banco e no
+código; Decimal só aparece na entrada (texto digitado ou importado) e na
+saída (templates, CSV e PDF).
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+CENTAVO = Decimal('0.01')
+
+
+def para_centavos(valor):
+    """Converte texto, Decimal ou número em centavos; None se não for um valor finito."""
+    try:
+        valor = Decimal(str(valor).strip())
+        if not valor.is_finite():
+            return None
+        # quantize() também falha (InvalidOperation) para expoentes absurdos, como 1e400
+        return int(valor.quantize(CENTAVO, rounding=ROUND_HALF_UP) * 100)
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def para_decimal(centavos):
+    """Centavos como Decimal com duas casas (ex.: 1250 -> Decimal('12.50'))."""
+    centavos = Decimal(centavos or 0).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+    return (centavos / 100).quantize(CENTAVO)
+
+
+def formatar_moeda(centavos):
+    """Valor em centavos no formato brasileiro, sem o símbolo (ex.: 123456 -> '1.234,56')."""
+    texto = f'{para_decimal(centavos):,.2f}'
+    return texto.replace(',', '_').replace('.', ',').replace('_', '.')
+
+
+def init_app(app):
+    app.add_template_filter(formatar_moeda, 'moeda')
+    app.add_template_filter(para_decimal, 'decimal')
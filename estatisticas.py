@@ -0,0 +1,134 @@
+from extensions import db
+from models import ResumoMensal
+from datetime import datetime, timedelta
+from periodos import inicio_do_mes, proximo_mes
+import categorias
+import metas
+import previsao
+
+
+def _meses_referencia(hoje):
+    """Retorna (mes_atual, [os 3 meses anteriores, do mais recente]) no formato AAAA-MM."""
+    mes_atual = hoje.strftime('%Y-%m')
+    anteriores = []
+    inicio = inicio_do_mes(hoje)
+    for _ in range(3):
+        inicio = inicio_do_mes(inicio - timedelta(days=1))
+        anteriores.append(inicio.strftime('%Y-%m'))
+    return mes_atual, anteriores
+
+
+def calcular_painel(usuario_id, hoje=None, versao_dados=None):
+    """
+    Calcula todos os números do painel do usuário com uma consulta ao
+    resumo mensal (já agrupado por mês × tipo × categoria), outra à
+    previsão do mês gravada por previsao.py e outra às metas do mês, que
+    já trazem o gasto mantido por metas.py.
+
+    Retorna um dicionário com:
+    - estatisticas: o mesmo dicionário usado pelo dashboard.html
+    - categorias: nomes das categorias já usadas pelo usuário
+    - metas: progresso das metas do mês atual
+    - relatorio_mensal: resumo por mês, do mais recente para o mais antigo
+    - total_receitas / total_despesas: totais de todo o histórico
+
+    Todos os valores em dinheiro estão em centavos. Com versao_dados, as
+    categorias vêm do cache dessa versão (ver cache.CacheUsuario.obter).
+    """
+    hoje = hoje or datetime.now()
+    mes_atual, meses_anteriores = _meses_referencia(hoje)
+    mes_anterior = meses_anteriores[0]
+
+    linhas = db.session.query(
+        ResumoMensal.mes,
+        ResumoMensal.tipo,
+        ResumoMensal.categoria_id,
+        ResumoMensal.total_centavos
+    ).filter(ResumoMensal.usuario_id == usuario_id).all()
+
+    totais_mes = {}
+    gastos_categoria_atual = {}
+    usadas = set()
+
+    for mes_ano, tipo, categoria, total in linhas:
+        total = total or 0
+        if categoria:
+            usadas.add(categoria)
+
+        receitas_despesas = totais_mes.setdefault(mes_ano, {'receita': 0, 'despesa': 0})
+        if tipo in receitas_despesas:
+            receitas_despesas[tipo] += total
+
+        if tipo == 'despesa' and mes_ano == mes_atual:
+            gastos_categoria_atual[categoria] = gastos_categoria_atual.get(categoria, 0) + total
+
+    # Nomes e ícones pela lista de categorias em cache; o resumo só guarda o id
+    por_id = categorias.por_id(usuario_id, versao_dados)
+    top_categorias = []
+    for cat, total in sorted(gastos_categoria_atual.items(), key=lambda item: item[1], reverse=True)[:5]:
+        categoria = por_id.get(cat, categorias.SEM_CATEGORIA)
+        top_categorias.append({'categoria': categoria['nome'], 'icone': categoria['icone'], 'cor': categoria['cor'], 'total': total})
+
+    vazio = {'receita': 0, 'despesa': 0}
+    receitas_mes_atual = totais_mes.get(mes_atual, vazio)['receita']
+    despesas_mes_atual = totais_mes.get(mes_atual, vazio)['despesa']
+    receitas_mes_anterior = totais_mes.get(mes_anterior, vazio)['receita']
+    despesas_mes_anterior = totais_mes.get(mes_anterior, vazio)['despesa']
+
+    comparacao_mensal = {
+        'mes_atual': mes_atual,
+        'mes_anterior': mes_anterior,
+        'receitas_atual': receitas_mes_atual,
+        'receitas_anterior': receitas_mes_anterior,
+        'despesas_atual': despesas_mes_atual,
+        'despesas_anterior': despesas_mes_anterior,
+        'variacao_receitas': receitas_mes_atual - receitas_mes_anterior,
+        'variacao_despesas': despesas_mes_atual - despesas_mes_anterior
+    }
+
+    # Média mensal (não por transação) dos 3 meses completos anteriores; mês sem despesas conta como zero
+    media_despesas = sum(totais_mes.get(mes, vazio)['despesa'] for mes in meses_anteriores) // len(meses_anteriores)
+
+    # Gasto atual (resumo, sempre em dia) mais o restante estimado pelo lote de previsao.py;
+    # sem previsão gravada para o mês, extrapola o ritmo atual
+    restante = previsao.restantes(usuario_id, mes_atual).get(None)
+    if restante is not None:
+        previsao_gastos = despesas_mes_atual + restante
+    else:
+        dias_no_mes = hoje.day
+        dias_totais_mes = (proximo_mes(hoje) - timedelta(days=1)).day
+        previsao_gastos = despesas_mes_atual * dias_totais_mes // dias_no_mes if dias_no_mes > 0 else 0
+
+    metas_mes = metas.do_mes(usuario_id, mes_atual)
+    for meta in metas_mes:
+        categoria = metas.CATEGORIA_TOTAL if meta['categoria_id'] == metas.TOTAL else por_id.get(meta['categoria_id'], categorias.SEM_CATEGORIA)
+        meta.update(categoria=categoria['nome'], icone=categoria['icone'], cor=categoria['cor'])
+
+    relatorio_mensal = []
+    total_receitas_geral = 0
+    total_despesas_geral = 0
+    for mes_ano in sorted(totais_mes, reverse=True):
+        receitas = totais_mes[mes_ano]['receita']
+        despesas = totais_mes[mes_ano]['despesa']
+        relatorio_mensal.append({
+            'mes_ano': mes_ano,
+            'total_receitas': receitas,
+            'total_despesas': despesas,
+            'saldo': receitas - despesas
+        })
+        total_receitas_geral += receitas
+        total_despesas_geral += despesas
+
+    return {
+        'estatisticas': {
+            'top_categorias': top_categorias,
+            'comparacao_mensal': comparacao_mensal,
+            'previsao_gastos': previsao_gastos,
+            'media_despesas_3meses': media_despesas
+        },
+        'categorias': sorted(por_id[cat]['nome'] for cat in usadas if cat in por_id),
+        'metas': metas_mes,
+        'relatorio_mensal': relatorio_mensal,
+        'total_receitas': total_receitas_geral,
+        'total_despesas': total_despesas_geral
+    }
@@ -1,6 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from flask_wtf.csrf import CSRFProtect
 
 db = SQLAlchemy()
 login_manager = LoginManager()
-login_manager.login_view = 'login'
\ No newline at end of file
+login_manager.login_view = 'main.login'
+csrf = CSRFProtect()
@@ -0,0 +1,122 @@
+from datetime import datetime
+from sqlalchemy import case, func, select
+from models import Transacao
+from periodos import no_periodo
+from busca import corresponde, palavras
+import categorias
+import saldos
+
+TIPOS_VALIDOS = ('receita', 'despesa')
+
+
+class TransacaoFilter:
+    """
+    Filtros de transação (período, tipo, categoria e busca) de um usuário.
+
+    Os argumentos são lidos e validados uma vez; select() gera a consulta
+    com os valores como parâmetros, de modo que a mesma combinação de
+    filtros reaproveita o SQL compilado em cache pelo SQLAlchemy.
+    """
+
+    def __init__(self, usuario_id, data_inicial=None, data_final=None, tipo=None, categoria=None, busca=None):
+        self.usuario_id = usuario_id
+        self.data_inicial = data_inicial
+        self.data_final = data_final
+        self.tipo = tipo
+        self.categoria = categoria
+        self.busca = busca
+        self.erros = []
+
+    @classmethod
+    def from_args(cls, usuario_id, args):
+        """Cria o filtro a partir de request.args (ou outro dicionário de strings)."""
+        filtro = cls(usuario_id)
+
+        for campo, rotulo in (('data_inicial', 'Data Inicial'), ('data_final', 'Data Final')):
+            valor = args.get(campo)
+            if valor:
+                try:
+                    setattr(filtro, campo, datetime.strptime(valor, '%Y-%m-%d').date())
+                except ValueError:
+                    filtro.erros.append(f'Formato de {rotulo} inválido.')
+
+        tipo = args.get('tipo')
+        if tipo in TIPOS_VALIDOS:
+            filtro.tipo = tipo
+
+        categoria = args.get('categoria')
+        if categoria and categoria != 'todas':
+            filtro.categoria = categoria
+
+        busca = (args.get('busca') or '').strip()
+        if palavras(busca):
+            filtro.busca = busca
+
+        return filtro
+
+    def as_args(self):
+        """Filtros como strings, no formato aceito por from_args (para links e templates)."""
+        return {
+            'data_inicial': self.data_inicial.strftime('%Y-%m-%d') if self.data_inicial else None,
+            'data_final': self.data_final.strftime('%Y-%m-%d') if self.data_final else None,
+            'tipo': self.tipo,
+            'categoria': self.categoria,
+            'busca': self.busca
+        }
+
+    @property
+    def tem_periodo(self):
+        return bool(self.data_inicial and self.data_final)
+
+    @property
+    def tem_filtros(self):
+        """Indica se há filtros além do período."""
+        return bool(self.tipo or self.categoria or self.busca)
+
+    def condicoes(self):
+        """Lista de condições WHERE para Transacao."""
+        condicoes = [Transacao.usuario_id == self.usuario_id]
+
+        if self.data_inicial or self.data_final:
+            condicoes.append(no_periodo(Transacao.data, self.data_inicial, self.data_final))
+
+        if self.tipo:
+            condicoes.append(Transacao.tipo == self.tipo)
+
+        if self.categoria:
+            condicoes.append(Transacao.categoria_id.in_(categorias.ids_com_nome(self.usuario_id, self.categoria)))
+
+        if self.busca:
+            condicoes.append(corresponde(self.usuario_id, self.busca))
+
+        return condicoes
+
+    def select(self, *colunas):
+        """select() das transações filtradas; sem colunas, seleciona a entidade Transacao."""
+        return select(*(colunas or (Transacao,))).where(*self.condicoes())
+
+    def select_totais(self):
+        """
+        select() com total de receitas, total de despesas (em centavos) e
+        quantidade das transações filtradas, calculados pelo banco em uma
+        única consulta.
+        """
+        def soma(tipo):
+            return func.coalesce(func.sum(case((Transacao.tipo == tipo, Transacao.valor_centavos), else_=0)), 0)
+
+        return select(
+            soma('receita').label('total_receitas'),
+            soma('despesa').label('total_despesas'),
+            func.count(Transacao.id).label('quantidade')
+        ).where(*self.condicoes())
+
+    def totais(self, conexao):
+        """
+        Totais na sessão ou conexão informada, como dicionário. Só com o
+        período, vêm de duas buscas no saldo diário; com outros filtros,
+        de select_totais().
+        """
+        if not self.tem_filtros:
+            return saldos.totais_periodo(conexao, self.usuario_id, self.data_inicial, self.data_final)
+        # int(): no PostgreSQL, SUM de BIGINT vem como numeric (Decimal)
+        return {chave: int(valor) for chave, valor in conexao.execute(self.select_totais()).one()._mapping.items()}
@@ -0,0 +1,270 @@
+"""
+Importação em lote de transações a partir de arquivos CSV ou OFX.
+
+Os arquivos são lidos em streaming e gravados em lotes: cada lote é um
+INSERT com vários conjuntos de parâmetros, seguido da atualização do
+resumo mensal e do índice de busca na mesma transação. Como o INSERT não
+passa pelo ORM, os listeners de flush não rodam e essas atualizações (a
+versão dos dados do usuário e a invalidação do cache) são feitas aqui.
+"""
+import csv
+import html
+import os
+import re
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func, insert, select
+
+import busca
+import categorias
+import metas
+import pendencias
+import resumo
+import saldos
+from cache import cache_usuario, incrementar_versao_dados
+from extensions import db
+from models import Transacao, Usuario
+from validacao import validar_transacao
+
+LOTE = 5000
+BLOCO_LEITURA = 64 * 1024
+EXTENSOES_OFX = ('.ofx', '.qfx')
+
+# Nomes de coluna aceitos no CSV (sem acentos, em minúsculas)
+COLUNAS_CSV = {
+    'data': 'data',
+    'descricao': 'descricao',
+    'historico': 'descricao',
+    'tipo': 'tipo',
+    'categoria': 'categoria',
+    'valor': 'valor',
+}
+COLUNAS_OBRIGATORIAS = ('data', 'descricao', 'valor')
+
+TAG_OFX = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+DATA_BR = re.compile(r'^(\d{2})/(\d{2})/(\d{4})$')
+
+
+def _normalizar_data(texto):
+    """'31/01/2025' vira '2025-01-31'; a validação da data fica com validar_transacao()."""
+    texto = (texto or '').strip()
+    data = DATA_BR.match(texto)
+    return f'{data[3]}-{data[2]}-{data[1]}' if data else texto
+
+
+def _normalizar_valor(texto):
+    """'R$ 1.234,56' ou '-12.50' viram Decimal; o que não for número volta como veio."""
+    texto = (texto or '').replace('R$', '').replace(' ', '').strip()
+    if ',' in texto:
+        texto = texto.replace('.', '').replace(',', '.')
+    try:
+        valor = Decimal(texto)
+    except InvalidOperation:
+        return texto
+    return valor if valor.is_finite() else texto
+
+
+def _registro(data=None, descricao=None, valor=None, tipo=None, categoria=None):
+    """Campos brutos no formato de validar_transacao(); sem tipo, o sinal do valor decide."""
+    valor = _normalizar_valor(valor)
+    tipo = (tipo or '').strip().lower()
+    if isinstance(valor, Decimal):
+        if not tipo:
+            tipo = 'despesa' if valor < 0 else 'receita'
+        valor = abs(valor)
+    categoria = (categoria or '').strip()
+    if categoria.lower() == 'sem categoria':
+        categoria = ''
+    return {
+        'data': _normalizar_data(data),
+        'descricao': descricao,
+        'valor': valor,
+        'tipo': tipo,
+        'categoria': categoria
+    }
+
+
+def ler_csv(arquivo):
+    """
+    Gera (linha, campos) para cada linha do CSV. Aceita o formato da
+    exportação (Data, Descrição, Tipo, Categoria, Valor), separador , ou ;
+    e valores com sinal no lugar da coluna Tipo.
+    """
+    cabecalho = arquivo.readline()
+    delimitador = ';' if cabecalho.count(';') > cabecalho.count(',') else ','
+    nomes = [
+        COLUNAS_CSV.get('_'.join(busca.palavras(nome)))
+        for nome in next(csv.reader([cabecalho], delimiter=delimitador), [])
+    ]
+    faltando = [coluna for coluna in COLUNAS_OBRIGATORIAS if coluna not in nomes]
+    if faltando:
+        raise ValueError(f"Cabeçalho do CSV sem a(s) coluna(s): {', '.join(faltando)}.")
+
+    leitor = csv.reader(arquivo, delimiter=delimitador)
+    for campos in leitor:
+        if not any(campo.strip() for campo in campos):
+            continue
+        # +1: a primeira linha do arquivo é o cabeçalho
+        yield leitor.line_num + 1, _registro(**{nome: campo for nome, campo in zip(nomes, campos) if nome})
+
+
+def _registro_ofx(campos):
+    data = campos.get('DTPOSTED', '')[:8]
+    if len(data) == 8:
+        data = f'{data[:4]}-{data[4:6]}-{data[6:]}'
+    return _registro(
+        data=data,
+        descricao=campos.get('MEMO') or campos.get('NAME'),
+        valor=campos.get('TRNAMT')
+    )
+
+
+def ler_ofx(arquivo):
+    """Gera (número, campos) para cada <STMTTRN> de um extrato OFX (SGML ou XML)."""
+    atual = None
+    numero = 0
+    resto = ''
+    while True:
+        pedaco = arquivo.read(BLOCO_LEITURA)
+        texto = resto + pedaco
+        resto = ''
+        if pedaco:
+            # Uma tag pode ter ficado cortada no fim do bloco: processa só até o último '<'
+            corte = texto.rfind('<')
+            if corte <= 0:
+                resto = texto
+                continue
+            texto, resto = texto[:corte], texto[corte:]
+
+        for fechamento, tag, valor in TAG_OFX.findall(texto):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if fechamento and atual is not None:
+                    numero += 1
+                    yield numero, _registro_ofx(atual)
+                atual = None if fechamento else {}
+            elif atual is not None and not fechamento:
+                atual[tag] = html.unescape(valor.strip())
+
+        if not pedaco:
+            break
+
+
+def ler_arquivo(nome_arquivo, arquivo):
+    """Escolhe o leitor pela extensão do arquivo."""
+    if os.path.splitext(nome_arquivo or '')[1].lower() in EXTENSOES_OFX:
+        return ler_ofx(arquivo)
+    return ler_csv(arquivo)
+
+
+def _gravar_lote(usuario_id, lote, resultado, vistos):
+    # Quantas transações já gravadas há de cada chave (data, valor, descricao):
+    # cada data é consultada no banco uma única vez por importação
+    datas = {dados['data'] for dados in lote} - vistos['datas']
+    if datas:
+        vistos['chaves'].update({
+            (data, valor_centavos, descricao): quantidade
+            for data, valor_centavos, descricao, quantidade in db.session.execute(
+                select(Transacao.data, Transacao.valor_centavos, Transacao.descricao, func.count()).where(
+                    Transacao.usuario_id == usuario_id,
+                    Transacao.data.in_(datas)
+                ).group_by(Transacao.data, Transacao.valor_centavos, Transacao.descricao)
+            )
+        })
+        vistos['datas'].update(datas)
+    existentes = vistos['chaves']
+
+    novas = []
+    for dados in lote:
+        # Cada linha repetida consome uma transação já gravada com a mesma
+        # chave. Duas compras iguais no mesmo dia entram as duas, e importar
+        # o mesmo arquivo de novo não grava nada
+        chave = (dados['data'], dados['valor_centavos'], dados['descricao'])
+        if existentes[chave]:
+            existentes[chave] -= 1
+            resultado['duplicadas'] += 1
+            continue
+        # Cada nome de categoria é resolvido uma vez por importação
+        novas.append(dict(categorias.com_categoria_id(usuario_id, dados, vistos['categorias']), usuario_id=usuario_id))
+
+    if not novas:
+        return
+
+    conexao = db.session.connection()
+    tabela = Transacao.__table__
+    if conexao.dialect.insert_executemany_returning_sort_by_parameter_order:
+        ids = conexao.execute(
+            insert(tabela).returning(tabela.c.id, sort_by_parameter_order=True), novas
+        ).scalars().all()
+        busca.indexar(conexao, incluir=[
+            (id_, usuario_id, dados['descricao']) for id_, dados in zip(ids, novas)
+        ])
+    else:
+        # Sem RETURNING em lote (MySQL): o índice FULLTEXT não precisa dos ids
+        conexao.execute(insert(tabela), novas)
+    variacoes = [(dados, 1) for dados in novas]
+    resumo.aplicar_variacoes(conexao, variacoes)
+    saldos.aplicar_variacoes(conexao, variacoes)
+    pendencias.adicionar(db.session(), 'alertas_metas', metas.aplicar_variacoes(conexao, variacoes))
+    incrementar_versao_dados(conexao, {usuario_id})
+    db.session.commit()
+    resultado['importadas'] += len(novas)
+
+
+def importar(usuario_id, registros, lote=LOTE):
+    """
+    Valida e grava os registros (pares (linha, campos) de ler_csv/ler_ofx)
+    em lotes, cada um confirmado com um commit. Linhas inválidas ou já
+    gravadas (ver _gravar_lote) são puladas sem interromper a importação.
+    Retorna {'importadas', 'duplicadas', 'erros'}, com erros como (linha, mensagem).
+    """
+    resultado = {'importadas': 0, 'duplicadas': 0, 'erros': []}
+    vistos = {'datas': set(), 'chaves': Counter(), 'categorias': {}}
+    pendentes = []
+    try:
+        for numero, campos in registros:
+            dados, erro = validar_transacao(**campos)
+            if erro:
+                resultado['erros'].append((numero, erro))
+                continue
+            pendentes.append(dados)
+            if len(pendentes) >= lote:
+                _gravar_lote(usuario_id, pendentes, resultado, vistos)
+                pendentes = []
+        if pendentes:
+            _gravar_lote(usuario_id, pendentes, resultado, vistos)
+    finally:
+        if resultado['importadas']:
+            cache_usuario.invalidar(usuario_id)
+    return resultado
+
+
+importacao_cli = AppGroup('importacao', help='Importação de transações em lote.')
+
+
+@importacao_cli.command('importar')
+@click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+@click.option('--usuario', type=int, required=True, help='Id do usuário dono das transações.')
+@click.option('--codificacao', default='utf-8-sig', show_default=True, help='Codificação do arquivo.')
+def importar_comando(arquivo, usuario, codificacao):
+    """Importa um arquivo CSV ou OFX para as transações do usuário."""
+    if db.session.get(Usuario, usuario) is None:
+        raise click.ClickException('Usuário não encontrado.')
+    with open(arquivo, encoding=codificacao, errors='replace', newline='') as entrada:
+        try:
+            resultado = importar(usuario, ler_arquivo(arquivo, entrada))
+        except (ValueError, csv.Error) as e:
+            raise click.ClickException(str(e))
+    for numero, erro in resultado['erros']:
+        click.echo(f'Linha {numero}: {erro}')
+    click.echo(
+        f"{resultado['importadas']} importada(s), {resultado['duplicadas']} duplicada(s), "
+        f"{len(resultado['erros'])} com erro."
+    )
+
+
+def init_app(app):
+    app.cli.add_command(importacao_cli)
@@ -0,0 +1,256 @@
+"""
+Medição de desempenho por requisição.
+
+Com INSTRUMENTACAO ligada, cada requisição conta as consultas SQL e o
+tempo gasto nelas, na renderização de templates e no restante (Python),
+e devolve os números no cabeçalho Server-Timing. Requisições acima de
+INSTRUMENTACAO_LENTA_MS vão para o log com as consultas agrupadas pelo
+texto do SQL (os valores já vão como parâmetros). /metrics expõe os
+acumulados no formato texto do Prometheus, junto com o pool de conexões,
+o cache e os limites de requisições. Sem METRICAS_TOKEN, a rota só
+responde a requisições do loopback; de qualquer outro endereço, 404.
+
+Desligada, init_app() não registra nada: nenhum listener, hook ou rota.
+Os números são de cada processo; com vários workers, cada coleta do
+Prometheus vê um deles (o rótulo pid distingue).
+
+Em respostas em streaming (exportação CSV) só entra o que rodou antes do
+primeiro byte.
+"""
+import hmac
+import ipaddress
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from flask import Response, abort, current_app, g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import limites
+from cache import cache_usuario
+from config import metricas_pool
+from extensions import db
+
+FAIXAS_DURACAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CONSULTAS_NO_LOG = 5
+# Listas de parâmetros expandidas (IN (?, ?, ...)) viram uma única marca
+LISTA_PARAMETROS = re.compile(r'\((?:\s*(?:\?|%s|%\(\w+\)s)\s*,)+\s*(?:\?|%s|%\(\w+\)s)\s*\)')
+ESPACOS = re.compile(r'\s+')
+
+_trava = threading.Lock()
+_metricas = {
+    'requisicoes': Counter(),  # (endpoint, método, status)
+    'duracao': defaultdict(lambda: [0.0, [0] * len(FAIXAS_DURACAO)]),  # endpoint: [soma, faixas]
+    'consultas': Counter(),
+    'sql_segundos': Counter(),
+    'template_segundos': Counter(),
+    'lentas': Counter(),
+}
+_registrado = False
+
+
+def impressao_digital(sql):
+    """SQL normalizado para agrupar consultas iguais com parâmetros diferentes."""
+    return LISTA_PARAMETROS.sub('(?...)', ESPACOS.sub(' ', sql).strip())[:300]
+
+
+def _medicao():
+    return g.get('_medicao') if has_request_context() else None
+
+
+def _antes_consulta(conexao, cursor, sql, parametros, contexto, executemany):
+    if _medicao() is not None:
+        conexao.info.setdefault('_inicio_consulta', []).append(time.perf_counter())
+
+
+def _depois_consulta(conexao, cursor, sql, parametros, contexto, executemany):
+    medicao = _medicao()
+    inicios = conexao.info.get('_inicio_consulta')
+    if medicao is None or not inicios:
+        return
+    duracao = time.perf_counter() - inicios.pop()
+    medicao['consultas'] += 1
+    medicao['sql'] += duracao
+    if medicao['guardar_sql']:
+        medicao['por_sql'][sql][0] += 1
+        medicao['por_sql'][sql][1] += duracao
+
+
+def _antes_template(app, template, context, **extra):
+    medicao = _medicao()
+    if medicao is not None:
+        medicao['_inicio_template'] = time.perf_counter()
+
+
+def _depois_template(app, template, context, **extra):
+    medicao = _medicao()
+    if medicao is not None and '_inicio_template' in medicao:
+        medicao['template'] += time.perf_counter() - medicao.pop('_inicio_template')
+
+
+def _iniciar():
+    g._medicao = {
+        'inicio': time.perf_counter(),
+        'consultas': 0,
+        'sql': 0.0,
+        'template': 0.0,
+        'guardar_sql': current_app.config['INSTRUMENTACAO_LENTA_MS'] > 0,
+        'por_sql': defaultdict(lambda: [0, 0.0]),
+    }
+
+
+def _registrar_lenta(medicao, total, resposta):
+    por_impressao = defaultdict(lambda: [0, 0.0])
+    for sql, (quantidade, duracao) in medicao['por_sql'].items():
+        item = por_impressao[impressao_digital(sql)]
+        item[0] += quantidade
+        item[1] += duracao
+    principais = sorted(por_impressao.items(), key=lambda item: item[1][1], reverse=True)[:CONSULTAS_NO_LOG]
+    current_app.logger.warning(
+        'Requisição lenta: %s %s -> %s em %.0f ms (%d consultas, SQL %.0f ms, templates %.0f ms)%s',
+        request.method, request.full_path.rstrip('?'), resposta.status_code, total * 1000,
+        medicao['consultas'], medicao['sql'] * 1000, medicao['template'] * 1000,
+        ''.join(f'\n  {quantidade}x {duracao * 1000:.1f} ms: {sql}' for sql, (quantidade, duracao) in principais)
+    )
+
+
+def _finalizar(resposta):
+    medicao = g.pop('_medicao', None)
+    if medicao is None:
+        return resposta
+    total = time.perf_counter() - medicao['inicio']
+    python = max(total - medicao['sql'] - medicao['template'], 0.0)
+    resposta.headers.add(
+        'Server-Timing',
+        f"sql;dur={medicao['sql'] * 1000:.1f};desc=\"{medicao['consultas']} consultas\", "
+        f"tpl;dur={medicao['template'] * 1000:.1f}, "
+        f"app;dur={python * 1000:.1f}, "
+        f"total;dur={total * 1000:.1f}"
+    )
+
+    endpoint = request.endpoint or 'desconhecido'
+    lenta = medicao['guardar_sql'] and total * 1000 >= current_app.config['INSTRUMENTACAO_LENTA_MS']
+    with _trava:
+        _metricas['requisicoes'][(endpoint, request.method, resposta.status_code)] += 1
+        duracao = _metricas['duracao'][endpoint]
+        duracao[0] += total
+        for i, limite in enumerate(FAIXAS_DURACAO):
+            if total <= limite:
+                duracao[1][i] += 1
+        _metricas['consultas'][endpoint] += medicao['consultas']
+        _metricas['sql_segundos'][endpoint] += medicao['sql']
+        _metricas['template_segundos'][endpoint] += medicao['template']
+        if lenta:
+            _metricas['lentas'][endpoint] += 1
+    if lenta:
+        _registrar_lenta(medicao, total, resposta)
+    return resposta
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _rotulos(**valores):
+    return '{' + ','.join(f'{nome}="{_escapar(valor)}"' for nome, valor in valores.items()) + '}'
+
+
+def texto_metricas():
+    """Métricas deste processo no formato texto do Prometheus."""
+    pid = os.getpid()
+    linhas = []
+
+    def metrica(nome, tipo, ajuda, valores):
+        linhas.append(f'# HELP {nome} {ajuda}')
+        linhas.append(f'# TYPE {nome} {tipo}')
+        for rotulos, valor in valores:
+            linhas.append(f'{nome}{_rotulos(pid=pid, **rotulos)} {valor}')
+
+    with _trava:
+        requisicoes = dict(_metricas['requisicoes'])
+        duracoes = {endpoint: (soma, list(faixas)) for endpoint, (soma, faixas) in _metricas['duracao'].items()}
+        contadores = {nome: dict(_metricas[nome]) for nome in ('consultas', 'sql_segundos', 'template_segundos', 'lentas')}
+
+    metrica('gestao_requisicoes_total', 'counter', 'Requisições atendidas.', [
+        ({'endpoint': endpoint, 'metodo': metodo, 'status': status}, quantidade)
+        for (endpoint, metodo, status), quantidade in sorted(requisicoes.items())
+    ])
+
+    linhas.append('# HELP gestao_requisicao_segundos Duração das requisições.')
+    linhas.append('# TYPE gestao_requisicao_segundos histogram')
+    for endpoint, (soma, faixas) in sorted(duracoes.items()):
+        quantidade = sum(q for (e, _, _), q in requisicoes.items() if e == endpoint)
+        for limite, acumulado in zip(FAIXAS_DURACAO, faixas):
+            linhas.append(f'gestao_requisicao_segundos_bucket{_rotulos(pid=pid, endpoint=endpoint, le=limite)} {acumulado}')
+        linhas.append(f'gestao_requisicao_segundos_bucket{_rotulos(pid=pid, endpoint=endpoint, le="+Inf")} {quantidade}')
+        linhas.append(f'gestao_requisicao_segundos_sum{_rotulos(pid=pid, endpoint=endpoint)} {soma:.6f}')
+        linhas.append(f'gestao_requisicao_segundos_count{_rotulos(pid=pid, endpoint=endpoint)} {quantidade}')
+
+    for nome, ajuda in (
+        ('consultas', 'Consultas SQL executadas.'),
+        ('sql_segundos', 'Tempo gasto em consultas SQL.'),
+        ('template_segundos', 'Tempo gasto renderizando templates.'),
+        ('lentas', 'Requisições acima de INSTRUMENTACAO_LENTA_MS.'),
+    ):
+        metrica(f'gestao_{nome}_total', 'counter', ajuda, [
+            ({'endpoint': endpoint}, round(valor, 6)) for endpoint, valor in sorted(contadores[nome].items())
+        ])
+
+    pool = metricas_pool(db.engine)
+    if pool:
+        metrica('gestao_pool_conexoes', 'gauge', 'Conexões do pool por estado.', [
+            ({'estado': estado}, pool[estado]) for estado in ('tamanho', 'em_uso', 'overflow', 'ociosas')
+        ])
+        metrica('gestao_pool_checkouts_total', 'counter', 'Conexões retiradas do pool.', [({}, pool['checkouts'])])
+        metrica('gestao_pool_esgotamentos_total', 'counter', 'Esperas por conexão que estouraram o timeout.', [({}, pool['esgotamentos'])])
+        metrica('gestao_pool_espera_segundos_total', 'counter', 'Tempo esperando conexão livre.', [({}, round(pool['espera_total'], 6))])
+
+    metrica('gestao_cache_total', 'counter', 'Consultas ao cache do painel por resultado.', [
+        ({'resultado': resultado}, quantidade) for resultado, quantidade in sorted(cache_usuario.estatisticas().items())
+    ])
+
+    metrica('gestao_requisicoes_limitadas_total', 'counter', 'Requisições recusadas pelos limites.', [
+        ({'endpoint': endpoint}, quantidade) for endpoint, quantidade in sorted(limites.estatisticas()['recusadas'].items())
+    ])
+
+    return '\n'.join(linhas) + '\n'
+
+
+def _do_loopback():
+    try:
+        return ipaddress.ip_address(request.remote_addr or '').is_loopback
+    except ValueError:
+        return False
+
+
+def metricas():
+    token = current_app.config.get('METRICAS_TOKEN')
+    if token:
+        if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+            abort(401)
+    elif not _do_loopback():
+        # Negado por padrão: fora do loopback, a rota nem parece existir
+        abort(404)
+    return Response(texto_metricas(), mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app):
+    """Liga a instrumentação se INSTRUMENTACAO estiver ativa; senão não registra nada."""
+    global _registrado
+    if not app.config.get('INSTRUMENTACAO'):
+        return
+
+    app.before_request(_iniciar)
+    app.after_request(_finalizar)
+    before_render_template.connect(_antes_template, app)
+    template_rendered.connect(_depois_template, app)
+    app.add_url_rule('/metrics', 'metricas', limites.limiter.exempt(metricas))
+
+    with _trava:
+        if not _registrado:
+            event.listen(Engine, 'before_cursor_execute', _antes_consulta)
+            event.listen(Engine, 'after_cursor_execute', _depois_consulta)
+            _registrado = True
@@ -0,0 +1,78 @@
+"""
+Limites de requisições (Flask-Limiter).
+
+Toda rota tem o orçamento padrão (RATELIMIT_DEFAULT), contado por
+usuário logado ou, sem login, por IP. Login, cadastro e exportações têm
+orçamentos próprios e mais curtos, porque cada requisição custa um hash
+de senha ou uma consulta/relatório inteiro:
+- login: por IP e pelo e-mail tentado (LIMITE_LOGIN_IP, LIMITE_LOGIN_EMAIL)
+- cadastro: por IP (LIMITE_CADASTRO)
+- exportação CSV e PDF: por usuário (LIMITE_EXPORTACAO_CSV, LIMITE_EXPORTACAO_PDF)
+
+Os contadores ficam em RATELIMIT_STORAGE_URI. O padrão 'memory://' conta
+em cada processo (com N workers, o limite efetivo é N vezes maior); em
+produção use o Redis, por exemplo 'redis://localhost:6379/1'. Se ele cair,
+os limites passam a ser contados em memória até ele voltar.
+"""
+import threading
+from collections import Counter
+
+from flask import current_app, flash, jsonify, render_template, request
+from flask_limiter import Limiter, RateLimitExceeded
+from flask_limiter.util import get_remote_address
+from flask_login import current_user
+
+_recusadas = Counter()
+_trava = threading.Lock()
+
+
+def por_ip():
+    return f'ip:{get_remote_address()}'
+
+
+def por_usuario():
+    """Usuário logado; sem login, o IP."""
+    if current_user.is_authenticated:
+        return f'usuario:{current_user.id}'
+    return por_ip()
+
+
+def por_email():
+    """E-mail informado no login, para limitar tentativas contra a mesma conta."""
+    return f"email:{request.form.get('email', '').strip().lower()}"
+
+
+def limite(nome):
+    """Lê o limite da configuração a cada requisição (ex.: limite('LIMITE_LOGIN_IP'))."""
+    return lambda: current_app.config[nome]
+
+
+def registrar_recusa(limite_requisicao):
+    """on_breach do Limiter: conta as requisições recusadas por rota."""
+    with _trava:
+        _recusadas[request.endpoint or 'desconhecida'] += 1
+    return None
+
+
+limiter = Limiter(key_func=por_usuario, on_breach=registrar_recusa)
+
+
+def estatisticas():
+    """Requisições recusadas por rota, neste processo."""
+    with _trava:
+        recusadas = dict(_recusadas)
+    return {'recusadas': recusadas, 'total_recusadas': sum(recusadas.values())}
+
+
+def _resposta_limite(erro):
+    # O Limiter acrescenta Retry-After e X-RateLimit-* à resposta
+    mensagem = 'Muitas requisições. Tente novamente em instantes.'
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'erro': mensagem, 'limite': str(erro.limit.limit)}), 429
+    flash(mensagem, 'error')
+    return render_template('base.html'), 429
+
+
+def init_app(app):
+    limiter.init_app(app)
+    app.register_error_handler(RateLimitExceeded, _resposta_limite)
@@ -0,0 +1,243 @@
+"""
+Metas de gastos por usuário, mês e categoria (categoria_id 0: todas as despesas).
+
+Cada Meta guarda o gasto do mês (gasto_centavos), mantido no after_flush
+como o resumo mensal: uma despesa gravada soma na meta da categoria e na
+meta total do mês com um UPDATE, sem somar transações. Saber se uma meta
+estourou, ou mostrar o progresso de todas, é ler as linhas de Meta.
+
+Os alertas são as porcentagens de METAS_ALERTAS (ex.: 80 e 100). A
+gravação que faz o gasto passar de uma delas dispara o alerta uma vez
+(ultimo_alerta guarda a maior já avisada; se o gasto voltar a cair, o
+alerta pode disparar de novo). O aviso é dado depois do commit: flash na
+próxima página do site, g.alertas_metas para a resposta da API e o log.
+"""
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app, flash, g, has_app_context, has_request_context, request
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, event, func, literal, select, update
+from sqlalchemy.orm import Session
+
+import pendencias
+import resumo
+from dinheiro import formatar_moeda
+from extensions import db
+from models import Categoria, Meta, ResumoMensal
+from periodos import inicio_do_mes
+
+ALERTAS_PADRAO = (80, 100)
+TOTAL = 0  # categoria_id da meta de todas as despesas
+CATEGORIA_TOTAL = {'id': TOTAL, 'nome': 'Todas as despesas', 'icone': 'fa-wallet', 'cor': 'text-dark'}
+
+_alertas = ALERTAS_PADRAO
+_tabela = Meta.__table__
+_chave = (
+    (_tabela.c.usuario_id == bindparam('chave_usuario_id')) &
+    (_tabela.c.mes == bindparam('chave_mes')) &
+    _tabela.c.categoria_id.in_([bindparam('chave_categoria_id'), literal(TOTAL)])
+)
+SOMAR = update(_tabela).where(_chave).values(gasto_centavos=_tabela.c.gasto_centavos + bindparam('variacao'))
+AFETADAS = select(
+    _tabela.c.id, _tabela.c.usuario_id, _tabela.c.mes, _tabela.c.limite_centavos,
+    _tabela.c.gasto_centavos, _tabela.c.ultimo_alerta, Categoria.nome
+).select_from(_tabela.outerjoin(Categoria, _tabela.c.categoria_id == Categoria.id)).where(_chave)
+MARCAR_ALERTA = update(_tabela).where(_tabela.c.id == bindparam('chave_id')).values(ultimo_alerta=bindparam('nivel'))
+
+
+def nivel(gasto_centavos, limite_centavos, alertas=None):
+    """Maior porcentagem de alerta já atingida pelo gasto (0 se nenhuma)."""
+    alertas = alertas or _alertas
+    return max((p for p in alertas if gasto_centavos * 100 >= p * limite_centavos), default=0)
+
+
+def _variacoes_despesas(variacoes):
+    """Soma as variações de despesas por (usuario_id, mês, categoria_id)."""
+    por_chave = {}
+    for valores, sinal in variacoes:
+        if valores['tipo'] != 'despesa' or valores['data'] is None:
+            continue
+        chave = (valores['usuario_id'], valores['data'].strftime('%Y-%m'), valores['categoria_id'] or TOTAL)
+        por_chave[chave] = por_chave.get(chave, 0) + sinal * valores['valor_centavos']
+    return por_chave
+
+
+def aplicar_variacoes(conexao, variacoes):
+    """
+    Soma as variações de despesas nas metas afetadas e retorna os alertas
+    disparados, como dicionários (meta_id, usuario_id, mes, categoria,
+    percentual, gasto_centavos, limite_centavos).
+    """
+    alertas = []
+    for (usuario_id, mes, categoria_id), variacao in sorted(_variacoes_despesas(variacoes).items()):
+        if not variacao:
+            continue
+        chave = {'chave_usuario_id': usuario_id, 'chave_mes': mes, 'chave_categoria_id': categoria_id}
+        # Sem meta para a categoria nem total no mês: um UPDATE que não acha nada
+        if not conexao.execute(SOMAR, dict(chave, variacao=variacao)).rowcount:
+            continue
+        for meta_id, uid, mes_meta, limite, gasto, ultimo, nome in conexao.execute(AFETADAS, chave):
+            atual = nivel(gasto, limite)
+            if atual == ultimo:
+                continue
+            conexao.execute(MARCAR_ALERTA, {'chave_id': meta_id, 'nivel': atual})
+            if atual > ultimo:
+                alertas.append({
+                    'meta_id': meta_id, 'usuario_id': uid, 'mes': mes_meta,
+                    'categoria': nome or CATEGORIA_TOTAL['nome'], 'percentual': atual,
+                    'gasto_centavos': gasto, 'limite_centavos': limite
+                })
+    return alertas
+
+
+def mensagem(alerta):
+    return (
+        f"Meta de {alerta['categoria']} em {alerta['mes']}: {alerta['percentual']}% atingido "
+        f"(R$ {formatar_moeda(alerta['gasto_centavos'])} de R$ {formatar_moeda(alerta['limite_centavos'])})."
+    )
+
+
+@event.listens_for(Session, 'after_flush')
+def _atualizar_metas(session, flush_context):
+    variacoes = resumo.variacoes_transacoes(session)
+    if variacoes:
+        pendencias.adicionar(session, 'alertas_metas', aplicar_variacoes(session.connection(), variacoes))
+
+
+# Só avisa depois do commit: num rollback, mesmo que só de um savepoint, o gasto não mudou
+@event.listens_for(Session, 'after_commit')
+def _avisar_apos_commit(session):
+    for alerta in pendencias.retirar(session, 'alertas_metas'):
+        if has_request_context():
+            # A API devolve os alertas na resposta (g); o site mostra na próxima página
+            g.setdefault('alertas_metas', []).append(alerta)
+            if request.blueprint != 'api':
+                flash(mensagem(alerta), 'error' if alerta['percentual'] >= 100 else 'warning')
+        if has_app_context():
+            current_app.logger.info('Alerta de meta (usuário %s): %s', alerta['usuario_id'], mensagem(alerta))
+
+
+def gasto_no_resumo(conexao, usuario_id, mes, categoria_id):
+    """Gasto do mês lido do resumo mensal (para metas novas e conferência)."""
+    consulta = select(func.coalesce(func.sum(ResumoMensal.total_centavos), 0)).where(
+        ResumoMensal.usuario_id == usuario_id,
+        ResumoMensal.mes == mes,
+        ResumoMensal.tipo == 'despesa'
+    )
+    if categoria_id != TOTAL:
+        consulta = consulta.where(ResumoMensal.categoria_id == categoria_id)
+    return int(conexao.execute(consulta).scalar())
+
+
+def definir(usuario_id, mes, categoria_id, limite_centavos):
+    """
+    Cria ou altera a meta do mês (sem commit). O gasto inicial vem do
+    resumo mensal e os alertas já atingidos não são repetidos.
+    """
+    meta = db.session.scalar(select(Meta).where(
+        Meta.usuario_id == usuario_id, Meta.mes == mes, Meta.categoria_id == categoria_id
+    ))
+    if meta is None:
+        meta = Meta(usuario_id=usuario_id, mes=mes, categoria_id=categoria_id,
+                    gasto_centavos=gasto_no_resumo(db.session, usuario_id, mes, categoria_id))
+        db.session.add(meta)
+    meta.limite_centavos = limite_centavos
+    meta.ultimo_alerta = nivel(meta.gasto_centavos, limite_centavos)
+    return meta
+
+
+def do_mes(usuario_id, mes):
+    """Metas do mês com o progresso: uma leitura de Meta, sem agregação."""
+    linhas = db.session.execute(
+        select(Meta.id, Meta.categoria_id, Meta.limite_centavos, Meta.gasto_centavos)
+        .where(Meta.usuario_id == usuario_id, Meta.mes == mes)
+        .order_by(Meta.categoria_id)
+    ).all()
+    return [
+        {
+            'id': meta_id,
+            'categoria_id': categoria_id,
+            'limite': limite,
+            'gasto': gasto,
+            'restante': limite - gasto,
+            'percentual': gasto * 100 // limite if limite else 0,
+            'nivel': nivel(gasto, limite)
+        }
+        for meta_id, categoria_id, limite, gasto in linhas
+    ]
+
+
+def reconstruir(usuario_id=None):
+    """Recalcula o gasto de todas as metas pelo resumo mensal. Retorna as metas corrigidas."""
+    consulta = select(Meta)
+    if usuario_id is not None:
+        consulta = consulta.where(Meta.usuario_id == usuario_id)
+    corrigidas = []
+    for meta in db.session.scalars(consulta):
+        gasto = gasto_no_resumo(db.session, meta.usuario_id, meta.mes, meta.categoria_id)
+        if gasto != meta.gasto_centavos:
+            corrigidas.append((meta.id, meta.gasto_centavos, gasto))
+            meta.gasto_centavos = gasto
+            meta.ultimo_alerta = nivel(gasto, meta.limite_centavos)
+    db.session.commit()
+    return corrigidas
+
+
+def init_app(app):
+    global _alertas
+    _alertas = tuple(sorted(app.config.get('METAS_ALERTAS') or ALERTAS_PADRAO))
+    app.cli.add_command(metas_cli)
+
+
+metas_cli = AppGroup('metas', help='Manutenção das metas de gastos.')
+
+
+@metas_cli.command('verificar')
+@click.option('--usuario', type=int, help='Confere apenas as metas deste usuário.')
+def verificar_comando(usuario):
+    """Confere o gasto das metas com o resumo mensal."""
+    consulta = select(Meta.id, Meta.usuario_id, Meta.mes, Meta.categoria_id, Meta.gasto_centavos)
+    if usuario is not None:
+        consulta = consulta.where(Meta.usuario_id == usuario)
+    divergencias = 0
+    for meta_id, uid, mes, categoria_id, gasto in db.session.execute(consulta).all():
+        esperado = gasto_no_resumo(db.session, uid, mes, categoria_id)
+        if esperado != gasto:
+            divergencias += 1
+            click.echo(f'Meta {meta_id}: gasto {gasto}, resumo {esperado}')
+    if divergencias:
+        raise click.ClickException(f'{divergencias} meta(s) divergente(s).')
+    click.echo('Metas conferem com o resumo mensal.')
+
+
+@metas_cli.command('reconstruir')
+@click.option('--usuario', type=int, help='Recalcula apenas as metas deste usuário.')
+def reconstruir_comando(usuario):
+    """Recalcula o gasto das metas pelo resumo mensal."""
+    corrigidas = reconstruir(usuario)
+    click.echo(f'{len(corrigidas)} meta(s) corrigida(s).')
+
+
+@metas_cli.command('renovar')
+@click.option('--mes', help='Mês de destino AAAA-MM (padrão: o atual).')
+def renovar_comando(mes):
+    """Copia as metas do mês anterior para o mês informado (as que ainda não existem)."""
+    try:
+        destino = datetime.strptime(mes, '%Y-%m').date() if mes else inicio_do_mes(datetime.now())
+    except ValueError:
+        raise click.BadParameter('use o formato AAAA-MM.', param_hint='--mes')
+    anterior = (destino - timedelta(days=1)).strftime('%Y-%m')
+    destino = destino.strftime('%Y-%m')
+    criadas = 0
+    for uid, categoria_id, limite in db.session.execute(
+        select(Meta.usuario_id, Meta.categoria_id, Meta.limite_centavos).where(Meta.mes == anterior)
+    ).all():
+        existe = db.session.scalar(select(Meta.id).where(
+            Meta.usuario_id == uid, Meta.mes == destino, Meta.categoria_id == categoria_id
+        ))
+        if existe is None:
+            definir(uid, destino, categoria_id, limite)
+            criadas += 1
+    db.session.commit()
+    click.echo(f'{criadas} meta(s) copiada(s) de {anterior} para {destino}.')
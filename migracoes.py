@@ -0,0 +1,223 @@
+"""
+Criação e migrações de esquema do banco.
+
+O esquema não é criado ao importar a aplicação: `flask init-db` cria as
+tabelas que faltam (db.create_all()). Como ele não altera tabelas
+existentes, essas mudanças ficam aqui. Cada migração só mexe nas próprias
+colunas e pode ser executada mais de uma vez; `flask migracoes aplicar`
+roda todas em ordem, cria o que falta e reconstrói uma vez, no fim, as
+tabelas derivadas (resumo mensal, saldos diários, metas e busca).
+"""
+from collections import Counter
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import BigInteger, bindparam, cast, column, func, insert, inspect, select, table, text, update
+
+import busca
+import categorias
+import metas
+import resumo
+import saldos
+from extensions import db
+from models import Categoria, PrevisaoGasto, ResumoMensal, Transacao
+
+
+def _colunas(conexao, tabela):
+    return {coluna['name'] for coluna in inspect(conexao).get_columns(tabela)}
+
+
+def migrar_centavos(conexao):
+    """
+    Troca transacao.valor (Float) por valor_centavos (inteiro) e
+    resumo_mensal.total por total_centavos. Retorna as tabelas alteradas.
+    """
+    alteradas = []
+
+    colunas = _colunas(conexao, 'transacao')
+    if 'valor' in colunas:
+        if 'valor_centavos' not in colunas:
+            conexao.execute(text('ALTER TABLE transacao ADD COLUMN valor_centavos BIGINT NOT NULL DEFAULT 0'))
+        transacao = table('transacao', column('valor'), column('valor_centavos'))
+        conexao.execute(update(transacao).values(
+            valor_centavos=cast(func.round(transacao.c.valor * 100), BigInteger)
+        ))
+        conexao.execute(text('ALTER TABLE transacao DROP COLUMN valor'))
+        alteradas.append('transacao')
+
+    # Bancos anteriores ao resumo mensal não têm a tabela; create_all a cria já em centavos
+    colunas = _colunas(conexao, 'resumo_mensal') if inspect(conexao).has_table('resumo_mensal') else set()
+    if 'total' in colunas:
+        if 'total_centavos' not in colunas:
+            conexao.execute(text('ALTER TABLE resumo_mensal ADD COLUMN total_centavos BIGINT NOT NULL DEFAULT 0'))
+        conexao.execute(text('ALTER TABLE resumo_mensal DROP COLUMN total'))
+        alteradas.append('resumo_mensal')
+
+    return alteradas
+
+
+def migrar_categorias(conexao):
+    """
+    Troca transacao.categoria (texto) por categoria_id, criando as
+    categorias padrão e, para os demais nomes, uma categoria por usuário e
+    chave normalizada (variações de maiúsculas e acentos viram uma só, com
+    a grafia mais usada). Resumo e previsão passam a ser por categoria_id e
+    são recriados vazios. Retorna as tabelas alteradas.
+    """
+    alteradas = []
+    Categoria.__table__.create(conexao, checkfirst=True)
+    categorias.criar_padroes(conexao)
+
+    colunas = _colunas(conexao, 'transacao')
+    if 'categoria_id' not in colunas:
+        conexao.execute(text('ALTER TABLE transacao ADD COLUMN categoria_id INTEGER REFERENCES categoria (id)'))
+    for indice in Transacao.__table__.indexes:
+        if 'categoria_id' in indice.columns:
+            indice.create(conexao, checkfirst=True)
+
+    if 'categoria' in colunas:
+        transacao = table('transacao', column('usuario_id'), column('categoria'), column('categoria_id'))
+        grafias = {}  # (usuario_id, chave): Counter de grafias
+        for usuario_id, nome, quantidade in conexao.execute(
+            select(transacao.c.usuario_id, transacao.c.categoria, func.count())
+            .where(func.trim(func.coalesce(transacao.c.categoria, '')) != '')
+            .group_by(transacao.c.usuario_id, transacao.c.categoria)
+        ):
+            grafias.setdefault((usuario_id, categorias.chave(nome)), Counter())[nome] += quantidade
+
+        existentes = {
+            (usuario_id, chave): id_
+            for id_, usuario_id, chave in conexao.execute(select(Categoria.id, Categoria.usuario_id, Categoria.chave))
+        }
+        atualizacoes = []
+        for (usuario_id, chave), contagem in grafias.items():
+            id_ = existentes.get((None, chave)) or existentes.get((usuario_id, chave))
+            if id_ is None:
+                nome = contagem.most_common(1)[0][0].strip()[:categorias.NOME_MAX]
+                id_ = conexao.execute(
+                    insert(Categoria).values(usuario_id=usuario_id, nome=nome, chave=chave, icone='fa-tag', cor='text-secondary')
+                ).inserted_primary_key[0]
+            atualizacoes.extend(
+                {'chave_usuario_id': usuario_id, 'chave_nome': nome, 'novo_id': id_} for nome in contagem
+            )
+        if atualizacoes:
+            conexao.execute(
+                update(transacao)
+                .where(transacao.c.usuario_id == bindparam('chave_usuario_id'), transacao.c.categoria == bindparam('chave_nome'))
+                .values(categoria_id=bindparam('novo_id')),
+                atualizacoes
+            )
+        conexao.execute(text('ALTER TABLE transacao DROP COLUMN categoria'))
+        alteradas.append('transacao')
+
+    # Tabelas derivadas: recriadas com categoria_id e preenchidas de novo
+    for modelo in (ResumoMensal, PrevisaoGasto):
+        nome_tabela = modelo.__tablename__
+        if inspect(conexao).has_table(nome_tabela) and 'categoria' in _colunas(conexao, nome_tabela):
+            modelo.__table__.drop(conexao)
+            modelo.__table__.create(conexao)
+            alteradas.append(nome_tabela)
+
+    return alteradas
+
+
+def migrar_versao_dados(conexao):
+    """Acrescenta usuario.versao_dados (ver cache.py). Retorna as tabelas alteradas."""
+    if 'versao_dados' in _colunas(conexao, 'usuario'):
+        return []
+    conexao.execute(text('ALTER TABLE usuario ADD COLUMN versao_dados INTEGER NOT NULL DEFAULT 0'))
+    return ['usuario']
+
+
+def migrar_data_obrigatoria(conexao):
+    """
+    Preenche transacao.data onde ela está vazia, com a data de hoje: a
+    listagem e os resumos ordenam e agrupam por data. Em bancos novos a
+    coluna já é NOT NULL. Retorna as tabelas alteradas.
+    """
+    transacao = table('transacao', column('data'))
+    alteradas = conexao.execute(
+        update(transacao).where(transacao.c.data.is_(None)).values(data=func.current_date())
+    ).rowcount
+    return ['transacao'] if alteradas else []
+
+
+def criar_esquema():
+    """Cria as tabelas, os índices e a estrutura de busca que faltam, e as categorias padrão."""
+    db.create_all()
+    with db.engine.begin() as conexao:
+        # create_all não cria índices novos em tabelas que já existiam
+        for tabela in db.metadata.sorted_tables:
+            for indice in tabela.indexes:
+                indice.create(conexao, checkfirst=True)
+        # Fora do db.metadata (ver busca.py); em um banco novo já foi criada com a tabela transacao
+        busca.criar_indice(conexao)
+        categorias.criar_padroes(conexao)
+
+
+def reconstruir_derivadas():
+    """Recalcula as tabelas mantidas a partir das transações. Retorna os nomes, na ordem."""
+    resumo.reconstruir()
+    saldos.reconstruir()
+    # Metas leem o gasto do resumo mensal, já reconstruído
+    metas.reconstruir()
+    busca.reconstruir()
+    return ['resumo_mensal', 'saldo_diario', 'meta', 'transacao_busca']
+
+
+@click.command('init-db')
+def init_db_comando():
+    """Cria as tabelas (e índices) que ainda não existem no banco e as categorias padrão."""
+    criar_esquema()
+    click.echo('Banco de dados inicializado.')
+
+
+migracoes_cli = AppGroup('migracoes', help='Migrações de esquema de bancos existentes.')
+
+
+# Em ordem: as migrações seguintes supõem as anteriores
+MIGRACOES = (
+    ('centavos', migrar_centavos),
+    ('categorias', migrar_categorias),
+    ('versao_dados', migrar_versao_dados),
+    ('data_obrigatoria', migrar_data_obrigatoria),
+)
+
+
+@migracoes_cli.command('aplicar')
+def aplicar_comando():
+    """Atualiza um banco existente: todas as migrações, o esquema novo e as tabelas derivadas."""
+    for nome, migrar in MIGRACOES:
+        with db.engine.begin() as conexao:
+            alteradas = migrar(conexao)
+        click.echo(f"{nome}: {', '.join(alteradas) if alteradas else 'nada a migrar'}.")
+    criar_esquema()
+    click.echo(f"Reconstruídas: {', '.join(reconstruir_derivadas())}.")
+    click.echo('Rode flask previsao calcular para refazer as previsões do mês.')
+
+
+@migracoes_cli.command('centavos')
+def centavos_comando():
+    """Converte os valores em dinheiro para centavos inteiros (só as colunas; ver aplicar)."""
+    with db.engine.begin() as conexao:
+        alteradas = migrar_centavos(conexao)
+    if not alteradas:
+        click.echo('Valores já estão em centavos.')
+        return
+    click.echo(f"Migrado para centavos: {', '.join(alteradas)}. Rode flask migracoes aplicar para reconstruir as tabelas derivadas.")
+
+
+@migracoes_cli.command('categorias')
+def categorias_comando():
+    """Normaliza as categorias em texto para a tabela categoria (só as colunas; ver aplicar)."""
+    with db.engine.begin() as conexao:
+        alteradas = migrar_categorias(conexao)
+    if not alteradas:
+        click.echo('Categorias já estão normalizadas.')
+        return
+    click.echo(f"Categorias normalizadas: {', '.join(alteradas)}. Rode flask migracoes aplicar para reconstruir as tabelas derivadas.")
+
+
+def init_app(app):
+    app.cli.add_command(init_db_comando)
+    app.cli.add_command(migracoes_cli)
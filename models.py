@@ -1,7 +1,7 @@
 from extensions import db
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+import senhas
 
 
 class Usuario(db.Model, UserMixin):
@@ -11,17 +11,49 @@ class Usuario(db.Model, UserMixin):
     nome = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     senha_hash = db.Column(db.String(200), nullable=False)
-    transacoes = db.relationship('Transacao', backref='usuario', lazy=True)
+    # Incrementada na mesma transação de cada gravação dos dados do usuário
+    # (ver cache.py): base dos ETags e dos ids de relatório
+    versao_dados = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # write_only: as transações de um usuário são sempre lidas por consultas
+    # com filtro e limite, nunca carregadas inteiras pelo relacionamento; ao
+    # excluir o usuário, o banco é quem trata as transações (passive_deletes)
+    transacoes = db.relationship('Transacao', backref='usuario', lazy='write_only', passive_deletes=True)
 
     def set_password(self, senha):
         """Define a senha do usuário, com validação mínima de 8 caracteres."""
         if not senha or len(senha) < 8:
             raise ValueError("A senha deve ter pelo menos 8 caracteres.")
-        self.senha_hash = generate_password_hash(senha)
+        self.senha_hash = senhas.gerar_hash(senha)
 
     def check_password(self, senha):
-        """Verifica se a senha informada confere com o hash armazenado."""
-        return check_password_hash(self.senha_hash, senha)
+        """
+        Verifica se a senha informada confere com o hash armazenado. Se o hash
+        usar outro método ou custo (SENHA_METODO), é refeito; cabe a quem
+        chamou fazer o commit.
+        """
+        confere, novo_hash = senhas.verificar(self.senha_hash, senha)
+        if novo_hash:
+            self.senha_hash = novo_hash
+        return confere
+
+
+class Categoria(db.Model):
+    """
+    Categoria de transação: as padrão (usuario_id NULL) valem para todos;
+    as demais são do usuário. `chave` é o nome normalizado (ver categorias.py).
+    """
+    __tablename__ = "categoria"
+
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'))
+    nome = db.Column(db.String(50), nullable=False)
+    chave = db.Column(db.String(50), nullable=False)
+    icone = db.Column(db.String(40), nullable=False, default='fa-tag')  # classe do Font Awesome
+    cor = db.Column(db.String(20), nullable=False, default='text-secondary')  # classe de cor do Bootstrap
+
+    __table_args__ = (
+        db.UniqueConstraint('usuario_id', 'chave', name='uq_categoria_usuario_chave'),
+    )
 
 
 class Transacao(db.Model):
@@ -29,8 +61,90 @@ class Transacao(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     descricao = db.Column(db.String(150), nullable=False)
-    valor = db.Column(db.Float, nullable=False)
+    valor_centavos = db.Column(db.BigInteger, nullable=False)  # ver dinheiro.py
     tipo = db.Column(db.String(10), nullable=False)  # 'entrada' ou 'saida'
-    categoria = db.Column(db.String(50))
-    data = db.Column(db.Date, default=datetime.utcnow)
-    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
\ No newline at end of file
+    categoria_id = db.Column(db.Integer, db.ForeignKey('categoria.id'))
+    data = db.Column(db.Date, nullable=False, default=datetime.utcnow)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
+    # Sempre exibida com a transação: vem no mesmo SELECT (chave primária)
+    categoria = db.relationship('Categoria', lazy='joined')
+
+    __table_args__ = (
+        db.Index('ix_transacao_usuario_data_id', 'usuario_id', 'data', 'id'),
+        db.Index('ix_transacao_usuario_tipo_data', 'usuario_id', 'tipo', 'data'),
+        db.Index('ix_transacao_usuario_categoria_data', 'usuario_id', 'categoria_id', 'data'),
+    )
+
+
+class SaldoDiario(db.Model):
+    """
+    Movimento de cada dia com transações do usuário e os acumulados desde
+    a primeira transação, mantidos a cada escrita em Transacao (ver saldos.py).
+    """
+    __tablename__ = "saldo_diario"
+
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
+    data = db.Column(db.Date, nullable=False)
+    receitas_centavos = db.Column(db.BigInteger, nullable=False, default=0)
+    despesas_centavos = db.Column(db.BigInteger, nullable=False, default=0)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+    receitas_acumuladas_centavos = db.Column(db.BigInteger, nullable=False, default=0)
+    despesas_acumuladas_centavos = db.Column(db.BigInteger, nullable=False, default=0)
+    quantidade_acumulada = db.Column(db.Integer, nullable=False, default=0)
+    saldo_acumulado_centavos = db.Column(db.BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('usuario_id', 'data', name='uq_saldo_diario_usuario_data'),
+    )
+
+
+class PrevisaoGasto(db.Model):
+    """Previsão de despesas do mês por usuário e categoria (NULL: total; 0: sem categoria), gravada por previsao.calcular()."""
+    __tablename__ = "previsao_gasto"
+
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
+    mes = db.Column(db.String(7), nullable=False)  # 'AAAA-MM'
+    categoria_id = db.Column(db.Integer)
+    realizado_centavos = db.Column(db.BigInteger, nullable=False)  # gasto até o dia do cálculo
+    restante_centavos = db.Column(db.BigInteger, nullable=False)  # gasto esperado até o fim do mês
+    calculado_em = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_previsao_gasto_usuario_mes', 'usuario_id', 'mes'),
+    )
+
+
+class Meta(db.Model):
+    """Meta de despesas do mês por usuário e categoria (0: todas), com o gasto mantido por metas.py."""
+    __tablename__ = "meta"
+
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
+    mes = db.Column(db.String(7), nullable=False)  # 'AAAA-MM'
+    categoria_id = db.Column(db.Integer, nullable=False, default=0)  # 0: todas as despesas
+    limite_centavos = db.Column(db.BigInteger, nullable=False)
+    gasto_centavos = db.Column(db.BigInteger, nullable=False, default=0)
+    ultimo_alerta = db.Column(db.Integer, nullable=False, default=0)  # maior % de alerta já avisada
+
+    __table_args__ = (
+        db.UniqueConstraint('usuario_id', 'mes', 'categoria_id', name='uq_meta_usuario_mes_categoria'),
+    )
+
+
+class ResumoMensal(db.Model):
+    """Totais por usuário, mês, tipo e categoria, mantidos a cada escrita em Transacao."""
+    __tablename__ = "resumo_mensal"
+
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
+    mes = db.Column(db.String(7), nullable=False)  # 'AAAA-MM'
+    tipo = db.Column(db.String(10), nullable=False)
+    categoria_id = db.Column(db.Integer, nullable=False, default=0)  # 0: sem categoria
+    total_centavos = db.Column(db.BigInteger, nullable=False, default=0)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('usuario_id', 'mes', 'tipo', 'categoria_id', name='uq_resumo_mensal_chave'),
+    )
\ No newline at end of file
@@ -0,0 +1,79 @@
+import base64
+from datetime import datetime
+from sqlalchemy import and_, or_
+from extensions import db
+from models import Transacao
+
+TAMANHOS_PAGINA = (10, 20, 50, 100)
+
+
+def codificar_cursor(transacao):
+    """Cursor opaco com a posição (data, id) de uma transação na listagem."""
+    valor = f"{transacao.data.strftime('%Y-%m-%d')}:{transacao.id}"
+    return base64.urlsafe_b64encode(valor.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Retorna (data, id) do cursor, ou None se ele for inválido."""
+    if not cursor:
+        return None
+    try:
+        valor = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        data, id_ = valor.split(':')
+        return datetime.strptime(data, '%Y-%m-%d').date(), int(id_)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def tamanho_pagina(valor, padrao=TAMANHOS_PAGINA[0]):
+    try:
+        valor = int(valor)
+    except (TypeError, ValueError):
+        return padrao
+    return valor if valor in TAMANHOS_PAGINA else padrao
+
+
+def paginar(consulta, depois=None, antes=None, por_pagina=TAMANHOS_PAGINA[0]):
+    """
+    Página da listagem ordenada por (data DESC, id DESC), sem OFFSET.
+
+    `consulta` é um select() de Transacao já filtrado; `depois` e `antes`
+    são cursores vindos de uma página anterior. A condição repete
+    "data <= x" (ou ">=") para que o índice (usuario_id, data, id) comece
+    a leitura direto na posição do cursor, então qualquer página custa o
+    mesmo que a primeira.
+    """
+    posicao_depois = decodificar_cursor(depois)
+    posicao_antes = None if posicao_depois else decodificar_cursor(antes)
+
+    if posicao_depois:
+        data, id_ = posicao_depois
+        consulta = consulta.where(
+            Transacao.data <= data,
+            or_(Transacao.data < data, and_(Transacao.data == data, Transacao.id < id_))
+        ).order_by(Transacao.data.desc(), Transacao.id.desc())
+    elif posicao_antes:
+        data, id_ = posicao_antes
+        consulta = consulta.where(
+            Transacao.data >= data,
+            or_(Transacao.data > data, and_(Transacao.data == data, Transacao.id > id_))
+        ).order_by(Transacao.data.asc(), Transacao.id.asc())
+    else:
+        consulta = consulta.order_by(Transacao.data.desc(), Transacao.id.desc())
+
+    transacoes = db.session.scalars(consulta.limit(por_pagina + 1)).all()
+    tem_mais = len(transacoes) > por_pagina
+    transacoes = transacoes[:por_pagina]
+
+    if posicao_antes:
+        transacoes.reverse()
+        tem_anterior, tem_proxima = tem_mais, True
+    else:
+        tem_anterior, tem_proxima = bool(posicao_depois), tem_mais
+
+    return {
+        'transacoes': transacoes,
+        'anterior': codificar_cursor(transacoes[0]) if transacoes and tem_anterior else None,
+        'proximo': codificar_cursor(transacoes[-1]) if transacoes and tem_proxima else None,
+        'por_pagina': por_pagina
+    }
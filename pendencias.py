@@ -0,0 +1,54 @@
+"""
+Pendências da sessão: o que os listeners de after_flush anotam para fazer
+só depois do commit (invalidar o cache do painel, esquecer identidades em
+cache, avisar alertas de meta).
+
+Cada anotação guarda a transação em que foi feita, a de fora ou um
+savepoint (begin_nested). O rollback de um savepoint descarta só o que foi
+anotado nele e nos savepoints internos; o rollback da transação descarta
+tudo. No after_commit, retirar() devolve o que sobrou.
+"""
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+CHAVE = 'pendencias'
+
+
+def _transacao_atual(session):
+    return session.get_nested_transaction() or session.get_transaction()
+
+
+def adicionar(session, nome, itens):
+    """Anota os itens de `nome` na transação (ou savepoint) em andamento."""
+    transacao = _transacao_atual(session)
+    session.info.setdefault(CHAVE, {}).setdefault(nome, []).extend((transacao, item) for item in itens)
+
+
+def retirar(session, nome):
+    """Remove da sessão e devolve, em ordem, os itens de `nome` ainda válidos."""
+    return [item for _, item in session.info.get(CHAVE, {}).pop(nome, ())]
+
+
+def _desfeita(transacao):
+    # A subtransação de um flush que falhou desfaz o savepoint (ou a transação) em volta
+    while transacao.parent is not None and not transacao.nested:
+        transacao = transacao.parent
+    return transacao
+
+
+def _dentro(transacao, desfeita):
+    while transacao is not None:
+        if transacao is desfeita:
+            return True
+        transacao = transacao.parent
+    return False
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _descartar(session, transacao):
+    pendencias = session.info.get(CHAVE)
+    if not pendencias:
+        return
+    desfeita = _desfeita(transacao)
+    for itens in pendencias.values():
+        itens[:] = [(anotada, item) for anotada, item in itens if not _dentro(anotada, desfeita)]
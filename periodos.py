@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+from sqlalchemy import String, and_, func, literal_column, true
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+
+class mes_de(FunctionElement):
+    """Expressão SQL que devolve o mês de uma data no formato AAAA-MM, em qualquer banco."""
+    type = String()
+    name = 'mes_de'
+    inherit_cache = True
+
+
+@compiles(mes_de)
+def _mes_de_padrao(element, compiler, **kw):
+    return compiler.process(func.to_char(*element.clauses, literal_column("'YYYY-MM'")), **kw)
+
+
+@compiles(mes_de, 'sqlite')
+def _mes_de_sqlite(element, compiler, **kw):
+    return compiler.process(func.strftime(literal_column("'%Y-%m'"), *element.clauses), **kw)
+
+
+@compiles(mes_de, 'mysql')
+def _mes_de_mysql(element, compiler, **kw):
+    return compiler.process(func.date_format(*element.clauses, literal_column("'%Y-%m'")), **kw)
+
+
+def inicio_do_mes(dia):
+    """Primeiro dia do mês de uma data."""
+    if isinstance(dia, datetime):
+        dia = dia.date()
+    return dia.replace(day=1)
+
+
+def proximo_mes(dia):
+    """Primeiro dia do mês seguinte ao de uma data."""
+    return (inicio_do_mes(dia).replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def intervalo_mes(mes):
+    """
+    Converte um mês ('AAAA-MM' ou uma data) no intervalo semiaberto
+    [primeiro dia, primeiro dia do mês seguinte).
+    """
+    if isinstance(mes, str):
+        mes = datetime.strptime(mes, '%Y-%m').date()
+    inicio = inicio_do_mes(mes)
+    return inicio, proximo_mes(inicio)
+
+
+def no_mes(coluna, mes):
+    """Filtro indexável equivalente a mes_de(coluna) == mes."""
+    inicio, fim = intervalo_mes(mes)
+    return and_(coluna >= inicio, coluna < fim)
+
+
+def no_periodo(coluna, data_inicial=None, data_final=None):
+    """
+    Filtro indexável para um período com as duas datas inclusivas.
+    A data final vira um limite semiaberto (< dia seguinte), o que também
+    cobre colunas que guardam horário.
+    """
+    condicoes = []
+    if data_inicial:
+        condicoes.append(coluna >= data_inicial)
+    if data_final:
+        condicoes.append(coluna < data_final + timedelta(days=1))
+    return and_(*condicoes) if condicoes else true()
@@ -0,0 +1,213 @@
+"""
+Previsão de gastos do mês, calculada em lote com NumPy.
+
+As despesas diárias de cada usuário × categoria nos últimos
+MESES_HISTORICO meses viram as linhas de uma matriz (série × dia). A
+partir dela, com operações vetorizadas sobre todas as séries de uma vez:
+- base do mês: média móvel dos 3 últimos meses completos, ajustada pelo
+  índice sazonal (o mesmo mês do ano anterior sobre a média dos 12 meses
+  completos) quando a série já existia naquele mês;
+- perfil do mês: fração do gasto mensal que costuma ter acontecido até
+  o dia de hoje, medida nos últimos meses completos;
+- restante = base × (1 - fração) e previsão = gasto até hoje + restante.
+Séries sem gasto nos meses da média móvel caem na extrapolação linear do
+gasto atual.
+
+`flask previsao calcular` roda o lote (pensado para um job noturno) e
+grava em PrevisaoGasto; o painel lê o restante gravado e soma ao gasto
+atual do resumo mensal. O NumPy só é importado pelo lote.
+"""
+from datetime import date, datetime, timedelta
+from time import perf_counter
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import and_, delete, func, insert, select
+
+import pendencias
+from cache import incrementar_versao_dados
+from extensions import db
+from models import PrevisaoGasto, Transacao, Usuario
+from periodos import inicio_do_mes, proximo_mes
+
+MESES_HISTORICO = 12  # do mesmo mês do ano anterior até o mês passado
+MESES_MEDIA_MOVEL = 3
+MESES_PERFIL = 6
+INDICE_SAZONAL_MIN = 0.5
+INDICE_SAZONAL_MAX = 2.0
+USUARIOS_POR_LOTE = 1000
+
+
+def _inicios_dos_meses(hoje):
+    """Primeiro dia de cada mês da janela, do mais antigo até o mês atual."""
+    inicios = [inicio_do_mes(hoje)]
+    for _ in range(MESES_HISTORICO):
+        inicios.insert(0, inicio_do_mes(inicios[0] - timedelta(days=1)))
+    return inicios
+
+
+def prever(series, datas, valores, hoje):
+    """
+    Previsão do mês atual para cada série.
+
+    `series` (índice da série), `datas` (datetime64[D]) e `valores`
+    (centavos) são arrays paralelos com o gasto de cada série em cada dia;
+    `hoje` é o último dia considerado. Retorna (realizado, restante), em
+    centavos, com uma posição por série.
+    """
+    import numpy as np
+
+    inicios = _inicios_dos_meses(hoje)
+    origem = np.datetime64(inicios[0], 'D')
+    dias = (np.datetime64(hoje, 'D') - origem).astype(int) + 1
+    quantidade_series = int(series.max()) + 1 if len(series) else 0
+
+    matriz = np.zeros((quantidade_series, dias), dtype=np.int64)
+    np.add.at(matriz, (series, (datas - origem).astype(int)), valores)
+
+    posicoes = np.array([(np.datetime64(inicio, 'D') - origem).astype(int) for inicio in inicios])
+    mensal = np.add.reduceat(matriz, posicoes, axis=1).astype(np.float64)  # série × mês; o último é o atual
+    completos = mensal[:, :-1]
+    realizado = mensal[:, -1]
+
+    # Gasto de cada mês completo até o mesmo dia do mês de hoje
+    acumulado = np.concatenate([np.zeros((quantidade_series, 1)), np.cumsum(matriz, axis=1)], axis=1)
+    fins = [min(hoje.day, (proximo_mes(inicio) - inicio).days) for inicio in inicios[:-1]]
+    ate_hoje = acumulado[:, posicoes[:-1] + fins] - acumulado[:, posicoes[:-1]]
+
+    perfil_total = completos[:, -MESES_PERFIL:].sum(axis=1)
+    fracao_linear = hoje.day / (proximo_mes(hoje) - inicio_do_mes(hoje)).days
+    fracao = np.divide(
+        ate_hoje[:, -MESES_PERFIL:].sum(axis=1), perfil_total,
+        out=np.full(quantidade_series, fracao_linear), where=perfil_total > 0
+    )
+
+    media_movel = completos[:, -MESES_MEDIA_MOVEL:].mean(axis=1)
+    media_ano = completos.mean(axis=1)
+    indice = np.divide(completos[:, 0], media_ano, out=np.ones(quantidade_series), where=media_ano > 0)
+    # Só há sazonalidade medida se a série já existia no mesmo mês do ano anterior
+    indice = np.where(completos[:, 0] > 0, np.clip(indice, INDICE_SAZONAL_MIN, INDICE_SAZONAL_MAX), 1.0)
+    base = media_movel * indice
+
+    restante = np.where(
+        media_movel > 0,
+        np.maximum(base * (1 - fracao), 0),
+        realizado * (1 / fracao_linear - 1)  # sem histórico: ritmo atual até o fim do mês
+    )
+    return realizado.astype(np.int64), np.rint(restante).astype(np.int64)
+
+
+def _linhas(usuario_inicial, usuario_final, hoje):
+    inicio = _inicios_dos_meses(hoje)[0]
+    return db.session.execute(
+        select(Transacao.usuario_id, Transacao.categoria_id, Transacao.data, func.sum(Transacao.valor_centavos))
+        .where(
+            Transacao.usuario_id.between(usuario_inicial, usuario_final),
+            Transacao.tipo == 'despesa',
+            Transacao.data >= inicio,
+            Transacao.data <= hoje
+        )
+        .group_by(Transacao.usuario_id, Transacao.categoria_id, Transacao.data)
+    ).all()
+
+
+def _confirmar(usuarios):
+    """
+    Commit do lote. O painel mostra a previsão: a versão dos dados e o cache
+    dos usuários com previsões trocadas mudam como numa gravação pelo ORM.
+    """
+    incrementar_versao_dados(db.session.connection(), usuarios)
+    pendencias.adicionar(db.session(), 'usuarios_alterados', usuarios)
+    db.session.commit()
+
+
+def _calcular_lote(usuario_inicial, usuario_final, hoje, calculado_em):
+    """Calcula e grava as previsões dos usuários com id no intervalo. Retorna as linhas gravadas."""
+    import numpy as np
+
+    linhas = _linhas(usuario_inicial, usuario_final, hoje)
+    mes = hoje.strftime('%Y-%m')
+    do_lote = and_(PrevisaoGasto.usuario_id.between(usuario_inicial, usuario_final), PrevisaoGasto.mes == mes)
+    # Usuários que já tinham previsão no mês: perdem ou trocam as linhas
+    anteriores = set(db.session.scalars(select(PrevisaoGasto.usuario_id).where(do_lote).distinct()))
+    db.session.execute(delete(PrevisaoGasto).where(do_lote))
+    if not linhas:
+        _confirmar(anteriores)
+        return 0
+
+    chaves = {}
+    indices = np.fromiter(
+        (chaves.setdefault((usuario_id, categoria_id or 0), len(chaves)) for usuario_id, categoria_id, _, _ in linhas),
+        dtype=np.int64, count=len(linhas)
+    )
+    datas = np.array([linha[2] for linha in linhas], dtype='datetime64[D]')
+    valores = np.fromiter((int(linha[3]) for linha in linhas), dtype=np.int64, count=len(linhas))
+    realizado, restante = prever(indices, datas, valores, hoje)
+
+    # Total do usuário (categoria_id NULL): soma das categorias
+    usuarios = np.array([usuario_id for usuario_id, _ in chaves], dtype=np.int64)
+    ids_usuarios, posicao_usuario = np.unique(usuarios, return_inverse=True)
+    realizado_total = np.bincount(posicao_usuario, weights=realizado).astype(np.int64)
+    restante_total = np.bincount(posicao_usuario, weights=restante).astype(np.int64)
+
+    registros = [
+        {
+            'usuario_id': usuario_id, 'mes': mes, 'categoria_id': categoria_id,
+            'realizado_centavos': int(realizado[i]), 'restante_centavos': int(restante[i]),
+            'calculado_em': calculado_em
+        }
+        for (usuario_id, categoria_id), i in chaves.items()
+    ]
+    registros.extend(
+        {
+            'usuario_id': int(usuario_id), 'mes': mes, 'categoria_id': None,
+            'realizado_centavos': int(realizado_total[i]), 'restante_centavos': int(restante_total[i]),
+            'calculado_em': calculado_em
+        }
+        for i, usuario_id in enumerate(ids_usuarios)
+    )
+    db.session.execute(insert(PrevisaoGasto), registros)
+    _confirmar(anteriores.union(int(usuario_id) for usuario_id in ids_usuarios))
+    return len(registros)
+
+
+def calcular(hoje=None, por_lote=USUARIOS_POR_LOTE):
+    """Recalcula as previsões do mês de todos os usuários, em lotes por faixa de id."""
+    hoje = hoje or date.today()
+    calculado_em = datetime.utcnow()
+    ids = db.session.scalars(select(Usuario.id).order_by(Usuario.id)).all()
+    resultado = {'usuarios': len(ids), 'linhas': 0}
+    for inicio in range(0, len(ids), por_lote):
+        faixa = ids[inicio:inicio + por_lote]
+        resultado['linhas'] += _calcular_lote(faixa[0], faixa[-1], hoje, calculado_em)
+    return resultado
+
+
+def restantes(usuario_id, mes):
+    """Restante previsto para o mês gravado pelo lote: {categoria_id: centavos}, com None para o total."""
+    return dict(db.session.execute(
+        select(PrevisaoGasto.categoria_id, PrevisaoGasto.restante_centavos).where(
+            PrevisaoGasto.usuario_id == usuario_id,
+            PrevisaoGasto.mes == mes
+        )
+    ).all())
+
+
+previsao_cli = AppGroup('previsao', help='Previsão de gastos do mês.')
+
+
+@previsao_cli.command('calcular')
+@click.option('--data', 'hoje', type=click.DateTime(formats=['%Y-%m-%d']), help='Dia de referência (padrão: hoje).')
+def calcular_comando(hoje):
+    """Recalcula as previsões de todos os usuários (job noturno)."""
+    inicio = perf_counter()
+    resultado = calcular(hoje.date() if hoje else None)
+    duracao = perf_counter() - inicio
+    click.echo(
+        f"{resultado['usuarios']} usuário(s), {resultado['linhas']} previsão(ões) gravada(s) "
+        f"em {duracao:.1f} s ({resultado['usuarios'] / duracao if duracao else 0:.0f} usuários/s)."
+    )
+
+
+def init_app(app):
+    app.cli.add_command(previsao_cli)
@@ -0,0 +1,149 @@
+"""
+Montagem do PDF do relatório financeiro com o ReportLab.
+
+Importado só pelos processos que geram relatórios (relatorios.renderizar),
+para que os workers web não carreguem o ReportLab ao iniciar.
+"""
+from datetime import datetime
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.lib.units import inch
+
+from dinheiro import formatar_moeda
+
+
+# Estilos criados uma única vez e reaproveitados em todos os relatórios
+STYLES = getSampleStyleSheet()
+
+TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=STYLES['Heading1'],
+    fontSize=18,
+    textColor=colors.HexColor('#2c3e50'),
+    spaceAfter=30,
+    alignment=1  # Centralizado
+)
+
+RESUMO_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498db')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 10),
+])
+
+# Cabeçalho na primeira linha e subtotal do bloco na última
+TRANSACOES_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -2), colors.white),
+    ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 8),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, colors.lightgrey]),
+    ('SPAN', (0, -1), (3, -1)),
+    ('ALIGN', (0, -1), (3, -1), 'RIGHT'),
+    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ('BACKGROUND', (0, -1), (-1, -1), colors.beige),
+])
+
+TRANSACOES_COL_WIDTHS = [1*inch, 2.5*inch, 1*inch, 1.2*inch, 1*inch]
+TRANSACOES_CABECALHO = ['Data', 'Descrição', 'Tipo', 'Categoria', 'Valor']
+
+# Linhas por tabela: cada bloco cabe em uma página A4 e é diagramado sozinho
+LINHAS_POR_BLOCO = 40
+
+
+def _tabela_bloco(bloco):
+    """Tabela de um bloco de transações, com cabeçalho e linha de subtotal."""
+    data = [TRANSACOES_CABECALHO]
+    receitas = 0
+    despesas = 0
+
+    for t in bloco:
+        if t.tipo == 'receita':
+            receitas += t.valor_centavos
+        elif t.tipo == 'despesa':
+            despesas += t.valor_centavos
+        data.append([
+            t.data.strftime('%d/%m/%Y'),
+            t.descricao[:30] + '...' if len(t.descricao) > 30 else t.descricao,
+            t.tipo.capitalize(),
+            (t.categoria[:15] + '...') if t.categoria and len(t.categoria) > 15 else (t.categoria or 'N/A'),
+            f'R$ {formatar_moeda(t.valor_centavos)}'
+        ])
+
+    data.append([
+        f'Subtotal: receitas R$ {formatar_moeda(receitas)} - despesas R$ {formatar_moeda(despesas)}', '', '', '',
+        f'R$ {formatar_moeda(receitas - despesas)}'
+    ])
+
+    table = Table(data, colWidths=TRANSACOES_COL_WIDTHS, repeatRows=1)
+    table.setStyle(TRANSACOES_TABLE_STYLE)
+    return table
+
+
+def montar_pdf(destino, nome_usuario, filtro, transacoes, totais):
+    """Monta o relatório financeiro em PDF no arquivo de destino."""
+    # Totais vêm do banco (TransacaoFilter.totais)
+    total_receitas = totais['total_receitas']
+    total_despesas = totais['total_despesas']
+    saldo = total_receitas - total_despesas
+
+    doc = SimpleDocTemplate(destino, pagesize=A4)
+    elements = []
+
+    # Título
+    title = Paragraph(f"Relatório Financeiro - {nome_usuario}", TITLE_STYLE)
+    elements.append(title)
+    elements.append(Spacer(1, 0.2*inch))
+
+    # Informações do período
+    periodo_text = f"Gerado em: {datetime.now().strftime('%d/%m/%Y às %H:%M')}"
+    if filtro.tem_periodo:
+        args = filtro.as_args()
+        periodo_text += f"<br/>Período: {args['data_inicial']} a {args['data_final']}"
+    periodo = Paragraph(periodo_text, STYLES['Normal'])
+    elements.append(periodo)
+    elements.append(Spacer(1, 0.3*inch))
+
+    # Resumo financeiro
+    resumo_data = [
+        ['Resumo Financeiro', ''],
+        ['Total de Receitas:', f'R$ {formatar_moeda(total_receitas)}'],
+        ['Total de Despesas:', f'R$ {formatar_moeda(total_despesas)}'],
+        ['Saldo:', f'R$ {formatar_moeda(saldo)}']
+    ]
+
+    resumo_table = Table(resumo_data, colWidths=[3*inch, 2*inch])
+    resumo_table.setStyle(RESUMO_TABLE_STYLE)
+
+    elements.append(resumo_table)
+    elements.append(Spacer(1, 0.4*inch))
+
+    # Tabela de transações, em blocos independentes
+    if transacoes:
+        transacoes_title = Paragraph("Transações", STYLES['Heading2'])
+        elements.append(transacoes_title)
+        elements.append(Spacer(1, 0.2*inch))
+
+        for inicio in range(0, len(transacoes), LINHAS_POR_BLOCO):
+            elements.append(_tabela_bloco(transacoes[inicio:inicio + LINHAS_POR_BLOCO]))
+    else:
+        no_data = Paragraph("Nenhuma transação encontrada para o período selecionado.", STYLES['Normal'])
+        elements.append(no_data)
+
+    # Construir PDF
+    doc.build(elements)
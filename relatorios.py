@@ -0,0 +1,228 @@
+"""
+Geração de relatórios PDF fora da requisição.
+
+A rota só enfileira o trabalho e devolve um identificador; um pool de
+processos local gera o PDF em disco. O estado de cada trabalho fica em
+arquivos na pasta de relatórios, então qualquer worker do gunicorn
+consegue responder o status e servir o download. Os arquivos mais antigos
+que RELATORIOS_RETENCAO são apagados por limpar(), chamada de tempos em
+tempos pelo próprio enfileirar().
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from flask import current_app
+from sqlalchemy import create_engine, select
+
+from cache import versao_dados
+from config import opcoes_engine
+from extensions import db
+from models import Categoria, Transacao
+
+JOB_ID_VALIDO = re.compile(r'^\d+-[0-9a-f]{32}$')
+
+_executor = None
+_futuros = {}
+_trava = threading.Lock()
+_engines = {}
+_ultima_limpeza = 0.0
+LIMPEZA_INTERVALO = 60  # segundos entre duas varreduras da pasta
+
+
+def identificar(filtro):
+    """
+    Identificador do trabalho: o mesmo usuário com os mesmos filtros e a
+    mesma versão dos dados gera o mesmo id.
+    """
+    versao = versao_dados(db.session, filtro.usuario_id)
+    chave = json.dumps([filtro.usuario_id, versao, filtro.as_args()], sort_keys=True)
+    return f"{filtro.usuario_id}-{hashlib.sha256(chave.encode()).hexdigest()[:32]}"
+
+
+def pertence(job_id, usuario_id):
+    return bool(JOB_ID_VALIDO.match(job_id)) and job_id.split('-', 1)[0] == str(usuario_id)
+
+
+def caminho(job_id):
+    return os.path.join(current_app.config['RELATORIOS_DIR'], f'{job_id}.pdf')
+
+
+def _obter_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=current_app.config['RELATORIOS_PROCESSOS'],
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return _executor
+
+
+def enfileirar(nome_usuario, filtro):
+    """
+    Agenda a geração do relatório e retorna o id do trabalho.
+    Se o mesmo relatório já estiver pronto (dentro da validade) ou sendo
+    gerado, apenas devolve o id existente.
+    """
+    job_id = identificar(filtro)
+    destino = caminho(job_id)
+    marcador = destino + '.pendente'
+    validade = current_app.config['RELATORIOS_VALIDADE']
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+
+    with _trava:
+        _limpar_se_preciso(os.path.dirname(destino))
+        futuro = _futuros.get(job_id)
+        if futuro is not None and not futuro.done():
+            return job_id
+
+        if os.path.exists(destino) and time.time() - os.path.getmtime(destino) < validade:
+            return job_id
+
+        # O marcador é criado de forma atômica: só um worker gera cada relatório
+        try:
+            os.close(os.open(marcador, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            if time.time() - os.path.getmtime(marcador) < current_app.config['RELATORIOS_TIMEOUT']:
+                return job_id
+            # Marcador abandonado por um processo que morreu: assume o trabalho
+
+        if os.path.exists(destino + '.erro'):
+            os.remove(destino + '.erro')
+
+        executor = _obter_executor()
+        try:
+            futuro = executor.submit(
+                renderizar,
+                destino,
+                nome_usuario,
+                filtro,
+                db.engine.url.render_as_string(hide_password=False)
+            )
+        except Exception:
+            os.remove(marcador)
+            raise
+        futuro.add_done_callback(partial(_concluido, job_id, destino, executor))
+        _futuros[job_id] = futuro
+    return job_id
+
+
+def _concluido(job_id, destino, executor, futuro):
+    """
+    Executado no processo pai ao fim do trabalho: tira o futuro de _futuros
+    e, se o processo do pool morreu antes do except/finally de renderizar(),
+    registra o erro aqui (senão o marcador ficaria para trás e o status
+    seria 'processando' até o timeout).
+    """
+    global _executor
+    # Sem a trava: enfileirar() a segura enquanto chama submit()
+    if _futuros.get(job_id) is futuro:
+        _futuros.pop(job_id, None)
+    erro = None if futuro.cancelled() else futuro.exception()
+    if not futuro.cancelled() and erro is None:
+        return
+    if isinstance(erro, BrokenProcessPool) and _executor is executor:
+        # Um pool quebrado recusa novos trabalhos: o próximo enfileirar cria outro
+        _executor = None
+    if not os.path.exists(destino + '.erro'):
+        with open(destino + '.erro', 'w', encoding='utf-8') as arquivo:
+            arquivo.write(str(erro or 'cancelado'))
+    if os.path.exists(destino + '.pendente'):
+        os.remove(destino + '.pendente')
+
+
+def status(job_id):
+    """Retorna 'processando', 'pronto', 'erro' ou None se o trabalho não existir."""
+    destino = caminho(job_id)
+    if os.path.exists(destino + '.pendente'):
+        return 'processando'
+    # Um PDF antigo pode ter ficado de uma geração anterior: o erro da última vale mais
+    if os.path.exists(destino + '.erro'):
+        return 'erro'
+    if os.path.exists(destino):
+        return 'pronto'
+    return None
+
+
+def limpar(pasta, retencao, timeout):
+    """
+    Apaga da pasta os PDFs, erros e temporários mais antigos que `retencao`
+    segundos e os marcadores de trabalhos parados há mais de `timeout`.
+    Retorna quantos arquivos foram apagados.
+    """
+    try:
+        nomes = os.listdir(pasta)
+    except FileNotFoundError:
+        return 0
+    agora = time.time()
+    apagados = 0
+    for nome in nomes:
+        if not JOB_ID_VALIDO.match(nome.split('.', 1)[0]):
+            continue
+        limite = max(retencao, timeout) if nome.endswith('.pendente') else retencao
+        arquivo = os.path.join(pasta, nome)
+        try:
+            if agora - os.path.getmtime(arquivo) > limite:
+                os.remove(arquivo)
+                apagados += 1
+        except FileNotFoundError:
+            pass  # apagado por outro worker
+    return apagados
+
+
+def _limpar_se_preciso(pasta):
+    global _ultima_limpeza
+    agora = time.monotonic()
+    if agora - _ultima_limpeza < LIMPEZA_INTERVALO:
+        return
+    _ultima_limpeza = agora
+    limpar(pasta, current_app.config['RELATORIOS_RETENCAO'], current_app.config['RELATORIOS_TIMEOUT'])
+
+
+def _conexao(database_url):
+    engine = _engines.get(database_url)
+    if engine is None:
+        # Cada processo do pool gera um relatório por vez: pool mínimo, com pre-ping
+        engine = _engines[database_url] = create_engine(database_url, **opcoes_engine(database_url, threads=1))
+    return engine.connect()
+
+
+def _buscar_transacoes(conexao, filtro):
+    consulta = filtro.select(
+        Transacao.data,
+        Transacao.descricao,
+        Transacao.tipo,
+        Categoria.nome.label('categoria'),
+        Transacao.valor_centavos
+    ).outerjoin(Categoria).order_by(Transacao.data.desc())
+    return conexao.execute(consulta).all()
+
+
+def renderizar(destino, nome_usuario, filtro, database_url):
+    """Executado no processo do pool: busca as transações e grava o PDF em disco."""
+    marcador = destino + '.pendente'
+    temporario = destino + '.tmp'
+    try:
+        # O ReportLab só é carregado nos processos que geram relatórios
+        from relatorio_pdf import montar_pdf
+
+        with _conexao(database_url) as conexao:
+            transacoes = _buscar_transacoes(conexao, filtro)
+            totais = filtro.totais(conexao)
+        montar_pdf(temporario, nome_usuario, filtro, transacoes, totais)
+        os.replace(temporario, destino)
+    except Exception as e:
+        with open(destino + '.erro', 'w', encoding='utf-8') as arquivo:
+            arquivo.write(str(e))
+        raise
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        os.remove(marcador)
@@ -0,0 +1,225 @@
+import click
+from flask.cli import AppGroup
+from extensions import db
+from models import Transacao, ResumoMensal
+from periodos import mes_de
+from sqlalchemy import bindparam, event, func, inspect, insert, select, update, delete
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+CAMPOS_TRANSACAO = ('id', 'usuario_id', 'data', 'tipo', 'categoria_id', 'valor_centavos', 'descricao')
+
+
+def valores_antigos(transacao):
+    """Valores da transação como estão no banco, antes das alterações pendentes."""
+    estado = inspect(transacao)
+    valores = {}
+    for campo in CAMPOS_TRANSACAO:
+        historico = estado.attrs[campo].history
+        if historico.deleted:
+            valores[campo] = historico.deleted[0]
+        elif historico.unchanged:
+            valores[campo] = historico.unchanged[0]
+        else:
+            valores[campo] = getattr(transacao, campo)
+    return valores
+
+
+def valores_atuais(transacao):
+    return {campo: getattr(transacao, campo) for campo in CAMPOS_TRANSACAO}
+
+
+def variacoes_transacoes(session):
+    """
+    Lista (valores, sinal) para cada Transacao pendente na sessão:
+    inclusões entram com +1, exclusões com -1 e edições saem com os
+    valores antigos (-1) e entram com os novos (+1).
+    """
+    variacoes = []
+    for obj in session.new:
+        if isinstance(obj, Transacao):
+            variacoes.append((valores_atuais(obj), 1))
+    for obj in session.dirty:
+        if isinstance(obj, Transacao) and session.is_modified(obj, include_collections=False):
+            variacoes.append((valores_antigos(obj), -1))
+            variacoes.append((valores_atuais(obj), 1))
+    for obj in session.deleted:
+        if isinstance(obj, Transacao):
+            variacoes.append((valores_antigos(obj), -1))
+    return variacoes
+
+
+_tabela = ResumoMensal.__table__
+_chave = (
+    (_tabela.c.usuario_id == bindparam('chave_usuario_id')) &
+    (_tabela.c.mes == bindparam('chave_mes')) &
+    (_tabela.c.tipo == bindparam('chave_tipo')) &
+    (_tabela.c.categoria_id == bindparam('chave_categoria_id'))
+)
+# Montados uma vez, no import, e não a cada flush: estes comandos rodam em toda
+# gravação de Transacao, e montar a expressão e calcular a chave do cache de
+# compilação do SQLAlchemy custaria mais que executá-los. Assim só os
+# parâmetros mudam. metas.py e saldos.py seguem o mesmo padrão.
+SOMAR = update(_tabela).where(_chave).values(
+    total_centavos=_tabela.c.total_centavos + bindparam('variacao_total'),
+    quantidade=_tabela.c.quantidade + bindparam('variacao_quantidade')
+)
+REMOVER_VAZIA = delete(_tabela).where(_chave, _tabela.c.quantidade <= 0)
+CHAVE = ('usuario_id', 'mes', 'tipo', 'categoria_id')
+
+_INSERT_COM_CONFLITO = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def inserir_ou_somar(conexao, tabela, chave, linha, somar):
+    """
+    Insere a linha; se outra transação já inseriu a mesma chave única
+    (entre o UPDATE sem linhas e este INSERT), soma em vez disso os
+    valores de `somar` ({coluna: variação}) na linha existente.
+    """
+    dialeto = conexao.dialect.name
+    if dialeto in _INSERT_COM_CONFLITO:
+        comando = _INSERT_COM_CONFLITO[dialeto](tabela).values(linha)
+        conexao.execute(comando.on_conflict_do_update(
+            index_elements=list(chave),
+            set_={coluna: tabela.c[coluna] + variacao for coluna, variacao in somar.items()}
+        ))
+    elif dialeto == 'mysql':
+        comando = mysql.insert(tabela).values(linha)
+        conexao.execute(comando.on_duplicate_key_update(
+            {coluna: tabela.c[coluna] + variacao for coluna, variacao in somar.items()}
+        ))
+    else:
+        try:
+            with conexao.begin_nested():
+                conexao.execute(insert(tabela), linha)
+        except IntegrityError:
+            conexao.execute(
+                update(tabela)
+                .where(*(tabela.c[coluna] == linha[coluna] for coluna in chave))
+                .values({coluna: tabela.c[coluna] + variacao for coluna, variacao in somar.items()})
+            )
+
+
+def aplicar_variacoes(conexao, variacoes):
+    """Soma as variações nas linhas do resumo, criando ou removendo linhas quando preciso."""
+    acumulado = {}
+    for valores, sinal in variacoes:
+        if valores['data'] is None:
+            continue
+        chave = (
+            valores['usuario_id'],
+            valores['data'].strftime('%Y-%m'),
+            valores['tipo'],
+            valores['categoria_id'] or 0
+        )
+        total, quantidade = acumulado.get(chave, (0, 0))
+        acumulado[chave] = (total + sinal * valores['valor_centavos'], quantidade + sinal)
+
+    for (usuario_id, mes, tipo, categoria_id), (total, quantidade) in acumulado.items():
+        if not total and not quantidade:
+            continue
+        chave = {
+            'chave_usuario_id': usuario_id,
+            'chave_mes': mes,
+            'chave_tipo': tipo,
+            'chave_categoria_id': categoria_id
+        }
+        resultado = conexao.execute(SOMAR, dict(chave, variacao_total=total, variacao_quantidade=quantidade))
+        if resultado.rowcount == 0:
+            # Linha nova; o UPDATE acima continua sendo o caminho comum
+            inserir_ou_somar(conexao, _tabela, CHAVE, {
+                'usuario_id': usuario_id, 'mes': mes, 'tipo': tipo, 'categoria_id': categoria_id,
+                'total_centavos': total, 'quantidade': quantidade
+            }, {'total_centavos': total, 'quantidade': quantidade})
+        if quantidade < 0:
+            conexao.execute(REMOVER_VAZIA, chave)
+
+
+@event.listens_for(Session, 'after_flush')
+def _atualizar_resumo(session, flush_context):
+    variacoes = variacoes_transacoes(session)
+    if variacoes:
+        aplicar_variacoes(session.connection(), variacoes)
+
+
+def _consulta_agregada(usuario_id=None):
+    mes = mes_de(Transacao.data)
+    categoria = func.coalesce(Transacao.categoria_id, 0)
+    consulta = select(
+        Transacao.usuario_id,
+        mes,
+        Transacao.tipo,
+        categoria,
+        func.sum(Transacao.valor_centavos),
+        func.count(Transacao.id)
+    ).where(Transacao.data.isnot(None)).group_by(Transacao.usuario_id, mes, Transacao.tipo, categoria)
+    if usuario_id is not None:
+        consulta = consulta.where(Transacao.usuario_id == usuario_id)
+    return consulta
+
+
+def reconstruir(usuario_id=None):
+    """Apaga e recalcula o resumo mensal a partir da tabela de transações."""
+    tabela = ResumoMensal.__table__
+    limpeza = delete(tabela)
+    if usuario_id is not None:
+        limpeza = limpeza.where(tabela.c.usuario_id == usuario_id)
+    db.session.execute(limpeza)
+    db.session.execute(insert(tabela).from_select(
+        ['usuario_id', 'mes', 'tipo', 'categoria_id', 'total_centavos', 'quantidade'],
+        _consulta_agregada(usuario_id)
+    ))
+    db.session.commit()
+
+
+def verificar(usuario_id=None):
+    """Compara o resumo com a tabela de transações e retorna as chaves divergentes."""
+    esperado = {
+        tuple(linha[:4]): (linha[4], linha[5])
+        for linha in db.session.execute(_consulta_agregada(usuario_id))
+    }
+    consulta = select(
+        ResumoMensal.usuario_id, ResumoMensal.mes, ResumoMensal.tipo,
+        ResumoMensal.categoria_id, ResumoMensal.total_centavos, ResumoMensal.quantidade
+    )
+    if usuario_id is not None:
+        consulta = consulta.where(ResumoMensal.usuario_id == usuario_id)
+    encontrado = {tuple(linha[:4]): (linha[4], linha[5]) for linha in db.session.execute(consulta)}
+
+    divergencias = []
+    for chave in esperado.keys() | encontrado.keys():
+        # Centavos inteiros: a comparação é exata
+        if esperado.get(chave, (0, 0)) != encontrado.get(chave, (0, 0)):
+            divergencias.append((chave, esperado.get(chave), encontrado.get(chave)))
+    return divergencias
+
+
+resumo_cli = AppGroup('resumo', help='Manutenção do resumo mensal de transações.')
+
+
+@resumo_cli.command('reconstruir')
+@click.option('--usuario', type=int, help='Reconstrói apenas o resumo deste usuário.')
+def reconstruir_comando(usuario):
+    """Recalcula o resumo mensal do zero e confere com as transações."""
+    reconstruir(usuario)
+    divergencias = verificar(usuario)
+    if divergencias:
+        raise click.ClickException(f'{len(divergencias)} divergência(s) após a reconstrução.')
+    click.echo('Resumo mensal reconstruído e conferido.')
+
+
+@resumo_cli.command('verificar')
+@click.option('--usuario', type=int, help='Confere apenas o resumo deste usuário.')
+def verificar_comando(usuario):
+    """Confere o resumo mensal com a tabela de transações."""
+    divergencias = verificar(usuario)
+    for chave, esperado, encontrado in divergencias:
+        click.echo(f'{chave}: esperado {esperado}, encontrado {encontrado}')
+    if divergencias:
+        raise click.ClickException(f'{len(divergencias)} divergência(s) encontradas.')
+    click.echo('Resumo mensal confere com as transações.')
+
+
+def init_app(app):
+    app.cli.add_command(resumo_cli)
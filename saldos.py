@@ -0,0 +1,294 @@
+"""
+Saldo diário acumulado por usuário (tabela saldo_diario).
+
+Cada dia com transações tem uma linha com o movimento do dia e os
+acumulados até ele (receitas, despesas, quantidade e saldo). O total de
+qualquer período é a diferença entre dois acumulados: o do último dia
+até o fim do período e o do último dia antes do início, duas buscas
+pelo índice (usuario_id, data) em vez de somar as transações.
+
+A tabela é mantida no after_flush, como o resumo mensal: uma alteração
+no dia D soma a variação ao movimento e aos acumulados de D e, com um
+único UPDATE, aos acumulados dos dias seguintes. Lançamentos retroativos custam um UPDATE
+sobre os dias com movimento a partir da data, não sobre as transações.
+"""
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, case, delete, event, func, insert, select, update
+from sqlalchemy.orm import Session
+
+import resumo
+from extensions import db
+from models import SaldoDiario, Transacao
+
+LOTE = 5000
+AGRUPAMENTOS = ('dia', 'semana', 'mes')
+
+_tabela = SaldoDiario.__table__
+_usuario = _tabela.c.usuario_id == bindparam('chave_usuario_id')
+_dia = _usuario & (_tabela.c.data == bindparam('chave_data'))
+
+_acumulados = dict(
+    receitas_acumuladas_centavos=_tabela.c.receitas_acumuladas_centavos + bindparam('variacao_receitas'),
+    despesas_acumuladas_centavos=_tabela.c.despesas_acumuladas_centavos + bindparam('variacao_despesas'),
+    quantidade_acumulada=_tabela.c.quantidade_acumulada + bindparam('variacao_quantidade'),
+    saldo_acumulado_centavos=_tabela.c.saldo_acumulado_centavos + bindparam('variacao_saldo')
+)
+SOMAR_DIA = update(_tabela).where(_dia).values(
+    receitas_centavos=_tabela.c.receitas_centavos + bindparam('variacao_receitas'),
+    despesas_centavos=_tabela.c.despesas_centavos + bindparam('variacao_despesas'),
+    quantidade=_tabela.c.quantidade + bindparam('variacao_quantidade'),
+    **_acumulados
+)
+# Só os dias seguintes: o próprio dia é somado por SOMAR_DIA ou pela inserção
+SOMAR_SUFIXO = update(_tabela).where(_usuario, _tabela.c.data > bindparam('chave_data')).values(**_acumulados)
+REMOVER_VAZIO = delete(_tabela).where(_dia, _tabela.c.quantidade <= 0)
+CHAVE = ('usuario_id', 'data')
+ACUMULADO_ATE = select(
+    _tabela.c.receitas_acumuladas_centavos,
+    _tabela.c.despesas_acumuladas_centavos,
+    _tabela.c.quantidade_acumulada
+).where(_usuario, _tabela.c.data <= bindparam('chave_data')).order_by(_tabela.c.data.desc()).limit(1)
+
+
+def _como_data(valor):
+    return valor.date() if isinstance(valor, datetime) else valor
+
+
+def aplicar_variacoes(conexao, variacoes):
+    """Aplica as variações (valores, sinal) de transações ao movimento e aos acumulados diários."""
+    por_dia = {}
+    for valores, sinal in variacoes:
+        if valores['data'] is None:
+            continue
+        chave = (valores['usuario_id'], _como_data(valores['data']))
+        receitas, despesas, quantidade = por_dia.get(chave, (0, 0, 0))
+        valor = sinal * valores['valor_centavos']
+        if valores['tipo'] == 'receita':
+            receitas += valor
+        elif valores['tipo'] == 'despesa':
+            despesas += valor
+        por_dia[chave] = (receitas, despesas, quantidade + sinal)
+
+    for (usuario_id, data), (receitas, despesas, quantidade) in sorted(por_dia.items()):
+        if not receitas and not despesas and not quantidade:
+            continue
+        parametros = {
+            'chave_usuario_id': usuario_id,
+            'chave_data': data,
+            'variacao_receitas': receitas,
+            'variacao_despesas': despesas,
+            'variacao_quantidade': quantidade,
+            'variacao_saldo': receitas - despesas
+        }
+        if not conexao.execute(SOMAR_DIA, parametros).rowcount:
+            # Dia novo: parte do acumulado do último dia anterior com movimento. Se
+            # outra transação inserir o mesmo dia antes, a variação é somada nele
+            anterior = conexao.execute(
+                ACUMULADO_ATE, {'chave_usuario_id': usuario_id, 'chave_data': data - timedelta(days=1)}
+            ).first() or (0, 0, 0)
+            resumo.inserir_ou_somar(conexao, _tabela, CHAVE, {
+                'usuario_id': usuario_id,
+                'data': data,
+                'receitas_centavos': receitas,
+                'despesas_centavos': despesas,
+                'quantidade': quantidade,
+                'receitas_acumuladas_centavos': anterior[0] + receitas,
+                'despesas_acumuladas_centavos': anterior[1] + despesas,
+                'quantidade_acumulada': anterior[2] + quantidade,
+                'saldo_acumulado_centavos': anterior[0] + receitas - anterior[1] - despesas
+            }, {
+                'receitas_centavos': receitas,
+                'despesas_centavos': despesas,
+                'quantidade': quantidade,
+                'receitas_acumuladas_centavos': receitas,
+                'despesas_acumuladas_centavos': despesas,
+                'quantidade_acumulada': quantidade,
+                'saldo_acumulado_centavos': receitas - despesas
+            })
+        conexao.execute(SOMAR_SUFIXO, parametros)
+        if quantidade < 0:
+            # Sem transações no dia, a linha sai; os acumulados dos dias seguintes já estão certos
+            conexao.execute(REMOVER_VAZIO, parametros)
+
+
+@event.listens_for(Session, 'after_flush')
+def _atualizar_saldos(session, flush_context):
+    variacoes = resumo.variacoes_transacoes(session)
+    if variacoes:
+        aplicar_variacoes(session.connection(), variacoes)
+
+
+def acumulado_ate(conexao, usuario_id, data):
+    """(receitas, despesas, quantidade) acumuladas até a data, inclusive."""
+    linha = conexao.execute(ACUMULADO_ATE, {'chave_usuario_id': usuario_id, 'chave_data': data}).first()
+    return tuple(int(valor) for valor in linha) if linha else (0, 0, 0)
+
+
+def totais_periodo(conexao, usuario_id, data_inicial=None, data_final=None):
+    """
+    Totais de receitas, despesas e quantidade entre as datas (inclusivas;
+    None = sem limite), no formato de TransacaoFilter.totais().
+    """
+    fim = acumulado_ate(conexao, usuario_id, _como_data(data_final) if data_final else datetime.max.date())
+    inicio = acumulado_ate(conexao, usuario_id, _como_data(data_inicial) - timedelta(days=1)) if data_inicial else (0, 0, 0)
+    return {
+        'total_receitas': fim[0] - inicio[0],
+        'total_despesas': fim[1] - inicio[1],
+        'quantidade': fim[2] - inicio[2]
+    }
+
+
+def _inicio_grupo(data, agrupamento):
+    if agrupamento == 'mes':
+        return data.replace(day=1)
+    if agrupamento == 'semana':
+        return data - timedelta(days=data.weekday())
+    return data
+
+
+def serie(conexao, usuario_id, data_inicial=None, data_final=None, agrupamento='dia'):
+    """
+    Saldo acumulado ao longo do tempo para gráficos: um ponto por dia com
+    movimento (ou o último dia de cada semana/mês com movimento), mais o
+    saldo anterior ao período. Lê só saldo_diario.
+    """
+    consulta = select(
+        _tabela.c.data,
+        _tabela.c.receitas_centavos,
+        _tabela.c.despesas_centavos,
+        _tabela.c.saldo_acumulado_centavos
+    ).where(_tabela.c.usuario_id == usuario_id).order_by(_tabela.c.data)
+    data_inicial = _como_data(data_inicial)
+    data_final = _como_data(data_final)
+    if data_inicial:
+        consulta = consulta.where(_tabela.c.data >= data_inicial)
+    if data_final:
+        consulta = consulta.where(_tabela.c.data <= data_final)
+
+    pontos = []
+    for data, receitas, despesas, saldo in conexao.execute(consulta):
+        grupo = _inicio_grupo(data, agrupamento)
+        if pontos and pontos[-1]['grupo'] == grupo:
+            ponto = pontos[-1]
+            ponto['receitas'] += receitas
+            ponto['despesas'] += despesas
+        else:
+            ponto = {'grupo': grupo, 'receitas': receitas, 'despesas': despesas}
+            pontos.append(ponto)
+        ponto['data'] = data.isoformat()
+        ponto['saldo'] = saldo
+
+    inicial = 0
+    if data_inicial:
+        receitas, despesas, _ = acumulado_ate(conexao, usuario_id, data_inicial - timedelta(days=1))
+        inicial = receitas - despesas
+    return {
+        'saldo_inicial': inicial,
+        'pontos': [
+            {'data': p['data'], 'receitas': int(p['receitas']), 'despesas': int(p['despesas']), 'saldo': int(p['saldo'])}
+            for p in pontos
+        ]
+    }
+
+
+def _movimento_diario(usuario_id=None):
+    """Movimento por usuário e dia calculado das transações, em ordem para acumular."""
+    def soma(tipo):
+        return func.coalesce(func.sum(case((Transacao.tipo == tipo, Transacao.valor_centavos), else_=0)), 0)
+
+    consulta = select(
+        Transacao.usuario_id, Transacao.data, soma('receita'), soma('despesa'), func.count(Transacao.id)
+    ).where(Transacao.data.isnot(None)).group_by(Transacao.usuario_id, Transacao.data).order_by(
+        Transacao.usuario_id, Transacao.data
+    )
+    if usuario_id is not None:
+        consulta = consulta.where(Transacao.usuario_id == usuario_id)
+
+    anterior = None
+    for uid, data, receitas, despesas, quantidade in db.session.execute(consulta).yield_per(LOTE):
+        if uid != anterior:
+            anterior = uid
+            acumulado_receitas = acumulado_despesas = acumulado_quantidade = 0
+        receitas, despesas = int(receitas), int(despesas)
+        acumulado_receitas += receitas
+        acumulado_despesas += despesas
+        acumulado_quantidade += quantidade
+        yield {
+            'usuario_id': uid,
+            'data': _como_data(data),
+            'receitas_centavos': receitas,
+            'despesas_centavos': despesas,
+            'quantidade': quantidade,
+            'receitas_acumuladas_centavos': acumulado_receitas,
+            'despesas_acumuladas_centavos': acumulado_despesas,
+            'quantidade_acumulada': acumulado_quantidade,
+            'saldo_acumulado_centavos': acumulado_receitas - acumulado_despesas
+        }
+
+
+def reconstruir(usuario_id=None):
+    """Apaga e recalcula os saldos diários a partir da tabela de transações."""
+    limpeza = delete(_tabela)
+    if usuario_id is not None:
+        limpeza = limpeza.where(_tabela.c.usuario_id == usuario_id)
+    db.session.execute(limpeza)
+    # Lido por inteiro antes de inserir: alguns drivers não aceitam outro comando com um cursor aberto
+    linhas = list(_movimento_diario(usuario_id))
+    for inicio in range(0, len(linhas), LOTE):
+        db.session.execute(insert(_tabela), linhas[inicio:inicio + LOTE])
+    db.session.commit()
+
+
+def verificar(usuario_id=None):
+    """Compara os saldos diários com as transações e retorna os dias divergentes."""
+    colunas = [coluna for coluna in _tabela.c.keys() if coluna not in ('id', 'usuario_id', 'data')]
+    esperado = {
+        (linha['usuario_id'], linha['data']): tuple(linha[coluna] for coluna in colunas)
+        for linha in _movimento_diario(usuario_id)
+    }
+    consulta = select(_tabela.c.usuario_id, _tabela.c.data, *(_tabela.c[coluna] for coluna in colunas))
+    if usuario_id is not None:
+        consulta = consulta.where(_tabela.c.usuario_id == usuario_id)
+    encontrado = {
+        (linha[0], _como_data(linha[1])): tuple(int(valor) for valor in linha[2:])
+        for linha in db.session.execute(consulta)
+    }
+
+    divergencias = []
+    for chave in sorted(esperado.keys() | encontrado.keys()):
+        if esperado.get(chave) != encontrado.get(chave):
+            divergencias.append((chave, esperado.get(chave), encontrado.get(chave)))
+    return divergencias
+
+
+saldos_cli = AppGroup('saldos', help='Manutenção do saldo diário acumulado.')
+
+
+@saldos_cli.command('reconstruir')
+@click.option('--usuario', type=int, help='Reconstrói apenas os saldos deste usuário.')
+def reconstruir_comando(usuario):
+    """Recalcula os saldos diários do zero e confere com as transações."""
+    reconstruir(usuario)
+    divergencias = verificar(usuario)
+    if divergencias:
+        raise click.ClickException(f'{len(divergencias)} divergência(s) após a reconstrução.')
+    click.echo('Saldos diários reconstruídos e conferidos.')
+
+
+@saldos_cli.command('verificar')
+@click.option('--usuario', type=int, help='Confere apenas os saldos deste usuário.')
+def verificar_comando(usuario):
+    """Confere os saldos diários com a tabela de transações."""
+    divergencias = verificar(usuario)
+    for chave, esperado, encontrado in divergencias[:50]:
+        click.echo(f'{chave}: esperado {esperado}, encontrado {encontrado}')
+    if divergencias:
+        raise click.ClickException(f'{len(divergencias)} divergência(s) encontradas.')
+    click.echo('Saldos diários conferem com as transações.')
+
+
+def init_app(app):
+    app.cli.add_command(saldos_cli)
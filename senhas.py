@@ -0,0 +1,96 @@
+"""
+Hash de senhas fora da thread da requisição.
+
+O scrypt e o PBKDF2 gastam dezenas a centenas de milissegundos de CPU
+por senha. As chamadas do Werkzeug rodam num pool de threads limitado
+(o hashlib libera o GIL durante o cálculo): no máximo SENHA_THREADS
+hashes ao mesmo tempo por processo e SENHA_FILA esperando; acima disso
+a requisição desiste depois de SENHA_ESPERA segundos com
+ServicoSenhasOcupado, em vez de tirar CPU das outras rotas.
+
+SENHA_METODO é o método do Werkzeug com o custo (ex.: 'scrypt',
+'scrypt:16384:8:1', 'pbkdf2:sha256:600000'). Hashes gravados com outro
+método ou custo são refeitos no próximo login que acertar a senha.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class ServicoSenhasOcupado(RuntimeError):
+    """Fila de hashes cheia: a requisição deve ser recusada e repetida depois."""
+
+
+_config = {'metodo': 'scrypt', 'threads': 2, 'fila': 32, 'espera': 5}
+_executor = None
+_vagas = threading.BoundedSemaphore(_config['threads'] + _config['fila'])
+_trava = threading.Lock()
+_prefixo_metodo = None
+
+
+def _obter_executor():
+    global _executor
+    with _trava:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_config['threads'], thread_name_prefix='senhas')
+        return _executor
+
+
+def _executar(funcao, *args):
+    if not _vagas.acquire(timeout=_config['espera']):
+        raise ServicoSenhasOcupado('Serviço de senhas ocupado.')
+    try:
+        return _obter_executor().submit(funcao, *args).result()
+    finally:
+        _vagas.release()
+
+
+def _prefixo(senha_hash):
+    return senha_hash.split('$', 1)[0]
+
+
+def prefixo_metodo():
+    """Método com custo explícito, como aparece nos hashes (ex.: 'scrypt:32768:8:1')."""
+    global _prefixo_metodo
+    if _prefixo_metodo is None:
+        # O Werkzeug completa os parâmetros omitidos; um hash de teste mostra quais
+        _prefixo_metodo = _prefixo(generate_password_hash('', _config['metodo'], salt_length=1))
+    return _prefixo_metodo
+
+
+def gerar_hash(senha):
+    return _executar(generate_password_hash, senha, _config['metodo'])
+
+
+def _verificar(senha_hash, senha):
+    if not check_password_hash(senha_hash, senha):
+        return False, None
+    if _prefixo(senha_hash) != prefixo_metodo():
+        return True, generate_password_hash(senha, _config['metodo'])
+    return True, None
+
+
+def verificar(senha_hash, senha):
+    """
+    Confere a senha. Retorna (confere, novo_hash): novo_hash só vem
+    preenchido quando a senha confere e o hash usa outro método ou custo.
+    """
+    return _executar(_verificar, senha_hash, senha)
+
+
+def init_app(app):
+    """Configura o serviço a partir de SENHA_METODO, SENHA_THREADS, SENHA_FILA e SENHA_ESPERA."""
+    global _executor, _vagas, _prefixo_metodo
+    _config.update(
+        metodo=app.config.get('SENHA_METODO', 'scrypt'),
+        threads=app.config.get('SENHA_THREADS', 2),
+        fila=app.config.get('SENHA_FILA', 32),
+        espera=app.config.get('SENHA_ESPERA', 5)
+    )
+    with _trava:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = None
+    _vagas = threading.BoundedSemaphore(_config['threads'] + _config['fila'])
+    _prefixo_metodo = None
@@ -0,0 +1,86 @@
+"""
+Usuário autenticado de cada requisição.
+
+O Flask-Login chama carregar() em toda requisição com o id guardado no
+cookie de sessão. Em vez da linha inteira de Usuario, só as colunas
+usadas pelas views e templates (id, nome, email) são lidas, e o
+resultado fica alguns segundos num LRU do processo. O logout e o commit
+de uma alteração no nome, e-mail ou senha descartam a entrada; os outros
+workers enxergam a mudança quando o TTL (SESSAO_CACHE_TTL) vence.
+"""
+from flask_login import UserMixin
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+import pendencias
+from cache import AUSENTE, LRU
+from extensions import db
+from models import Usuario
+
+# Colunas de Usuario que, alteradas, invalidam a identidade em cache
+CAMPOS_IDENTIDADE = ('nome', 'email', 'senha_hash')
+
+_identidades = LRU(max_itens=4096, ttl=60)
+
+
+class UsuarioSessao(UserMixin):
+    """Identidade do usuário logado, sem vínculo com a sessão do SQLAlchemy."""
+
+    def __init__(self, id, nome, email):
+        self.id = id
+        self.nome = nome
+        self.email = email
+
+    def __repr__(self):
+        return f'<UsuarioSessao {self.id}>'
+
+
+def carregar(user_id):
+    """user_loader do Flask-Login: UsuarioSessao do id, ou None se o usuário não existir."""
+    try:
+        usuario_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+    identidade = _identidades.obter(usuario_id)
+    if identidade is AUSENTE:
+        linha = db.session.execute(
+            select(Usuario.id, Usuario.nome, Usuario.email).where(Usuario.id == usuario_id)
+        ).first()
+        if linha is None:
+            return None
+        identidade = UsuarioSessao(*linha)
+        _identidades.definir(usuario_id, identidade)
+    return identidade
+
+
+def esquecer(usuario_id):
+    """Descarta a identidade em cache do usuário neste processo."""
+    _identidades.remover(usuario_id)
+
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_alteracoes(session, flush_context):
+    alteradas = set()
+    for obj in session.dirty:
+        if isinstance(obj, Usuario):
+            estado = inspect(obj)
+            if any(estado.attrs[campo].history.has_changes() for campo in CAMPOS_IDENTIDADE):
+                alteradas.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Usuario):
+            alteradas.add(obj.id)
+    pendencias.adicionar(session, 'identidades_alteradas', alteradas)
+
+
+@event.listens_for(Session, 'after_commit')
+def _esquecer_apos_commit(session):
+    for usuario_id in set(pendencias.retirar(session, 'identidades_alteradas')):
+        esquecer(usuario_id)
+
+
+def init_app(app):
+    """Configura o cache de identidades a partir de SESSAO_CACHE_TTL e SESSAO_CACHE_MAX_ITENS."""
+    _identidades.ttl = app.config.get('SESSAO_CACHE_TTL', 60)
+    _identidades.max_itens = app.config.get('SESSAO_CACHE_MAX_ITENS', 4096)
+    _identidades.limpar()
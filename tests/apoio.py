@@ -0,0 +1,80 @@
+"""
+Apoio aos testes: a aplicação de create_app sobre um SQLite em memória,
+com as tabelas e as categorias padrão criadas como no init-db, e dados.
+"""
+import random
+from datetime import date
+
+from sqlalchemy import event
+
+import categorias
+import desempenho
+import importacao
+from app import create_app
+from config import Config
+from extensions import db
+from models import Usuario
+
+SENHA = 'Teste@2024'
+
+
+class ConfigTeste(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SQLALCHEMY_ENGINE_OPTIONS = {}  # Flask-SQLAlchemy usa StaticPool no SQLite em memória
+    WTF_CSRF_ENABLED = False
+    RATELIMIT_ENABLED = False
+    CACHE_REDIS_URL = None
+    INSTRUMENTACAO = False
+    SENHA_METODO = 'pbkdf2:sha256:1000'  # o custo do hash não interessa aqui
+
+
+def criar_app(config=ConfigTeste, **opcoes):
+    app = create_app(type('Config', (config,), opcoes))
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as conexao:
+            categorias.criar_padroes(conexao)
+    return app
+
+
+def criar_usuario(app, email='ana@exemplo.com', nome='Ana'):
+    with app.app_context():
+        usuario = Usuario(nome=nome, email=email)
+        usuario.set_password(SENHA)
+        db.session.add(usuario)
+        db.session.commit()
+        return usuario.id
+
+
+def importar_sinteticas(app, usuario_id, transacoes=600, anos=2, semente=1, hoje=None):
+    """
+    Grava transações sintéticas (desempenho.transacoes_sinteticas) pelo
+    caminho da importação, que mantém resumo, saldos, metas e busca.
+    """
+    rnd = random.Random(f'{semente}:{usuario_id}')
+    registros = desempenho.transacoes_sinteticas(rnd, hoje or date.today(), anos, transacoes / (anos * 12))
+    with app.app_context():
+        return importacao.importar(usuario_id, enumerate(registros, start=1))
+
+
+class ContadorConsultas:
+    """Conta os comandos SQL enviados ao banco enquanto está ativo (with)."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.comandos = []
+
+    def _registrar(self, conexao, cursor, comando, parametros, contexto, executemany):
+        self.comandos.append(comando)
+
+    def __enter__(self):
+        self.comandos.clear()
+        event.listen(self.engine, 'before_cursor_execute', self._registrar)
+        return self
+
+    def __exit__(self, *excecao):
+        event.remove(self.engine, 'before_cursor_execute', self._registrar)
+
+    def __len__(self):
+        return len(self.comandos)
@@ -0,0 +1,71 @@
+"""
+Micro-benchmarks (pytest-benchmark) de rotas e consultas agregadas.
+
+Os dados vêm de desempenho.gerar(), uma vez por sessão, num SQLite em
+arquivo (os relatórios PDF abrem a própria conexão). Pelo pytest.ini os
+benchmarks rodam uma vez só, como testes; para medir e comparar rodadas:
+
+    pytest tests/benchmarks --benchmark-enable --benchmark-autosave
+    pytest tests/benchmarks --benchmark-enable --benchmark-compare
+
+BENCHMARK_USUARIOS e BENCHMARK_TRANSACOES (por usuário) mudam o volume.
+"""
+import os
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+import desempenho
+from apoio import criar_app
+from config import Config, opcoes_engine
+from extensions import db
+from models import Usuario
+
+USUARIOS = int(os.getenv('BENCHMARK_USUARIOS', 3))
+TRANSACOES = int(os.getenv('BENCHMARK_TRANSACOES', 2000))
+ANOS = 3
+SEMENTE = 42
+
+
+@pytest.fixture(scope='session')
+def app_carga(tmp_path_factory):
+    pasta = tmp_path_factory.mktemp('carga')
+    url = f"sqlite:///{pasta / 'carga.db'}"
+    app = criar_app(
+        SQLALCHEMY_DATABASE_URI=url,
+        SQLALCHEMY_ENGINE_OPTIONS=opcoes_engine(url),
+        RELATORIOS_DIR=str(pasta / 'relatorios'),
+        SENHA_METODO=Config.SENHA_METODO,  # o login é medido com o custo real
+    )
+    with app.app_context():
+        desempenho.gerar(USUARIOS, TRANSACOES, ANOS, SEMENTE, hoje=date.today())
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture(scope='session')
+def usuario_carga(app_carga):
+    """(id, e-mail, nome) do primeiro usuário gerado."""
+    with app_carga.app_context():
+        return db.session.execute(
+            select(Usuario.id, Usuario.email, Usuario.nome).where(Usuario.email == desempenho.email_gerado('carga', 0))
+        ).one()
+
+
+@pytest.fixture(scope='session')
+def cliente_carga(app_carga, usuario_carga):
+    cliente = app_carga.test_client()
+    resposta = cliente.post('/login', data={'email': usuario_carga.email, 'senha': desempenho.SENHA})
+    assert resposta.status_code == 302
+    return cliente
+
+
+@pytest.fixture
+def contexto_carga(app_carga):
+    """Contexto da aplicação para medir funções que usam db.session."""
+    with app_carga.app_context():
+        yield
+        db.session.rollback()
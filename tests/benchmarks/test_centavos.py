@@ -0,0 +1,85 @@
+"""
+Dinheiro em centavos inteiros (dinheiro.py): vazão da soma agregada
+contra a antiga coluna Float e exatidão dos totais.
+"""
+import random
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, text
+
+import importacao
+from apoio import criar_usuario
+from estatisticas import calcular_painel
+from extensions import db
+from filtros import TransacaoFilter
+
+LINHAS = 200_000
+
+
+def _valores(quantidade, semente=13):
+    """(tipo, valor em Decimal) com centavos quaisquer, como digitados."""
+    rnd = random.Random(semente)
+    return [
+        ('receita' if rnd.random() < 0.2 else 'despesa', Decimal(rnd.randint(1, 2_000_000)) / 100)
+        for _ in range(quantidade)
+    ]
+
+
+@pytest.fixture(scope='module')
+def tabela_valores():
+    """Tabela com a mesma quantia em REAL (a coluna antiga) e em INTEGER (centavos)."""
+    valores = _valores(LINHAS)
+    engine = create_engine('sqlite://')
+    with engine.begin() as conexao:
+        conexao.exec_driver_sql('CREATE TABLE valores (tipo VARCHAR(10), valor REAL, valor_centavos INTEGER)')
+        conexao.exec_driver_sql(
+            'INSERT INTO valores VALUES (?, ?, ?)',
+            [(tipo, float(valor), int(valor * 100)) for tipo, valor in valores]
+        )
+    esperado = {
+        tipo: sum(int(valor * 100) for t, valor in valores if t == tipo) for tipo in ('receita', 'despesa')
+    }
+    yield engine, esperado
+    engine.dispose()
+
+
+@pytest.mark.benchmark(group='soma_por_tipo')
+@pytest.mark.parametrize('coluna', ['valor', 'valor_centavos'])
+def test_soma_por_tipo(benchmark, tabela_valores, coluna):
+    engine, esperado = tabela_valores
+    consulta = text(
+        f"SELECT SUM(CASE WHEN tipo = 'receita' THEN {coluna} ELSE 0 END), "
+        f"SUM(CASE WHEN tipo = 'despesa' THEN {coluna} ELSE 0 END) FROM valores"
+    )
+    with engine.connect() as conexao:
+        receitas, despesas = benchmark(lambda: conexao.execute(consulta).one())
+
+    if coluna == 'valor_centavos':
+        assert (receitas, despesas) == (esperado['receita'], esperado['despesa'])
+    else:
+        # A soma em ponto flutuante só chega perto
+        assert round(receitas * 100) == esperado['receita']
+
+
+def test_totais_exatos(app):
+    """Quantias que não têm representação exata em float somam exatamente."""
+    usuario = criar_usuario(app)
+    quantias = ['0.10', '0.20', '0.30', '19.99', '1234.57', '0.01']
+    registros = [
+        {'data': f'2025-{mes:02d}-{dia:02d}', 'descricao': f'Item {mes} {dia} {i}', 'valor': quantia,
+         'tipo': 'receita' if i % 2 else 'despesa', 'categoria': 'Alimentação'}
+        for mes in range(1, 13) for dia in range(1, 29) for i, quantia in enumerate(quantias)
+    ]
+    esperado = {
+        tipo: sum(int(Decimal(r['valor']) * 100) for r in registros if r['tipo'] == tipo)
+        for tipo in ('receita', 'despesa')
+    }
+    with app.app_context():
+        assert importacao.importar(usuario, enumerate(registros, start=1))['importadas'] == len(registros)
+        painel = calcular_painel(usuario)
+        # Os dois caminhos de totais: saldo diário (só período) e SUM(CASE) (com filtro)
+        for filtro in (TransacaoFilter(usuario), TransacaoFilter(usuario, categoria='Alimentação')):
+            totais = filtro.totais(db.session)
+            assert (totais['total_receitas'], totais['total_despesas']) == (esperado['receita'], esperado['despesa'])
+    assert (painel['total_receitas'], painel['total_despesas']) == (esperado['receita'], esperado['despesa'])
@@ -0,0 +1,62 @@
+from datetime import date
+
+import pytest
+
+import saldos
+from estatisticas import calcular_painel
+from extensions import db
+from filtros import TransacaoFilter
+from paginacao import paginar
+
+HOJE = date.today()
+INICIO_ANO = HOJE.replace(month=1, day=1)
+# Os cinco filtros, como chegam em request.args
+TODOS_OS_FILTROS = {
+    'data_inicial': INICIO_ANO.isoformat(), 'data_final': HOJE.isoformat(),
+    'tipo': 'despesa', 'categoria': 'Alimentação', 'busca': 'super',
+}
+
+
+@pytest.mark.benchmark(group='consultas')
+def test_painel(benchmark, contexto_carga, usuario_carga):
+    painel = benchmark(calcular_painel, usuario_carga.id)
+    assert painel['relatorio_mensal']
+
+
+@pytest.mark.benchmark(group='consultas')
+def test_totais_periodo(benchmark, contexto_carga, usuario_carga):
+    """Só período: duas buscas no saldo diário."""
+    filtro = TransacaoFilter(usuario_carga.id, INICIO_ANO, HOJE)
+    assert benchmark(filtro.totais, db.session)['quantidade'] > 0
+
+
+@pytest.mark.benchmark(group='consultas')
+def test_totais_filtro(benchmark, contexto_carga, usuario_carga):
+    """Categoria e busca: SUM(CASE) sobre as transações filtradas."""
+    filtro = TransacaoFilter(usuario_carga.id, categoria='Alimentação', busca='super')
+    assert benchmark(filtro.totais, db.session)['quantidade'] > 0
+
+
+@pytest.mark.benchmark(group='consultas')
+def test_pagina_transacoes(benchmark, contexto_carga, usuario_carga):
+    pagina = benchmark(paginar, TransacaoFilter(usuario_carga.id).select())
+    assert pagina['transacoes']
+
+
+@pytest.mark.benchmark(group='consultas')
+def test_serie_saldos_mes(benchmark, contexto_carga, usuario_carga):
+    assert benchmark(saldos.serie, db.session, usuario_carga.id, agrupamento='mes')
+
+
+@pytest.mark.benchmark(group='filtro')
+def test_montar_filtro(benchmark, usuario_carga):
+    """Só o lado Python: ler os argumentos e montar o select()."""
+    benchmark(lambda: TransacaoFilter.from_args(usuario_carga.id, TODOS_OS_FILTROS).select())
+
+
+@pytest.mark.benchmark(group='filtro')
+def test_montar_e_buscar_filtro(benchmark, contexto_carga, usuario_carga):
+    def buscar():
+        return db.session.scalars(TransacaoFilter.from_args(usuario_carga.id, TODOS_OS_FILTROS).select()).all()
+
+    assert benchmark(buscar)
@@ -0,0 +1,65 @@
+"""
+Filtro por mês (periodos.py): intervalo na coluna data contra strftime()
+na coluna e contra a tabela sem índice. BENCHMARK_LINHAS muda o volume
+(a medição original usou 1.000.000 de linhas de 1.000 usuários).
+"""
+import os
+import random
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, select, text
+
+from extensions import db
+from models import Transacao
+from periodos import mes_de, no_mes
+
+LINHAS = int(os.getenv('BENCHMARK_LINHAS', 200_000))
+USUARIOS = 1000
+MES = '2025-02'
+
+
+@pytest.fixture(scope='module')
+def engine_transacoes():
+    """SQLite em memória com o esquema da aplicação e transações de dois anos."""
+    rnd = random.Random(7)
+    inicio = date(2024, 1, 1)
+    engine = create_engine('sqlite://')
+    db.metadata.create_all(engine)
+    linhas = [
+        (rnd.randint(1, USUARIOS), 'x', rnd.randint(100, 50_000), 'despesa' if rnd.random() < 0.8 else 'receita',
+         (inicio + timedelta(days=rnd.randrange(730))).isoformat())
+        for _ in range(LINHAS)
+    ]
+    with engine.begin() as conexao:
+        conexao.exec_driver_sql(
+            'INSERT INTO transacao (usuario_id, descricao, valor_centavos, tipo, data) VALUES (?, ?, ?, ?, ?)', linhas
+        )
+        conexao.exec_driver_sql('ANALYZE')
+    yield engine
+    engine.dispose()
+
+
+def _despesas_do_mes(condicao):
+    return select(func.sum(Transacao.valor_centavos)).where(
+        Transacao.usuario_id == 1, Transacao.tipo == 'despesa', condicao
+    )
+
+
+CONSULTAS = {
+    'intervalo': _despesas_do_mes(no_mes(Transacao.data, MES)),
+    'strftime': _despesas_do_mes(mes_de(Transacao.data) == MES),
+    'sem_indice': text(
+        "SELECT SUM(valor_centavos) FROM transacao NOT INDEXED "
+        "WHERE usuario_id = 1 AND tipo = 'despesa' AND strftime('%Y-%m', data) = :mes"
+    ).bindparams(mes=MES),
+}
+
+
+@pytest.mark.benchmark(group='despesas_do_mes')
+@pytest.mark.parametrize('variante', list(CONSULTAS))
+def test_despesas_do_mes(benchmark, engine_transacoes, variante):
+    with engine_transacoes.connect() as conexao:
+        total = benchmark(lambda: conexao.execute(CONSULTAS[variante]).scalar())
+        # As três formas somam as mesmas linhas
+        assert total == conexao.execute(CONSULTAS['sem_indice']).scalar()
@@ -0,0 +1,62 @@
+"""
+Inicialização da aplicação (create_app): o tempo de um processo novo até
+a aplicação pronta, como num worker do gunicorn, e os módulos pesados que
+não devem ser carregados nesse caminho.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Só nos processos que geram PDF (relatorio_pdf.py) e no lote de previsão
+CARREGADOS_SOB_DEMANDA = ('reportlab', 'numpy', 'relatorio_pdf')
+
+INICIAR = '''
+import json, sys, time
+inicio = time.perf_counter()
+import app
+importado = time.perf_counter()
+app.create_app()
+pronto = time.perf_counter()
+print(json.dumps({
+    'importacao': importado - inicio,
+    'create_app': pronto - importado,
+    'modulos': sorted({nome.split('.')[0] for nome in sys.modules}),
+}))
+'''
+
+
+def _iniciar():
+    resultado = subprocess.run(
+        [sys.executable, '-c', INICIAR], cwd=RAIZ, capture_output=True, text=True, check=True,
+        env=dict(os.environ, DATABASE_URL='sqlite://')
+    )
+    return json.loads(resultado.stdout)
+
+
+def _mediana(valores):
+    return sorted(valores)[len(valores) // 2]
+
+
+@pytest.mark.benchmark(group='inicializacao')
+def test_processo_ate_a_aplicacao_pronta(benchmark):
+    """
+    Processo novo: interpretador, import app e create_app(). O import e o
+    create_app(), medidos dentro do processo, vão para extra_info (ms).
+    """
+    tempos = []
+
+    def iniciar():
+        tempos.append(_iniciar())
+
+    benchmark.pedantic(iniciar, rounds=5, warmup_rounds=1)
+    benchmark.extra_info['importacao_ms'] = round(_mediana([t['importacao'] for t in tempos]) * 1000, 1)
+    benchmark.extra_info['create_app_ms'] = round(_mediana([t['create_app'] for t in tempos]) * 1000, 1)
+
+
+def test_create_app_nao_carrega_modulos_pesados():
+    carregados = set(_iniciar()['modulos'])
+    assert not carregados & set(CARREGADOS_SOB_DEMANDA)
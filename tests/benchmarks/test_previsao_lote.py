@@ -0,0 +1,53 @@
+"""
+Lote de previsão (previsao.calcular): usuários por segundo, com 300
+despesas por usuário em 13 meses. BENCHMARK_PREVISAO_USUARIOS muda o
+volume (a medição original usou 2.000 e 10.000 usuários).
+"""
+import os
+import random
+import time
+from datetime import date, timedelta
+
+import pytest
+
+import previsao
+from apoio import criar_app
+from extensions import db
+
+USUARIOS = int(os.getenv('BENCHMARK_PREVISAO_USUARIOS', 500))
+DESPESAS = 300
+HOJE = date(2025, 7, 17)
+
+
+@pytest.fixture(scope='module')
+def app_previsao():
+    """Transações gravadas direto na tabela: o lote só lê Transacao."""
+    rnd = random.Random(21)
+    inicio = HOJE.replace(year=HOJE.year - 1, day=1)
+    dias = (HOJE - inicio).days + 1
+    app = criar_app()
+    with app.app_context():
+        conexao = db.session.connection()
+        conexao.exec_driver_sql(
+            "INSERT INTO usuario (nome, email, senha_hash) VALUES (?, ?, '-')",
+            [(f'Usuário {i}', f'previsao{i}@exemplo.com') for i in range(USUARIOS)]
+        )
+        conexao.exec_driver_sql(
+            "INSERT INTO transacao (usuario_id, descricao, valor_centavos, tipo, categoria_id, data) "
+            "VALUES (?, 'x', ?, 'despesa', ?, ?)",
+            [
+                (usuario_id, rnd.randint(500, 50_000), rnd.randint(1, 8), (inicio + timedelta(days=rnd.randrange(dias))).isoformat())
+                for usuario_id in range(1, USUARIOS + 1) for _ in range(DESPESAS)
+            ]
+        )
+        db.session.commit()
+    return app
+
+
+@pytest.mark.benchmark(group='previsao')
+def test_calcular(benchmark, app_previsao):
+    with app_previsao.app_context():
+        inicio = time.perf_counter()
+        resultado = benchmark.pedantic(previsao.calcular, args=(HOJE,), rounds=1)
+        benchmark.extra_info['usuarios_por_segundo'] = round(USUARIOS / (time.perf_counter() - inicio))
+    assert resultado['usuarios'] == USUARIOS
@@ -0,0 +1,77 @@
+"""
+Montagem do PDF (relatorio_pdf.montar_pdf) em blocos de LINHAS_POR_BLOCO
+linhas: tempo e pico de memória. BENCHMARK_PDF_LINHAS (lista separada por
+vírgulas) muda os tamanhos; a medição original incluía 100000.
+
+O pico de RSS é medido num processo novo (spawn), como os do pool de
+relatórios, para não herdar a memória do pytest.
+"""
+import multiprocessing
+import os
+import random
+import resource
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+import pytest
+
+from filtros import TransacaoFilter
+
+TAMANHOS = [int(n) for n in os.getenv('BENCHMARK_PDF_LINHAS', '1000,10000').split(',')]
+CATEGORIAS = ['Alimentação', 'Transporte', 'Moradia', 'Saúde', 'Lazer', 'Educação', None]
+
+# Mesmas colunas de relatorios._buscar_transacoes
+Linha = namedtuple('Linha', 'data descricao tipo categoria valor_centavos')
+
+
+def _transacoes(quantidade, semente=3):
+    rnd = random.Random(semente)
+    hoje = date(2025, 6, 30)
+    return [
+        Linha(hoje - timedelta(days=i // 20), f'Compra {i} no estabelecimento {rnd.randint(1, 500)}',
+              'receita' if rnd.random() < 0.2 else 'despesa', rnd.choice(CATEGORIAS), rnd.randint(100, 500_000))
+        for i in range(quantidade)
+    ]
+
+
+def _montar(destino, transacoes):
+    from relatorio_pdf import montar_pdf
+
+    totais = {
+        'total_receitas': sum(t.valor_centavos for t in transacoes if t.tipo == 'receita'),
+        'total_despesas': sum(t.valor_centavos for t in transacoes if t.tipo == 'despesa'),
+    }
+    montar_pdf(destino, 'Ana', TransacaoFilter(1), transacoes, totais)
+
+
+def _medir_em_processo_novo(destino, quantidade):
+    """Executado no processo filho: (segundos, RSS antes de montar e pico de RSS, em MB)."""
+    from relatorio_pdf import montar_pdf  # noqa: F401 (o ReportLab carregado não entra na conta)
+
+    transacoes = _transacoes(quantidade)
+    # ru_maxrss vem em KB no Linux
+    antes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    inicio = time.perf_counter()
+    _montar(destino, transacoes)
+    segundos = time.perf_counter() - inicio
+    return segundos, antes, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@pytest.mark.benchmark(group='montar_pdf')
+@pytest.mark.parametrize('quantidade', TAMANHOS)
+def test_montar_pdf(benchmark, tmp_path, quantidade):
+    transacoes = _transacoes(quantidade)
+    destino = str(tmp_path / 'relatorio.pdf')
+    benchmark(_montar, destino, transacoes)
+    assert os.path.getsize(destino) > 0
+
+
+@pytest.mark.parametrize('quantidade', TAMANHOS)
+def test_pico_de_memoria(tmp_path, quantidade):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        segundos, antes_mb, pico_mb = executor.submit(_medir_em_processo_novo, str(tmp_path / 'relatorio.pdf'), quantidade).result()
+    print(f'\n{quantidade} linhas: {segundos:.2f} s, pico de {pico_mb:.0f} MB ({antes_mb:.0f} MB antes)')
+    # As tabelas ficam todas na lista até o build(): uns 2,5 MB a cada mil linhas
+    assert pico_mb - antes_mb < 10 + quantidade / 250
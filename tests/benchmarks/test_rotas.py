@@ -0,0 +1,76 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pytest
+
+import desempenho
+import relatorios
+import senhas
+from filtros import TransacaoFilter
+
+# As mesmas rotas da carga (desempenho.MISTURA_CARGA); o PDF é medido à parte
+HOJE = date.today()
+ROTAS = {
+    nome: caminho.format(hoje=HOJE, inicio_ano=HOJE.replace(month=1, day=1))
+    for nome, _, caminho in desempenho.MISTURA_CARGA
+    if caminho and nome != 'export_pdf'
+}
+
+
+@pytest.mark.benchmark(group='rotas')
+@pytest.mark.parametrize('caminho', ROTAS.values(), ids=ROTAS.keys())
+def test_rota(benchmark, cliente_carga, caminho):
+    def pedir():
+        resposta = cliente_carga.get(caminho)
+        resposta.get_data()  # consome respostas em streaming (CSV)
+        return resposta.status_code
+
+    assert benchmark(pedir) == 200
+
+
+@pytest.fixture
+def senhas_carga(app_carga):
+    """O serviço de senhas é global: volta para o custo real da app de carga."""
+    senhas.init_app(app_carga)
+
+
+@pytest.mark.benchmark(group='rotas')
+def test_login(benchmark, app_carga, usuario_carga, senhas_carga):
+    cliente = app_carga.test_client()
+    dados = {'email': usuario_carga.email, 'senha': desempenho.SENHA}
+    assert benchmark(lambda: cliente.post('/login', data=dados).status_code) == 302
+
+
+@pytest.mark.benchmark(group='login_rajada')
+def test_login_em_rajada(benchmark, app_carga, usuario_carga, senhas_carga):
+    """48 logins de 16 threads; o pool de senhas limita os hashes simultâneos."""
+    logins, threads = 48, 16
+    dados = {'email': usuario_carga.email, 'senha': desempenho.SENHA}
+
+    def rajada():
+        with ThreadPoolExecutor(threads) as executor:
+            return list(executor.map(lambda _: app_carga.test_client().post('/login', data=dados).status_code,
+                                     range(logins)))
+
+    inicio = time.perf_counter()
+    codigos = benchmark.pedantic(rajada, rounds=1)
+    benchmark.extra_info['logins_por_segundo'] = round(logins / (time.perf_counter() - inicio), 1)
+    # Com a fila padrão (SENHA_FILA) ninguém fica sem vaga
+    assert codigos == [302] * logins
+
+
+@pytest.mark.benchmark(group='rotas')
+def test_renderizacao_pdf(benchmark, app_carga, usuario_carga, tmp_path):
+    """O trabalho do processo do pool (export_pdf só enfileira), sem a fila."""
+    filtro = TransacaoFilter(usuario_carga.id, HOJE.replace(month=1, day=1), HOJE)
+    destino = str(tmp_path / 'relatorio.pdf')
+    url = app_carga.config['SQLALCHEMY_DATABASE_URI']
+
+    def renderizar():
+        open(destino + '.pendente', 'w').close()
+        relatorios.renderizar(destino, usuario_carga.nome, filtro, url)
+
+    benchmark(renderizar)
+    assert os.path.getsize(destino) > 0 and not os.path.exists(destino + '.pendente')
@@ -0,0 +1,53 @@
+"""Fixtures dos testes; a aplicação e os dados vêm de apoio.py."""
+import pytest
+
+import resumo
+from apoio import SENHA, ContadorConsultas, criar_app, criar_usuario
+from extensions import db
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = criar_app(RELATORIOS_DIR=str(tmp_path / 'relatorios'))
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def cliente(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def usuario(app):
+    """Id de um usuário sem transações."""
+    return criar_usuario(app)
+
+
+@pytest.fixture
+def logado(cliente, usuario):
+    """Cliente de teste com a sessão do `usuario`."""
+    resposta = cliente.post('/login', data={'email': 'ana@exemplo.com', 'senha': SENHA})
+    assert resposta.status_code == 302
+    return cliente
+
+
+@pytest.fixture(params=['on_conflict', 'savepoint'])
+def modo_upsert(request, monkeypatch):
+    """
+    Os dois caminhos de resumo.inserir_ou_somar() no SQLite: o INSERT ... ON
+    CONFLICT do dialeto e o de outros bancos (INSERT num savepoint e UPDATE
+    se a chave já existir).
+    """
+    if request.param == 'savepoint':
+        monkeypatch.setattr(resumo, '_INSERT_COM_CONFLITO', {})
+    return request.param
+
+
+@pytest.fixture
+def contar_consultas(app):
+    with app.app_context():
+        engine = db.engine
+    return lambda: ContadorConsultas(engine)
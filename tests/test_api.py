@@ -0,0 +1,64 @@
+import cache
+import importacao
+import relatorios
+from extensions import db
+from filtros import TransacaoFilter
+
+TRANSACAO = {'descricao': 'Mercado', 'valor_centavos': 4590, 'tipo': 'despesa', 'categoria': 'Alimentação', 'data': '2025-03-10'}
+
+
+def _etag(cliente, caminho='/api/v1/estatisticas'):
+    resposta = cliente.get(caminho)
+    assert resposta.status_code == 200
+    return resposta.headers['ETag']
+
+
+def test_etag_sobrevive_ao_reinicio_do_cache(logado):
+    logado.post('/api/v1/transacoes', json=TRANSACAO)
+    etag = _etag(logado)
+    # Como num worker reiniciado sem CACHE_REDIS_URL: a versão do cache volta a zero
+    cache.cache_usuario.backend = cache.BackendMemoria()
+
+    assert _etag(logado) == etag
+    assert logado.get('/api/v1/estatisticas', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_etag_muda_a_cada_gravacao(logado):
+    etags = [_etag(logado)]
+    criada = logado.post('/api/v1/transacoes', json=TRANSACAO).get_json()
+    etags.append(_etag(logado))
+    logado.put(f"/api/v1/transacoes/{criada['id']}", json=dict(TRANSACAO, valor_centavos=4600))
+    etags.append(_etag(logado))
+    logado.delete(f"/api/v1/transacoes/{criada['id']}")
+    etags.append(_etag(logado))
+
+    assert len(set(etags)) == len(etags)
+
+
+def test_importacao_muda_a_versao(app, usuario):
+    registro = {'descricao': 'Mercado', 'valor': '45.90', 'tipo': 'despesa', 'categoria': 'Alimentação', 'data': '2025-03-10'}
+    with app.app_context():
+        antes = cache.versao_dados(db.session, usuario)
+        assert importacao.importar(usuario, [(1, registro)])['importadas'] == 1
+        assert cache.versao_dados(db.session, usuario) > antes
+
+
+def test_id_do_relatorio_sobrevive_ao_reinicio_do_cache(app, usuario):
+    with app.app_context():
+        job_id = relatorios.identificar(TransacaoFilter(usuario))
+        cache.cache_usuario.backend = cache.BackendMemoria()
+        assert relatorios.identificar(TransacaoFilter(usuario)) == job_id
+
+
+def test_painel_nunca_e_anterior_a_versao_do_etag(logado, monkeypatch):
+    """Outro worker com BackendMemoria: a versão do cache não muda com o commit daqui."""
+    logado.post('/api/v1/transacoes', json=TRANSACAO)
+    antes = logado.get('/api/v1/estatisticas')
+    monkeypatch.setattr(cache.cache_usuario, 'invalidar', lambda usuario_id: None)
+
+    logado.post('/api/v1/transacoes', json=dict(TRANSACAO, descricao='Passagem', categoria='Viagem', valor_centavos=10000))
+    depois = logado.get('/api/v1/estatisticas')
+
+    assert depois.headers['ETag'] != antes.headers['ETag']
+    assert depois.get_json()['total_despesas'] == antes.get_json()['total_despesas'] + 10000
+    assert 'Viagem' in depois.get_json()['categorias']
@@ -0,0 +1,24 @@
+import logging
+
+import pytest
+
+from apoio import criar_app
+from extensions import db
+
+
+@pytest.mark.parametrize('sem_busca', [True, False])
+def test_avisa_quando_a_tabela_de_busca_falta(tmp_path, caplog, sem_busca):
+    url = f"sqlite:///{tmp_path / 'financas.db'}"
+    with criar_app(SQLALCHEMY_DATABASE_URI=url).app_context():
+        if sem_busca:
+            # Como num banco criado antes da busca textual
+            db.session.execute(db.text('DROP TABLE transacao_busca'))
+            db.session.commit()
+        db.engine.dispose()
+
+    with caplog.at_level(logging.ERROR):
+        app = criar_app(SQLALCHEMY_DATABASE_URI=url)
+    with app.app_context():
+        db.engine.dispose()
+
+    assert ('transacao_busca ausente' in caplog.text) == sem_busca
@@ -0,0 +1,89 @@
+import pytest
+from sqlalchemy import create_engine, exc
+
+from config import PoolMedido, metricas_pool, opcoes_engine
+
+VARIAVEIS = ('GUNICORN_THREADS', 'WEB_CONCURRENCY', 'DB_POOL_SIZE', 'DB_MAX_OVERFLOW', 'DB_MAX_CONEXOES',
+             'DB_POOL_TIMEOUT', 'DB_POOL_RECYCLE', 'DB_POOL_PRE_PING', 'DB_STATEMENT_TIMEOUT_MS')
+
+
+@pytest.fixture(autouse=True)
+def ambiente_limpo(monkeypatch):
+    for nome in VARIAVEIS:
+        monkeypatch.delenv(nome, raising=False)
+    return monkeypatch
+
+
+def test_sqlite():
+    assert opcoes_engine('sqlite://') == {}
+    assert opcoes_engine('sqlite:///:memory:') == {}
+    assert opcoes_engine('sqlite:////tmp/financas.db') == {'poolclass': PoolMedido}
+
+
+def test_servidor_com_os_padroes():
+    assert opcoes_engine('postgresql://app@localhost/financas') == {
+        'poolclass': PoolMedido, 'pool_size': 1, 'max_overflow': 1,
+        'pool_timeout': 10, 'pool_recycle': 280, 'pool_pre_ping': True,
+    }
+
+
+@pytest.mark.parametrize('ambiente, threads, workers, tamanho, folga', [
+    ({'GUNICORN_THREADS': '4'}, None, None, 4, 4),
+    ({}, 8, None, 8, 8),
+    ({'DB_POOL_SIZE': '3', 'DB_MAX_OVERFLOW': '0'}, 8, None, 3, 0),
+    # 10 conexões para 4 workers: 2 por worker, sem folga
+    ({'DB_MAX_CONEXOES': '10'}, 4, 4, 2, 0),
+    ({'DB_MAX_CONEXOES': '20', 'WEB_CONCURRENCY': '2'}, 4, None, 4, 4),
+    # Menos conexões que workers: ainda uma por worker
+    ({'DB_MAX_CONEXOES': '2'}, 4, 8, 1, 0),
+])
+def test_tamanho_do_pool(ambiente_limpo, ambiente, threads, workers, tamanho, folga):
+    for nome, valor in ambiente.items():
+        ambiente_limpo.setenv(nome, valor)
+    opcoes = opcoes_engine('mysql://app@localhost/financas', threads=threads, workers=workers)
+    assert (opcoes['pool_size'], opcoes['max_overflow']) == (tamanho, folga)
+
+
+@pytest.mark.parametrize('url, connect_args', [
+    ('postgresql://app@localhost/financas', {'options': '-c statement_timeout=1500'}),
+    ('mysql+pymysql://app@localhost/financas', {'init_command': 'SET SESSION max_execution_time=1500'}),
+    ('mariadb://app@localhost/financas', {'init_command': 'SET SESSION max_execution_time=1500'}),
+])
+def test_timeout_de_comando_por_dialeto(ambiente_limpo, url, connect_args):
+    ambiente_limpo.setenv('DB_STATEMENT_TIMEOUT_MS', '1500')
+    assert opcoes_engine(url)['connect_args'] == connect_args
+
+
+def test_opcoes_do_ambiente(ambiente_limpo):
+    ambiente_limpo.setenv('DB_POOL_TIMEOUT', '3')
+    ambiente_limpo.setenv('DB_POOL_RECYCLE', '60')
+    ambiente_limpo.setenv('DB_POOL_PRE_PING', 'nao')
+    opcoes = opcoes_engine('postgresql://app@localhost/financas')
+    assert (opcoes['pool_timeout'], opcoes['pool_recycle'], opcoes['pool_pre_ping']) == (3, 60, False)
+    assert 'connect_args' not in opcoes
+
+
+def test_metricas_de_checkout_e_espera(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=PoolMedido,
+                           pool_size=1, max_overflow=0, pool_timeout=0.2)
+    primeira = engine.connect()
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+
+    metricas = metricas_pool(engine)
+    assert (metricas['checkouts'], metricas['esgotamentos']) == (2, 1)
+    assert metricas['espera_maxima'] >= 0.2
+    assert metricas['espera_total'] >= metricas['espera_maxima']
+    assert (metricas['tamanho'], metricas['em_uso'], metricas['overflow'], metricas['ociosas']) == (1, 1, 0, 0)
+
+    primeira.close()
+    with engine.connect():
+        pass
+    metricas = metricas_pool(engine)
+    assert (metricas['checkouts'], metricas['esgotamentos'], metricas['em_uso'], metricas['ociosas']) == (3, 1, 0, 1)
+    engine.dispose()
+
+
+def test_sem_metricas_fora_do_pool_medido():
+    engine = create_engine('sqlite://')
+    assert metricas_pool(engine) is None
@@ -0,0 +1,51 @@
+from sqlalchemy import func, select
+
+from apoio import importar_sinteticas
+from estatisticas import calcular_painel
+from extensions import db
+from models import Transacao
+
+# Resumo mensal, categorias, previsão e metas; nenhuma depende da quantidade de transações
+LIMITE_PAINEL = 4
+# Usuário da sessão, o painel e a página de transações; com o painel em cache, só a página
+LIMITE_DASHBOARD = 1 + LIMITE_PAINEL + 1
+LIMITE_DASHBOARD_EM_CACHE = 2
+
+
+def test_painel_com_consultas_fixas(app, usuario, contar_consultas):
+    contagens = []
+    for transacoes in (0, 300, 1500):
+        if transacoes:
+            importar_sinteticas(app, usuario, transacoes=transacoes, semente=transacoes)
+        with app.app_context(), contar_consultas() as consultas:
+            calcular_painel(usuario)
+        assert len(consultas) <= LIMITE_PAINEL, consultas.comandos
+        # Só as tabelas derivadas: nada de agregar a tabela de transações
+        assert not any('FROM transacao' in comando for comando in consultas.comandos)
+        contagens.append(len(consultas))
+    assert len(set(contagens)) == 1
+
+
+def test_dashboard_com_consultas_fixas(app, logado, usuario, contar_consultas):
+    importar_sinteticas(app, usuario)
+    with contar_consultas() as consultas:
+        assert logado.get('/dashboard').status_code == 200
+    assert len(consultas) <= LIMITE_DASHBOARD, consultas.comandos
+
+    with contar_consultas() as consultas:
+        assert logado.get('/dashboard').status_code == 200
+    assert len(consultas) <= LIMITE_DASHBOARD_EM_CACHE, consultas.comandos
+
+
+def test_painel_confere_com_as_transacoes(app, usuario):
+    importar_sinteticas(app, usuario)
+    with app.app_context():
+        painel = calcular_painel(usuario)
+        totais = dict(db.session.execute(
+            select(Transacao.tipo, func.sum(Transacao.valor_centavos))
+            .where(Transacao.usuario_id == usuario)
+            .group_by(Transacao.tipo)
+        ).all())
+    assert painel['total_receitas'] == totais['receita']
+    assert painel['total_despesas'] == totais['despesa']
+    assert sum(mes['saldo'] for mes in painel['relatorio_mensal']) == totais['receita'] - totais['despesa']
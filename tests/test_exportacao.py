@@ -0,0 +1,56 @@
+import tracemalloc
+from datetime import date, timedelta
+
+from extensions import db
+
+LINHAS = 500_000
+# O CSV inteiro tem uns 40 MB (77 MB de pico se a resposta fosse montada de
+# uma vez); em streaming só um lote (CSV_LOTE linhas) fica em memória
+TETO_MEMORIA = 8 * 1024 * 1024
+
+
+def _inserir_transacoes(app, usuario_id, quantidade):
+    """Insere direto pelo driver: a exportação só lê transacao e categoria."""
+    inicio = date(2020, 1, 1)
+    linhas = (
+        (f'Compra {i} no mercado do bairro', 100 + i % 50_000, 'despesa' if i % 3 else 'receita',
+         (inicio + timedelta(days=i % 2000)).isoformat(), usuario_id)
+        for i in range(quantidade)
+    )
+    with app.app_context():
+        db.session.connection().exec_driver_sql(
+            'INSERT INTO transacao (descricao, valor_centavos, tipo, data, usuario_id) VALUES (?, ?, ?, ?, ?)',
+            list(linhas)
+        )
+        db.session.commit()
+
+
+def test_exportacao_csv_em_streaming_com_memoria_limitada(app, logado, usuario):
+    _inserir_transacoes(app, usuario, LINHAS)
+
+    tracemalloc.start()
+    try:
+        resposta = logado.get('/export/csv')
+        assert resposta.status_code == 200
+        assert resposta.is_streamed
+        linhas = bytes_enviados = 0
+        for parte in resposta.iter_encoded():
+            bytes_enviados += len(parte)
+            linhas += parte.count(b'\n')
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert linhas == LINHAS + 1  # com o cabeçalho
+    assert bytes_enviados > 3 * TETO_MEMORIA
+    assert pico < TETO_MEMORIA, f'pico de {pico / 1024 / 1024:.1f} MB'
+
+
+def test_valor_do_csv_com_ponto_decimal_e_sem_milhar(app, logado, usuario):
+    _inserir_transacoes(app, usuario, 1)
+    with app.app_context():
+        db.session.connection().exec_driver_sql('UPDATE transacao SET valor_centavos = 123456')
+        db.session.commit()
+
+    linhas = logado.get('/export/csv').get_data(as_text=True).splitlines()
+    assert linhas == ['Data,Descrição,Tipo,Categoria,Valor', '01/01/2020,Compra 0 no mercado do bairro,Receita,Sem categoria,R$ 1234.56']
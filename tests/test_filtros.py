@@ -0,0 +1,90 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy.engine.interfaces import CacheStats
+
+from apoio import importar_sinteticas
+from extensions import db
+from filtros import TransacaoFilter
+from models import Transacao
+
+HOJE = date(2025, 6, 15)
+
+CASOS = {
+    # Só período: atalho pelo saldo diário
+    'sem_filtros': {},
+    'periodo_mes': {'data_inicial': date(2025, 3, 1), 'data_final': date(2025, 3, 31)},
+    'periodo_um_dia': {'data_inicial': date(2024, 12, 5), 'data_final': date(2024, 12, 5)},
+    'periodo_antes_do_historico': {'data_inicial': date(2020, 1, 1), 'data_final': date(2023, 12, 31)},
+    'periodo_ate_depois_de_hoje': {'data_inicial': date(2024, 7, 10), 'data_final': date(2030, 1, 1)},
+    'so_data_inicial': {'data_inicial': date(2024, 2, 29)},
+    'so_data_final': {'data_final': date(2024, 8, 31)},
+    # Outros filtros: select_totais()
+    'tipo_receita': {'tipo': 'receita'},
+    'tipo_despesa_no_periodo': {'tipo': 'despesa', 'data_inicial': date(2024, 11, 1), 'data_final': date(2025, 1, 31)},
+    'categoria': {'categoria': 'Alimentação'},
+    'categoria_sem_acento': {'categoria': 'alimentacao', 'data_inicial': date(2025, 1, 1), 'data_final': HOJE},
+    'categoria_inexistente': {'categoria': 'Inexistente'},
+    'busca': {'busca': 'super'},
+    'busca_sem_acento': {'busca': 'salario'},
+    'busca_duas_palavras': {'busca': 'aplicativo transporte', 'tipo': 'despesa'},
+    'todos': {'data_inicial': date(2024, 1, 1), 'data_final': HOJE, 'tipo': 'despesa', 'categoria': 'Lazer', 'busca': 'cinema'},
+}
+
+
+@pytest.fixture
+def com_transacoes(app, usuario):
+    importar_sinteticas(app, usuario, transacoes=900, hoje=HOJE)
+    # Edições retroativas e exclusões pelo ORM, que mantêm o saldo diário no flush
+    with app.app_context():
+        transacoes = db.session.scalars(
+            db.select(Transacao).where(Transacao.usuario_id == usuario).order_by(Transacao.id)
+        ).all()
+        for transacao in transacoes[:30]:
+            transacao.data -= timedelta(days=200)
+            transacao.valor_centavos += 1
+        for transacao in transacoes[30:45]:
+            transacao.tipo = 'receita' if transacao.tipo == 'despesa' else 'despesa'
+        for transacao in transacoes[45:60]:
+            db.session.delete(transacao)
+        db.session.commit()
+    return usuario
+
+
+def _somas_em_python(filtro):
+    """Como os totais eram calculados antes: somando as linhas da consulta filtrada."""
+    transacoes = db.session.scalars(filtro.select()).all()
+    return {
+        'total_receitas': sum(t.valor_centavos for t in transacoes if t.tipo == 'receita'),
+        'total_despesas': sum(t.valor_centavos for t in transacoes if t.tipo == 'despesa'),
+        'quantidade': len(transacoes)
+    }
+
+
+@pytest.mark.parametrize('argumentos', CASOS.values(), ids=CASOS.keys())
+def test_totais_iguais_as_somas_em_python(app, com_transacoes, argumentos):
+    with app.app_context():
+        filtro = TransacaoFilter(com_transacoes, **argumentos)
+        assert filtro.totais(db.session) == _somas_em_python(filtro)
+
+
+def test_casos_cobrem_os_dois_caminhos_e_linhas(app, com_transacoes):
+    with app.app_context():
+        filtros = [TransacaoFilter(com_transacoes, **argumentos) for argumentos in CASOS.values()]
+        assert any(not filtro.tem_filtros for filtro in filtros)
+        assert any(filtro.tem_filtros for filtro in filtros)
+        for nome in ('categoria', 'busca', 'busca_sem_acento', 'tipo_receita', 'periodo_mes'):
+            assert _somas_em_python(TransacaoFilter(com_transacoes, **CASOS[nome]))['quantidade'] > 0, nome
+
+
+def test_mesma_combinacao_de_filtros_reaproveita_o_sql_compilado(app, usuario):
+    argumentos = [
+        {'data_inicial': '2025-01-01', 'data_final': '2025-01-31', 'tipo': 'despesa', 'categoria': 'Lazer', 'busca': 'cinema'},
+        {'data_inicial': '2024-03-01', 'data_final': '2024-06-30', 'tipo': 'receita', 'categoria': 'Saúde', 'busca': 'consulta'},
+    ]
+    with app.app_context():
+        conexao = db.session.connection()
+        resultados = [conexao.execute(TransacaoFilter.from_args(usuario, args).select()) for args in argumentos]
+        # A primeira execução compila; a segunda, com outros valores, acha o SQL no cache
+        assert resultados[1].context.cache_hit is CacheStats.CACHE_HIT
+        assert resultados[1].context.compiled is resultados[0].context.compiled
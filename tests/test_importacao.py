@@ -0,0 +1,48 @@
+import io
+
+import pytest
+from sqlalchemy import func, select
+
+import importacao
+from extensions import db
+from models import Transacao
+
+CSV = """Data;Descrição;Valor
+03/02/2025;Café;-7,50
+03/02/2025;Café;-7,50
+03/02/2025;Padaria;-12,00
+"""
+
+
+def _importar(usuario, texto, lote=importacao.LOTE):
+    return importacao.importar(usuario, importacao.ler_csv(io.StringIO(texto)), lote=lote)
+
+
+def _quantidade(usuario):
+    return db.session.scalar(select(func.count()).where(Transacao.usuario_id == usuario))
+
+
+@pytest.mark.parametrize('lote', [importacao.LOTE, 1])
+def test_compras_iguais_no_mesmo_arquivo_entram_todas(app, usuario, lote):
+    with app.app_context():
+        resultado = _importar(usuario, CSV, lote)
+        assert (resultado['importadas'], resultado['duplicadas']) == (3, 0)
+        assert _quantidade(usuario) == 3
+
+
+def test_reimportar_o_mesmo_arquivo_nao_grava_nada(app, usuario):
+    with app.app_context():
+        _importar(usuario, CSV)
+        resultado = _importar(usuario, CSV)
+        assert (resultado['importadas'], resultado['duplicadas']) == (0, 3)
+        assert _quantidade(usuario) == 3
+
+
+def test_so_o_que_passa_do_ja_gravado_entra(app, usuario):
+    with app.app_context():
+        _importar(usuario, CSV)
+        # Um extrato maior, com um terceiro café no mesmo dia
+        resultado = _importar(usuario, CSV + '03/02/2025;Café;-7,50\n04/02/2025;Café;-7,50\n')
+        assert (resultado['importadas'], resultado['duplicadas']) == (2, 3)
+        cafes = db.session.scalar(select(func.count()).where(Transacao.usuario_id == usuario, Transacao.descricao == 'Café'))
+        assert cafes == 4
@@ -0,0 +1,44 @@
+import pytest
+
+from apoio import criar_app
+from extensions import db
+
+EXTERNO = {'REMOTE_ADDR': '203.0.113.7'}
+
+
+@pytest.fixture
+def app_instrumentada():
+    def criar(**opcoes):
+        app = criar_app(INSTRUMENTACAO=True, **opcoes)
+        aplicacoes.append(app)
+        return app
+
+    aplicacoes = []
+    yield criar
+    for app in aplicacoes:
+        with app.app_context():
+            db.engine.dispose()
+
+
+@pytest.mark.parametrize('endereco, status', [('127.0.0.1', 200), ('::1', 200), ('203.0.113.7', 404), ('10.0.0.2', 404)])
+def test_metricas_sem_token_so_no_loopback(app_instrumentada, endereco, status):
+    cliente = app_instrumentada().test_client()
+    resposta = cliente.get('/metrics', environ_base={'REMOTE_ADDR': endereco})
+    assert resposta.status_code == status
+    if status == 200:
+        assert 'gestao_requisicoes_total' in resposta.get_data(as_text=True)
+
+
+def test_metricas_com_token(app_instrumentada):
+    cliente = app_instrumentada(METRICAS_TOKEN='segredo').test_client()
+    assert cliente.get('/metrics', environ_base=EXTERNO).status_code == 401
+    assert cliente.get('/metrics', headers={'Authorization': 'Bearer outro'}).status_code == 401
+    resposta = cliente.get('/metrics', environ_base=EXTERNO, headers={'Authorization': 'Bearer segredo'})
+    assert resposta.status_code == 200
+
+
+def test_proxy_confiavel_usa_o_ip_do_cliente(app_instrumentada):
+    """Atrás de um proxy local, o endereço que conta é o do X-Forwarded-For."""
+    cliente = app_instrumentada(PROXIES_CONFIAVEIS=1).test_client()
+    resposta = cliente.get('/metrics', headers={'X-Forwarded-For': '203.0.113.7'})
+    assert resposta.status_code == 404
@@ -0,0 +1,77 @@
+import pytest
+
+import limites
+import relatorios
+from apoio import SENHA, criar_app, criar_usuario
+
+
+def _cliente(**limites_config):
+    app = criar_app(RATELIMIT_ENABLED=True, **limites_config)
+    criar_usuario(app)
+    return app.test_client()
+
+
+def _login(cliente, email='ana@exemplo.com'):
+    return cliente.post('/login', data={'email': email, 'senha': SENHA})
+
+
+def _recusadas(endpoint):
+    return limites.estatisticas()['recusadas'].get(endpoint, 0)
+
+
+def _confere_recusa(resposta):
+    assert resposta.status_code == 429
+    assert int(resposta.headers['Retry-After']) > 0
+    assert resposta.headers['X-RateLimit-Remaining'] == '0'
+
+
+def test_login_por_ip():
+    cliente = _cliente(LIMITE_LOGIN_IP='2 per minute')
+    antes = _recusadas('main.login')
+    assert _login(cliente, 'bia@exemplo.com').status_code == 200  # senha errada, mas contou
+    assert _login(cliente).status_code == 302
+
+    _confere_recusa(_login(cliente, 'caio@exemplo.com'))
+    assert _recusadas('main.login') == antes + 1
+    # A página de login (GET) não entra no limite
+    assert cliente.get('/login').status_code == 200
+
+
+def test_login_pelo_email_tentado():
+    cliente = _cliente(LIMITE_LOGIN_EMAIL='2 per minute')
+    antes = _recusadas('main.login')
+    for _ in range(2):
+        _login(cliente)
+
+    _confere_recusa(_login(cliente))
+    assert _recusadas('main.login') == antes + 1
+    # Outro e-mail, do mesmo IP, ainda passa
+    assert _login(cliente, 'bia@exemplo.com').status_code == 200
+
+
+def test_cadastro_por_ip():
+    cliente = _cliente(LIMITE_CADASTRO='1 per minute')
+    antes = _recusadas('main.register')
+    dados = {'nome': 'Bia', 'email': 'bia@exemplo.com', 'senha': SENHA}
+    assert cliente.post('/register', data=dados).status_code == 302
+
+    _confere_recusa(cliente.post('/register', data=dict(dados, email='caio@exemplo.com')))
+    assert _recusadas('main.register') == antes + 1
+
+
+@pytest.mark.parametrize('rota, endpoint, config', [
+    ('/export/csv', 'main.export_csv', 'LIMITE_EXPORTACAO_CSV'),
+    ('/export/pdf', 'main.export_pdf', 'LIMITE_EXPORTACAO_PDF'),
+])
+def test_exportacao_por_usuario(monkeypatch, rota, endpoint, config):
+    # Só o limite interessa: o PDF não chega ao pool de processos
+    monkeypatch.setattr(relatorios, 'enfileirar', lambda nome_usuario, filtro: '1-relatorio')
+    cliente = _cliente(**{config: '1 per minute'})
+    assert _login(cliente).status_code == 302
+    antes = _recusadas(endpoint)
+    assert cliente.get(rota).status_code in (200, 302)
+
+    resposta = cliente.get(rota, headers={'Accept': 'application/json'})
+    _confere_recusa(resposta)
+    assert resposta.get_json() == {'erro': 'Muitas requisições. Tente novamente em instantes.', 'limite': '1 per 1 minute'}
+    assert _recusadas(endpoint) == antes + 1
@@ -0,0 +1,33 @@
+import logging
+from datetime import date
+
+from extensions import db
+from models import Meta, Transacao
+
+
+def _despesa(usuario, descricao, valor_centavos):
+    return Transacao(usuario_id=usuario, descricao=descricao, valor_centavos=valor_centavos, tipo='despesa', data=date(2025, 3, 10))
+
+
+def test_alerta_de_savepoint_desfeito_nao_dispara(app, usuario, caplog):
+    with app.app_context():
+        db.session.add(Meta(usuario_id=usuario, mes='2025-03', categoria_id=0, limite_centavos=10000))
+        db.session.add(_despesa(usuario, 'Mercado', 5000))
+        db.session.commit()
+
+        # O savepoint passa de 100% e é desfeito
+        with db.session.begin_nested() as savepoint:
+            db.session.add(_despesa(usuario, 'Eletrônicos', 6000))
+            db.session.flush()
+            savepoint.rollback()
+        with caplog.at_level(logging.INFO):
+            db.session.commit()
+        assert 'Alerta de meta' not in caplog.text
+        meta = db.session.scalars(db.select(Meta)).one()
+        assert (meta.gasto_centavos, meta.ultimo_alerta) == (5000, 0)
+
+        # A mesma despesa fora do savepoint dispara os alertas
+        db.session.add(_despesa(usuario, 'Eletrônicos', 6000))
+        with caplog.at_level(logging.INFO):
+            db.session.commit()
+    assert '100% atingido (R$ 110,00 de R$ 100,00)' in caplog.text
@@ -0,0 +1,111 @@
+from datetime import date, datetime, timedelta
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from sqlalchemy import create_engine
+
+import migracoes
+from extensions import db
+from filtros import TransacaoFilter
+from models import Transacao
+from paginacao import codificar_cursor, decodificar_cursor, paginar
+
+
+@pytest.fixture
+def com_transacoes(app, usuario):
+    """25 transações em 8 dias: várias no mesmo dia, para o desempate por id."""
+    with app.app_context():
+        for i in range(25):
+            db.session.add(Transacao(
+                usuario_id=usuario, descricao=f'Item {i}', valor_centavos=100 + i,
+                tipo='despesa' if i % 3 else 'receita', data=date(2025, 3, 1) + timedelta(days=i % 8)
+            ))
+        db.session.commit()
+    return usuario
+
+
+def _ordem_esperada(usuario_id, **filtros):
+    return db.session.scalars(
+        TransacaoFilter(usuario_id, **filtros).select(Transacao.id).order_by(Transacao.data.desc(), Transacao.id.desc())
+    ).all()
+
+
+def _ids(pagina):
+    return [transacao.id for transacao in pagina['transacoes']]
+
+
+def test_proximas_e_anteriores_percorrem_a_listagem(app, com_transacoes):
+    with app.app_context():
+        esperado = _ordem_esperada(com_transacoes)
+        consulta = TransacaoFilter(com_transacoes).select()
+
+        paginas = [paginar(consulta, por_pagina=10)]
+        while paginas[-1]['proximo']:
+            paginas.append(paginar(consulta, depois=paginas[-1]['proximo'], por_pagina=10))
+        assert [len(pagina['transacoes']) for pagina in paginas] == [10, 10, 5]
+        assert sum((_ids(pagina) for pagina in paginas), []) == esperado
+
+        # Voltando pelas anteriores a partir da última, as mesmas páginas
+        pagina = paginas[-1]
+        for anterior in reversed(paginas[:-1]):
+            pagina = paginar(consulta, antes=pagina['anterior'], por_pagina=10)
+            assert _ids(pagina) == _ids(anterior)
+        assert pagina['anterior'] is None and pagina['proximo']
+
+
+def test_limites(app, com_transacoes):
+    with app.app_context():
+        consulta = TransacaoFilter(com_transacoes).select()
+        primeira = paginar(consulta, por_pagina=50)
+        assert len(primeira['transacoes']) == 25
+        assert primeira['anterior'] is None and primeira['proximo'] is None
+
+        # Página cheia sem mais nada depois: sem link de próxima
+        quase = paginar(consulta, por_pagina=20)
+        ultima = paginar(consulta, depois=quase['proximo'], por_pagina=5)
+        assert len(ultima['transacoes']) == 5 and ultima['proximo'] is None and ultima['anterior']
+
+        vazia = paginar(TransacaoFilter(com_transacoes, busca='inexistente').select())
+        assert vazia == {'transacoes': [], 'anterior': None, 'proximo': None, 'por_pagina': 10}
+
+
+@pytest.mark.parametrize('cursor', ['', 'nao-e-base64!', 'MjAyNS0wMy0wMQ', codificar_cursor(Transacao(data=date(2025, 3, 1), id=1))[:-2]])
+def test_cursor_invalido_volta_para_a_primeira_pagina(app, com_transacoes, cursor):
+    with app.app_context():
+        consulta = TransacaoFilter(com_transacoes).select()
+        assert decodificar_cursor(cursor) is None
+        assert _ids(paginar(consulta, depois=cursor)) == _ids(paginar(consulta))
+        assert _ids(paginar(consulta, antes=cursor)) == _ids(paginar(consulta))
+
+
+def test_filtros_mantidos_entre_paginas(app, logado, com_transacoes):
+    with app.app_context():
+        esperado = _ordem_esperada(com_transacoes, tipo='despesa')
+
+    vistos = []
+    resposta = logado.get('/api/v1/transacoes?tipo=despesa&por_pagina=10').get_json()
+    while True:
+        assert all(transacao['tipo'] == 'despesa' for transacao in resposta['transacoes'])
+        vistos += [transacao['id'] for transacao in resposta['transacoes']]
+        if not resposta['proximo']:
+            break
+        resposta = logado.get(f"/api/v1/transacoes?tipo=despesa&por_pagina=10&depois={resposta['proximo']}").get_json()
+    assert vistos == esperado
+
+    # No dashboard, o link da próxima página leva os filtros junto
+    html = logado.get('/dashboard?tipo=despesa&por_pagina=10').get_data(as_text=True)
+    link = next(trecho.split('"')[0] for trecho in html.split('href="') if 'depois=' in trecho.split('"')[0])
+    args = parse_qs(urlparse(link.replace('&amp;', '&')).query)
+    assert args['tipo'] == ['despesa'] and args['por_pagina'] == ['10']
+
+
+def test_migracao_preenche_datas_vazias():
+    # A coluna aceitava nulos antes de virar NOT NULL
+    engine = create_engine('sqlite://')
+    with engine.begin() as conexao:
+        conexao.exec_driver_sql('CREATE TABLE transacao (id INTEGER PRIMARY KEY, data DATE)')
+        conexao.exec_driver_sql("INSERT INTO transacao (data) VALUES ('2025-03-01'), (NULL)")
+        assert migracoes.migrar_data_obrigatoria(conexao) == ['transacao']
+        assert migracoes.migrar_data_obrigatoria(conexao) == []
+        datas = conexao.exec_driver_sql('SELECT data FROM transacao ORDER BY id').scalars().all()
+    assert datas == ['2025-03-01', datetime.utcnow().date().isoformat()]  # CURRENT_DATE do SQLite é em UTC
@@ -0,0 +1,64 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+import pendencias
+from extensions import db
+from models import Usuario
+
+
+@pytest.fixture
+def sessao(app):
+    with app.app_context():
+        sessao = db.session()
+        sessao.execute(db.select(1))  # inicia a transação
+        yield sessao
+        sessao.rollback()
+
+
+def _anotar(sessao, *itens):
+    pendencias.adicionar(sessao, 'teste', itens)
+
+
+def test_rollback_de_savepoint_descarta_so_o_que_foi_anotado_nele(sessao):
+    _anotar(sessao, 'antes')
+    with sessao.begin_nested() as savepoint:
+        _anotar(sessao, 'desfeito')
+        savepoint.rollback()
+    with sessao.begin_nested():
+        _anotar(sessao, 'liberado')
+    _anotar(sessao, 'depois')
+
+    assert pendencias.retirar(sessao, 'teste') == ['antes', 'liberado', 'depois']
+    assert pendencias.retirar(sessao, 'teste') == []
+
+
+def test_savepoint_interno_liberado_sai_com_o_externo(sessao):
+    _anotar(sessao, 'antes')
+    with sessao.begin_nested() as externo:
+        with sessao.begin_nested():
+            _anotar(sessao, 'interno')
+        _anotar(sessao, 'externo')
+        externo.rollback()
+
+    assert pendencias.retirar(sessao, 'teste') == ['antes']
+
+
+def test_flush_que_falha_no_savepoint_descarta_o_savepoint(sessao, usuario):
+    _anotar(sessao, 'antes')
+    with pytest.raises(IntegrityError):
+        with sessao.begin_nested():
+            _anotar(sessao, 'desfeito')
+            # E-mail repetido: o flush falha dentro do savepoint
+            sessao.add(Usuario(nome='Outra', email='ana@exemplo.com', senha_hash='x'))
+            sessao.flush()
+
+    assert pendencias.retirar(sessao, 'teste') == ['antes']
+
+
+def test_rollback_da_transacao_descarta_tudo(sessao):
+    _anotar(sessao, 'antes')
+    with sessao.begin_nested():
+        _anotar(sessao, 'liberado')
+    sessao.rollback()
+
+    assert pendencias.retirar(sessao, 'teste') == []
@@ -0,0 +1,52 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select
+
+from extensions import db
+from models import Transacao
+from periodos import intervalo_mes, mes_de, no_mes, no_periodo, proximo_mes
+
+
+def _despesas_do_mes(condicao):
+    return select(func.sum(Transacao.valor_centavos)).where(
+        Transacao.usuario_id == 1, Transacao.tipo == 'despesa', condicao
+    )
+
+
+def _plano(consulta):
+    compilada = consulta.compile(db.engine)
+    # Os valores não mudam o plano: vão como texto, na ordem dos ?
+    parametros = tuple(str(compilada.params[nome]) for nome in compilada.positiontup)
+    linhas = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {compilada}', parametros)
+    return ' '.join(linha[-1] for linha in linhas)
+
+
+def test_filtro_por_mes_usa_o_indice_com_intervalo(app):
+    with app.app_context():
+        plano = _plano(_despesas_do_mes(no_mes(Transacao.data, '2025-02')))
+        assert 'USING INDEX ix_transacao_usuario_tipo_data (usuario_id=? AND tipo=? AND data>? AND data<?)' in plano
+
+        # O strftime() na coluna só deixa o índice achar o usuário e o tipo
+        plano = _plano(_despesas_do_mes(mes_de(Transacao.data) == '2025-02'))
+        assert 'data>?' not in plano
+
+
+@pytest.mark.parametrize('mes, inicio, fim', [
+    ('2025-02', date(2025, 2, 1), date(2025, 3, 1)),
+    ('2024-12', date(2024, 12, 1), date(2025, 1, 1)),
+    (date(2024, 2, 29), date(2024, 2, 1), date(2024, 3, 1)),
+])
+def test_intervalo_mes(mes, inicio, fim):
+    assert intervalo_mes(mes) == (inicio, fim)
+    assert proximo_mes(inicio) == fim
+
+
+def test_intervalo_e_strftime_contam_o_mesmo(app, usuario):
+    with app.app_context():
+        for dia in (date(2025, 1, 31), date(2025, 2, 1), date(2025, 2, 28), date(2025, 3, 1)):
+            db.session.add(Transacao(usuario_id=usuario, descricao='x', valor_centavos=100, tipo='despesa', data=dia))
+        db.session.commit()
+        contar = lambda condicao: db.session.scalar(select(func.count()).where(Transacao.usuario_id == usuario, condicao))
+        assert contar(no_mes(Transacao.data, '2025-02')) == contar(mes_de(Transacao.data) == '2025-02') == 2
+        assert contar(no_periodo(Transacao.data, date(2025, 1, 31), date(2025, 2, 28))) == 3
@@ -0,0 +1,58 @@
+from datetime import date
+
+import numpy as np
+
+import importacao
+import previsao
+from apoio import criar_usuario
+from cache import cache_usuario, versao_dados
+from estatisticas import calcular_painel
+from extensions import db
+from periodos import proximo_mes
+
+HOJE = date(2025, 7, 17)
+
+
+def _aluguel(usuario_id):
+    """Só o aluguel de R$ 1.500,00, todo dia 5, de junho do ano anterior até o mês de HOJE."""
+    registros = []
+    mes = date(2024, 6, 1)
+    while mes <= HOJE:
+        registros.append({'data': mes.replace(day=5).isoformat(), 'descricao': 'Aluguel', 'valor': '1500.00',
+                          'tipo': 'despesa', 'categoria': 'Moradia'})
+        mes = proximo_mes(mes)
+    importacao.importar(usuario_id, enumerate(registros, start=1))
+
+
+def test_aluguel_fixo_nao_e_extrapolado(app, usuario):
+    with app.app_context():
+        _aluguel(usuario)
+        # A regra linear projeta o ritmo de 17 dias para os 31 do mês
+        assert calcular_painel(usuario, hoje=HOJE)['estatisticas']['previsao_gastos'] == 150000 * 31 // 17
+
+        assert previsao.calcular(HOJE) == {'usuarios': 1, 'linhas': 2}  # Moradia e o total
+        assert calcular_painel(usuario, hoje=HOJE)['estatisticas']['previsao_gastos'] == 150000
+
+
+def test_lote_troca_a_versao_dos_usuarios_com_previsao_nova(app, usuario):
+    sem_despesas = criar_usuario(app, email='bia@exemplo.com', nome='Bia')
+    with app.app_context():
+        _aluguel(usuario)
+        painel = lambda: cache_usuario.obter('painel', usuario, lambda: calcular_painel(usuario, hoje=HOJE))
+        assert painel()['estatisticas']['previsao_gastos'] == 150000 * 31 // 17
+        versoes = {u: versao_dados(db.session.connection(), u) for u in (usuario, sem_despesas)}
+
+        previsao.calcular(HOJE)
+
+        # O painel em cache não fica com a previsão antiga
+        assert painel()['estatisticas']['previsao_gastos'] == 150000
+        assert versao_dados(db.session.connection(), usuario) == versoes[usuario] + 1
+        assert versao_dados(db.session.connection(), sem_despesas) == versoes[sem_despesas]
+
+
+def test_serie_sem_historico_segue_o_ritmo_do_mes():
+    series = np.array([0, 0])
+    datas = np.array(['2025-07-02', '2025-07-10'], dtype='datetime64[D]')
+    realizado, restante = previsao.prever(series, datas, np.array([1000, 700]), HOJE)
+    assert realizado.tolist() == [1700]
+    assert restante.tolist() == [round(1700 * (31 / 17 - 1))]
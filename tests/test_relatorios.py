@@ -0,0 +1,136 @@
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+
+import relatorio_pdf
+import relatorios
+from apoio import SENHA, criar_app, criar_usuario, importar_sinteticas
+from config import opcoes_engine
+from extensions import db
+from filtros import TransacaoFilter
+
+
+def _trabalho(tmp_path):
+    destino = str(tmp_path / '1-relatorio.pdf')
+    open(destino + '.pendente', 'w').close()
+    return destino
+
+
+def test_processo_morto_nao_deixa_o_marcador(tmp_path, monkeypatch):
+    """O processo do pool morreu sem passar pelo except/finally de renderizar()."""
+    destino = _trabalho(tmp_path)
+    executor = object()
+    monkeypatch.setattr(relatorios, '_executor', executor)
+    futuro = Future()
+    futuro.add_done_callback(lambda f: relatorios._concluido('1-relatorio', destino, executor, f))
+
+    futuro.set_exception(BrokenProcessPool('processo encerrado abruptamente'))
+
+    assert not (tmp_path / '1-relatorio.pdf.pendente').exists()
+    assert 'abruptamente' in (tmp_path / '1-relatorio.pdf.erro').read_text(encoding='utf-8')
+    # O próximo enfileirar cria um pool novo
+    assert relatorios._executor is None
+
+
+def test_erro_registrado_pelo_processo_e_mantido(tmp_path):
+    destino = _trabalho(tmp_path)
+    (tmp_path / '1-relatorio.pdf.erro').write_text('sem espaço em disco', encoding='utf-8')
+    futuro = Future()
+    futuro.add_done_callback(lambda f: relatorios._concluido('1-relatorio', destino, None, f))
+
+    futuro.set_exception(OSError('sem espaço em disco'))
+
+    assert (tmp_path / '1-relatorio.pdf.erro').read_text(encoding='utf-8') == 'sem espaço em disco'
+    assert not (tmp_path / '1-relatorio.pdf.pendente').exists()
+
+
+def test_sucesso_nao_mexe_nos_arquivos(tmp_path, monkeypatch):
+    destino = _trabalho(tmp_path)
+    futuro = Future()
+    monkeypatch.setitem(relatorios._futuros, '1-relatorio', futuro)
+    futuro.add_done_callback(lambda f: relatorios._concluido('1-relatorio', destino, None, f))
+
+    futuro.set_result(None)
+
+    assert (tmp_path / '1-relatorio.pdf.pendente').exists()
+    assert not (tmp_path / '1-relatorio.pdf.erro').exists()
+    # Trabalhos concluídos não ficam em _futuros pela vida do worker
+    assert '1-relatorio' not in relatorios._futuros
+
+
+def test_erro_da_ultima_geracao_vale_mais_que_o_pdf_antigo(app):
+    job_id = '1-' + '0' * 32
+    with app.test_request_context():
+        destino = relatorios.caminho(job_id)
+        os.makedirs(os.path.dirname(destino))
+        open(destino, 'w').close()
+        assert relatorios.status(job_id) == 'pronto'
+        open(destino + '.erro', 'w').close()
+        assert relatorios.status(job_id) == 'erro'
+
+
+def test_limpar_apaga_so_arquivos_antigos(tmp_path):
+    agora = time.time()
+    idades = {
+        '1-' + 'a' * 32 + '.pdf': 7200,
+        '1-' + 'b' * 32 + '.pdf.erro': 7200,
+        '1-' + 'c' * 32 + '.pdf': 60,
+        '1-' + 'd' * 32 + '.pdf.pendente': 900,
+        'LEIAME.txt': 7200,
+    }
+    for nome, idade in idades.items():
+        (tmp_path / nome).touch()
+        os.utime(tmp_path / nome, (agora - idade, agora - idade))
+
+    assert relatorios.limpar(str(tmp_path), retencao=3600, timeout=600) == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(list(idades)[2:])
+
+
+def test_exportacao_pdf_pelo_pool(tmp_path):
+    """Da rota ao download, com o pool de processos de verdade."""
+    url = f"sqlite:///{tmp_path / 'financas.db'}"
+    app = criar_app(SQLALCHEMY_DATABASE_URI=url, SQLALCHEMY_ENGINE_OPTIONS=opcoes_engine(url),
+                    RELATORIOS_DIR=str(tmp_path / 'relatorios'), RELATORIOS_PROCESSOS=1)
+    usuario = criar_usuario(app)
+    importar_sinteticas(app, usuario, transacoes=50)
+    cliente = app.test_client()
+    cliente.post('/login', data={'email': 'ana@exemplo.com', 'senha': SENHA})
+
+    status_url = cliente.get('/export/pdf').headers['Location']
+    job_id = status_url.rsplit('/', 1)[1]
+    relatorios._futuros[job_id].result(timeout=60)
+
+    resposta = cliente.get(status_url, headers={'Accept': 'application/json'})
+    assert resposta.get_json()['status'] == 'pronto'
+    assert cliente.get(resposta.get_json()['download']).data.startswith(b'%PDF')
+    # O callback roda logo depois de result() liberar quem espera
+    for _ in range(100):
+        if job_id not in relatorios._futuros:
+            break
+        time.sleep(0.01)
+    assert job_id not in relatorios._futuros
+    with app.app_context():
+        db.engine.dispose()
+
+
+def test_transacoes_em_tabelas_de_um_bloco(tmp_path, monkeypatch):
+    Linha = namedtuple('Linha', 'data descricao tipo categoria valor_centavos')
+    transacoes = [Linha(date(2025, 1, 1), f'Item {i}', 'despesa', 'Lazer', 100) for i in range(95)]
+    tabelas = []
+    tabela_bloco = relatorio_pdf._tabela_bloco
+
+    def registrar(bloco):
+        tabelas.append(tabela_bloco(bloco))
+        return tabelas[-1]
+
+    monkeypatch.setattr(relatorio_pdf, '_tabela_bloco', registrar)
+
+    relatorio_pdf.montar_pdf(str(tmp_path / 'relatorio.pdf'), 'Ana', TransacaoFilter(1), transacoes,
+                             {'total_receitas': 0, 'total_despesas': 9500})
+
+    # Cabeçalho + linhas do bloco + subtotal
+    assert [len(tabela._cellvalues) for tabela in tabelas] == [42, 42, 17]
+    assert tabelas[-1]._cellvalues[-1][-1] == 'R$ -15,00'
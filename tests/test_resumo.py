@@ -0,0 +1,21 @@
+import resumo
+from extensions import db
+from models import ResumoMensal
+
+LINHA = {'mes': '2025-03', 'tipo': 'despesa', 'categoria_id': 0, 'total_centavos': 1500, 'quantidade': 1}
+
+
+def test_insercao_concorrente_soma_na_linha_existente(app, usuario, modo_upsert):
+    """Outra transação inseriu a linha entre o UPDATE sem linhas e o INSERT."""
+    tabela = ResumoMensal.__table__
+    with app.app_context():
+        conexao = db.session.connection()
+        conexao.execute(tabela.insert(), dict(LINHA, usuario_id=usuario))
+        resumo.inserir_ou_somar(
+            conexao, tabela, resumo.CHAVE, dict(LINHA, usuario_id=usuario, total_centavos=200),
+            {'total_centavos': 200, 'quantidade': 1}
+        )
+        db.session.commit()
+
+        linhas = db.session.execute(db.select(ResumoMensal.total_centavos, ResumoMensal.quantidade)).all()
+    assert [tuple(linha) for linha in linhas] == [(1700, 2)]
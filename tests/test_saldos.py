@@ -0,0 +1,33 @@
+from datetime import date
+
+from sqlalchemy import false, update
+
+import saldos
+from extensions import db
+from models import SaldoDiario, Transacao
+
+
+def _transacao(usuario, dia, tipo, valor_centavos):
+    return Transacao(usuario_id=usuario, descricao=f'{tipo} {dia}', valor_centavos=valor_centavos, tipo=tipo, data=date(2025, 3, dia))
+
+
+def test_dia_inserido_por_outra_transacao(app, usuario, monkeypatch, modo_upsert):
+    """Outra transação inseriu o dia entre o UPDATE sem linhas e o INSERT."""
+    with app.app_context():
+        db.session.add_all([
+            _transacao(usuario, 1, 'receita', 500000),
+            _transacao(usuario, 10, 'despesa', 2000),
+            _transacao(usuario, 20, 'despesa', 3000),
+        ])
+        db.session.commit()
+
+        # O UPDATE do dia não enxerga a linha, como se ela ainda não estivesse confirmada
+        tabela = SaldoDiario.__table__
+        monkeypatch.setattr(saldos, 'SOMAR_DIA', update(tabela).where(false()).values(quantidade=tabela.c.quantidade))
+        db.session.add(_transacao(usuario, 10, 'receita', 700))
+        db.session.commit()
+
+        assert saldos.verificar(usuario) == []
+        assert saldos.totais_periodo(db.session, usuario) == {
+            'total_receitas': 500700, 'total_despesas': 5000, 'quantidade': 4
+        }
@@ -0,0 +1,54 @@
+import threading
+
+from werkzeug.security import generate_password_hash
+
+import senhas
+from apoio import SENHA, criar_app, criar_usuario
+from extensions import db
+from models import Usuario
+
+
+def _hash(usuario_id):
+    return db.session.get(Usuario, usuario_id).senha_hash
+
+
+def test_login_refaz_o_hash_de_outro_metodo(app, cliente, usuario):
+    with app.app_context():
+        db.session.get(Usuario, usuario).senha_hash = generate_password_hash(SENHA, 'pbkdf2:sha256:500')
+        db.session.commit()
+
+    # Senha errada não mexe no hash
+    cliente.post('/login', data={'email': 'ana@exemplo.com', 'senha': 'Errada@2024'})
+    with app.app_context():
+        assert _hash(usuario).startswith('pbkdf2:sha256:500$')
+
+    assert cliente.post('/login', data={'email': 'ana@exemplo.com', 'senha': SENHA}).status_code == 302
+    with app.app_context():
+        assert _hash(usuario).startswith('pbkdf2:sha256:1000$')  # SENHA_METODO de ConfigTeste
+        assert db.session.get(Usuario, usuario).check_password(SENHA)
+
+
+def test_pool_cheio_responde_503():
+    app = criar_app(SENHA_THREADS=1, SENHA_FILA=0, SENHA_ESPERA=0)
+    criar_usuario(app)
+    cliente = app.test_client()
+    comecou, liberar = threading.Event(), threading.Event()
+
+    def hash_demorado():
+        comecou.set()
+        liberar.wait()
+
+    # Ocupa a única vaga do pool
+    ocupante = threading.Thread(target=senhas._executar, args=(hash_demorado,))
+    ocupante.start()
+    try:
+        comecou.wait()
+        resposta = cliente.post('/login', data={'email': 'ana@exemplo.com', 'senha': SENHA})
+        assert resposta.status_code == 503
+        resposta = cliente.post('/register', data={'nome': 'Bia', 'email': 'bia@exemplo.com', 'senha': SENHA})
+        assert resposta.status_code == 503
+    finally:
+        liberar.set()
+        ocupante.join()
+
+    assert cliente.post('/login', data={'email': 'ana@exemplo.com', 'senha': SENHA}).status_code == 302
@@ -0,0 +1,26 @@
+import pytest
+
+from apoio import importar_sinteticas
+
+# Comandos SQL por requisição com a identidade da sessão e o painel em cache
+CONSULTAS_POR_ROTA = {
+    '/dashboard': 1,  # a página de transações
+    '/nova': 0,
+    '/importar': 0,
+    '/export/csv': 1,
+    '/dashboard?tipo=despesa': 2,  # página e totais filtrados
+    '/dashboard?data_inicial=2025-01-01&data_final=2025-01-31': 3,  # página e duas buscas no saldo diário
+}
+
+
+@pytest.mark.parametrize('rota, esperado', CONSULTAS_POR_ROTA.items(), ids=CONSULTAS_POR_ROTA.keys())
+def test_consultas_por_requisicao(app, logado, usuario, contar_consultas, rota, esperado):
+    importar_sinteticas(app, usuario)
+    assert logado.get(rota).status_code == 200
+
+    with contar_consultas() as consultas:
+        resposta = logado.get(rota)
+        resposta.get_data()  # o CSV sai em streaming
+    assert resposta.status_code == 200
+    assert len(consultas) == esperado, consultas.comandos
+    assert not any('FROM usuario' in comando for comando in consultas.comandos)
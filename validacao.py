@@ -0,0 +1,114 @@
+import re
+from datetime import datetime
+from dinheiro import para_centavos
+
+TIPOS_TRANSACAO = ('receita', 'despesa')
+VALOR_MAX = 999999999
+# Tamanhos das colunas de Transacao
+DESCRICAO_MAX = 150
+CATEGORIA_MAX = 50
+
+
+def validar_senha_forte(senha):
+    """
+    Valida se a senha atende aos requisitos mínimos de segurança:
+    - Mínimo 8 caracteres
+    - Pelo menos uma letra maiúscula
+    - Pelo menos uma letra minúscula
+    - Pelo menos um número
+    - Pelo menos um caractere especial
+    """
+    if len(senha) < 8:
+        return False, "A senha deve ter no mínimo 8 caracteres."
+    
+    if not re.search(r'[A-Z]', senha):
+        return False, "A senha deve conter pelo menos uma letra maiúscula."
+    
+    if not re.search(r'[a-z]', senha):
+        return False, "A senha deve conter pelo menos uma letra minúscula."
+    
+    if not re.search(r'\d', senha):
+        return False, "A senha deve conter pelo menos um número."
+    
+    if not re.search(r'[!@#$%^&*(),.?":{}|<>]', senha):
+        return False, "A senha deve conter pelo menos um caractere especial (!@#$%^&*(),.?\":{}|<>)."
+    
+    return True, "Senha válida."
+
+
+def sanitizar_texto(texto):
+    """Remove caracteres potencialmente perigosos de inputs de texto"""
+    if not texto:
+        return texto
+    # Remove tags HTML e scripts
+    texto = re.sub(r'<[^>]*>', '', texto)
+    # Remove caracteres de controle
+    texto = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', texto)
+    return texto.strip()
+
+
+def validar_email(email):
+    """Valida formato de email"""
+    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+    return re.match(pattern, email) is not None
+
+
+def validar_transacao(descricao, valor, tipo, categoria, data):
+    """
+    Valida e normaliza os campos de uma transação (formulário ou importação).
+    Retorna (dados, None) se forem válidos ou (None, mensagem de erro).
+    """
+    descricao = sanitizar_texto((descricao or '').strip())
+    categoria = sanitizar_texto((categoria or '').strip())
+
+    if not descricao or len(descricao) < 2:
+        return None, 'Descrição deve ter pelo menos 2 caracteres.'
+    if len(descricao) > DESCRICAO_MAX:
+        return None, f'Descrição deve ter no máximo {DESCRICAO_MAX} caracteres.'
+    if len(categoria) > CATEGORIA_MAX:
+        return None, f'Categoria deve ter no máximo {CATEGORIA_MAX} caracteres.'
+
+    valor_centavos = para_centavos(valor)
+    if valor_centavos is None:
+        return None, 'Valor inválido.'
+    if valor_centavos <= 0:
+        return None, 'Valor deve ser maior que zero.'
+    if valor_centavos > VALOR_MAX * 100:
+        return None, 'Valor muito alto.'
+
+    if tipo not in TIPOS_TRANSACAO:
+        return None, 'Tipo de transação inválido.'
+
+    try:
+        data = datetime.strptime(data or '', '%Y-%m-%d').date()
+    except (ValueError, TypeError):
+        return None, 'Data inválida.'
+
+    return {
+        'descricao': descricao,
+        'valor_centavos': valor_centavos,
+        'tipo': tipo,
+        'categoria': categoria,
+        'data': data
+    }, None
+
+
+def validar_meta(valor, mes=None):
+    """
+    Valida o limite e o mês ('AAAA-MM'; vazio = mês atual) de uma meta.
+    Retorna (dados, None) ou (None, mensagem de erro).
+    """
+    limite_centavos = para_centavos(valor)
+    if limite_centavos is None:
+        return None, 'Valor inválido para meta.'
+    if limite_centavos <= 0:
+        return None, 'A meta deve ser um valor positivo.'
+    if limite_centavos > VALOR_MAX * 100:
+        return None, 'Valor da meta muito alto.'
+
+    try:
+        mes = datetime.strptime(mes, '%Y-%m').strftime('%Y-%m') if mes else datetime.now().strftime('%Y-%m')
+    except (ValueError, TypeError):
+        return None, 'Mês inválido.'
+
+    return {'limite_centavos': limite_centavos, 'mes': mes}, None
@@ -0,0 +1,4 @@
+"""Ponto de entrada WSGI (ex.: gunicorn wsgi:app)."""
+from app import create_app
+
+app = create_app()